@@ -0,0 +1,353 @@
+"""Pacotes de JS/CSS minificados e com hash do conteúdo no nome.
+
+``flask --app wsgi build-assets`` concatena e minifica os scripts de cada
+página (``BUNDLES``), minifica as folhas de estilo (``STYLESHEETS``) e grava
+tudo em ``static/dist/`` como ``<nome>.<hash>.<ext>``, junto com o
+``manifest.json`` que mapeia os nomes lógicos para os arquivos gerados.
+
+Os templates usam ``script_bundle('index')`` e ``asset_url('css/style.css')``:
+com o manifesto carregado apontam para os arquivos de ``dist/`` (servidos com
+``Cache-Control: immutable``, já que o nome muda quando o conteúdo muda); sem
+build, ou com ``ASSET_BUNDLES`` desligado (padrão no modo debug), caem nos
+arquivos originais de ``static/``, um ``<script>`` por arquivo.
+"""
+import hashlib
+import json
+import os
+import re
+
+from flask import current_app, request, url_for
+from markupsafe import Markup, escape
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+_BASE_SCRIPTS = ['js/api.js', 'js/main.js', 'js/auth.js']
+
+# Scripts de cada página, na ordem em que eram carregados pelos templates
+BUNDLES = {
+    'base': _BASE_SCRIPTS,
+    'index': _BASE_SCRIPTS + ['js/store.js', 'js/books.js'],
+    'add_book': _BASE_SCRIPTS + ['js/autocomplete.js', 'js/add_book.js'],
+    'edit_book': _BASE_SCRIPTS + ['js/autocomplete.js', 'js/edit_book.js'],
+    'login': ['js/main.js', 'js/login.js'],
+    'register': ['js/main.js', 'js/register.js'],
+}
+
+STYLESHEETS = ['css/style.css']
+
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.(?:js|css)$')
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+# ==================== MINIFICAÇÃO ====================
+
+_WORD = re.compile(r'[\w$\\]')
+
+# Depois destes tokens uma "/" abre uma expressão regular, não uma divisão
+_REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete',
+                   'void', 'throw', 'case', 'do', 'else', 'yield', 'await'}
+
+
+def _is_word(char):
+    return bool(char) and (_WORD.match(char) is not None or ord(char) > 127)
+
+
+class _JSMinifier:
+    """Remove comentários e espaços sem reescrever o código.
+
+    As quebras de linha são mantidas (uma por linha de código) para não
+    depender da inserção automática de ponto e vírgula; strings, templates e
+    expressões regulares são copiados intactos.
+    """
+
+    def __init__(self, source):
+        self.src = source
+        self.pos = 0
+        self.out = []
+        self.pending_space = False
+        self.pending_newline = False
+
+    def minify(self):
+        self._code(in_template=False)
+        return ''.join(self.out).strip() + '\n'
+
+    def _last(self):
+        for chunk in reversed(self.out):
+            stripped = chunk.rstrip()
+            if stripped:
+                return stripped
+        return ''
+
+    def _emit(self, text):
+        if self.pending_newline:
+            if self.out and not self.out[-1].endswith('\n'):
+                self.out.append('\n')
+        elif self.pending_space and self.out:
+            prev, nxt = self.out[-1][-1:], text[:1]
+            if ((_is_word(prev) and _is_word(nxt))
+                    or (prev in '+-' and nxt in '+-' and prev and nxt)):
+                self.out.append(' ')
+        self.pending_space = self.pending_newline = False
+        self.out.append(text)
+
+    def _regex_allowed(self):
+        last = self._last()
+        if not last:
+            return True
+        if last[-1] in '(,=:[!&|?{};+-*%<>~^':
+            return True
+        word = re.search(r'[\w$]+$', last)
+        return bool(word) and word.group() in _REGEX_KEYWORDS
+
+    def _read_until_quote(self, quote):
+        """Copia uma string ou regex a partir de ``pos`` (já após a abertura)"""
+        src, start = self.src, self.pos - 1
+        in_class = False
+        while self.pos < len(src):
+            char = src[self.pos]
+            self.pos += 1
+            if char == '\\':
+                self.pos += 1
+            elif quote == '/' and char == '[':
+                in_class = True
+            elif quote == '/' and char == ']':
+                in_class = False
+            elif char == quote and not in_class:
+                break
+            elif char == '\n' and quote != '`':
+                raise ValueError(f'Literal não terminado na posição {start}')
+        return src[start:self.pos]
+
+    def _template(self):
+        """Copia um template literal, minificando as expressões ``${...}``"""
+        src = self.src
+        self._emit('`')
+        start = self.pos
+        while self.pos < len(src):
+            char = src[self.pos]
+            if char == '\\':
+                self.pos += 2
+                continue
+            if char == '`':
+                self.out.append(src[start:self.pos + 1])
+                self.pos += 1
+                return
+            if src.startswith('${', self.pos):
+                self.out.append(src[start:self.pos + 2])
+                self.pos += 2
+                self._code(in_template=True)
+                self.out.append('}')
+                start = self.pos
+                continue
+            self.pos += 1
+        raise ValueError('Template literal não terminado')
+
+    def _code(self, in_template):
+        src = self.src
+        depth = 0
+        while self.pos < len(src):
+            char = src[self.pos]
+            if char == '\n':
+                self.pending_newline = True
+                self.pos += 1
+            elif char.isspace():
+                self.pending_space = True
+                self.pos += 1
+            elif src.startswith('//', self.pos):
+                end = src.find('\n', self.pos)
+                self.pos = len(src) if end == -1 else end
+            elif src.startswith('/*', self.pos):
+                end = src.find('*/', self.pos + 2)
+                if end == -1:
+                    raise ValueError('Comentário não terminado')
+                if '\n' in src[self.pos:end]:
+                    self.pending_newline = True
+                else:
+                    self.pending_space = True
+                self.pos = end + 2
+            elif char in '"\'' or (char == '/' and self._regex_allowed()):
+                self.pos += 1
+                self._emit(self._read_until_quote(char))
+            elif char == '`':
+                self.pos += 1
+                self._template()
+            else:
+                if in_template:
+                    if char == '{':
+                        depth += 1
+                    elif char == '}':
+                        if depth == 0:
+                            self.pos += 1
+                            return
+                        depth -= 1
+                match = re.compile(r'[\w$\\]+').match(src, self.pos) if _is_word(char) else None
+                token = match.group() if match else char
+                self._emit(token)
+                self.pos += len(token)
+        if in_template:
+            raise ValueError('Expressão de template não terminada')
+
+
+def minify_js(source):
+    return _JSMinifier(source).minify()
+
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_STRING = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+
+
+def minify_css(source):
+    """Remove comentários e espaços redundantes (strings ficam intactas)"""
+    strings = []
+
+    def keep(match):
+        strings.append(match.group())
+        return f'\x00{len(strings) - 1}\x00'
+
+    css = _CSS_STRING.sub(keep, source)
+    css = _CSS_COMMENT.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    css = re.sub(r'\x00(\d+)\x00', lambda match: strings[int(match.group(1))], css)
+    return css.strip() + '\n'
+
+
+# ==================== BUILD ====================
+
+def _hashed_name(name, data, extension):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return f'{name}.{digest}.{extension}'
+
+
+def _read(static_folder, filename):
+    with open(os.path.join(static_folder, filename), encoding='utf-8') as f:
+        return f.read()
+
+
+def build_assets(static_folder, minify=True):
+    """Gera ``static/dist/`` e retorna o manifesto gravado"""
+    output_dir = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    previous = _manifest_files(os.path.join(output_dir, MANIFEST_NAME))
+    manifest = {'bundles': {}, 'assets': {}}
+    written = {MANIFEST_NAME}
+
+    for name, sources in BUNDLES.items():
+        parts = []
+        for filename in sources:
+            source = _read(static_folder, filename)
+            try:
+                parts.append(minify_js(source) if minify else source)
+            except ValueError as e:
+                raise ValueError(f'{filename}: {e}') from None
+        # ";" entre arquivos: cada um foi escrito para ser um <script> separado
+        data = ';\n'.join(parts).encode('utf-8')
+        hashed = _hashed_name(name, data, 'js')
+        _write(output_dir, hashed, data)
+        manifest['bundles'][name] = f'{DIST_DIR}/{hashed}'
+        written.add(hashed)
+
+    for filename in STYLESHEETS:
+        source = _read(static_folder, filename)
+        data = (minify_css(source) if minify else source).encode('utf-8')
+        name, extension = os.path.splitext(os.path.basename(filename))
+        hashed = _hashed_name(name, data, extension.lstrip('.'))
+        _write(output_dir, hashed, data)
+        manifest['assets'][filename] = f'{DIST_DIR}/{hashed}'
+        written.add(hashed)
+
+    # Manifesto por último: quem o lê nunca aponta para arquivo ainda não gravado
+    _write(output_dir, MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True).encode())
+
+    # Remove só o que nem este build nem o anterior usam: durante o deploy,
+    # servidores com o manifesto antigo e páginas abertas ainda pedem esses arquivos
+    for entry in os.scandir(output_dir):
+        if entry.name not in written and entry.name not in previous and HASHED_NAME.search(entry.name):
+            os.remove(entry.path)
+    return manifest
+
+
+def _manifest_files(path):
+    """Nomes dos arquivos de ``dist/`` referenciados por um manifesto gravado"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return set()
+    paths = {**manifest.get('bundles', {}), **manifest.get('assets', {})}.values()
+    return {os.path.basename(path) for path in paths}
+
+
+def _write(directory, name, data):
+    tmp = os.path.join(directory, f'.{name}.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, os.path.join(directory, name))
+
+
+# ==================== USO NOS TEMPLATES ====================
+
+class AssetManifest:
+    """Manifesto carregado na inicialização; vazio quando não houve build"""
+
+    def __init__(self, static_folder):
+        self.path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+        self.bundles = {}
+        self.assets = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return
+        self.bundles = manifest.get('bundles', {})
+        self.assets = manifest.get('assets', {})
+
+    def __bool__(self):
+        return bool(self.bundles or self.assets)
+
+
+def _use_bundles():
+    enabled = current_app.config['ASSET_BUNDLES']
+    return (not current_app.debug) if enabled is None else enabled
+
+
+def bundle_urls(name):
+    """URLs dos scripts de um pacote: o arquivo gerado ou os originais"""
+    manifest = current_app.extensions['assets']
+    if _use_bundles() and name in manifest.bundles:
+        return [url_for('static', filename=manifest.bundles[name])]
+    return [url_for('static', filename=filename) for filename in BUNDLES[name]]
+
+
+def script_bundle(name):
+    return Markup('\n'.join(f'<script src="{escape(url)}"></script>' for url in bundle_urls(name)))
+
+
+def asset_url(filename):
+    """Como ``url_for('static', filename=...)``, mas com a versão gerada se houver"""
+    manifest = current_app.extensions['assets']
+    if _use_bundles() and filename in manifest.assets:
+        filename = manifest.assets[filename]
+    return url_for('static', filename=filename)
+
+
+def init_assets(app):
+    app.extensions['assets'] = AssetManifest(app.static_folder)
+    app.add_template_global(script_bundle)
+    app.add_template_global(asset_url)
+    dist_prefix = f'{app.static_url_path}/{DIST_DIR}/'
+
+    @app.after_request
+    def cache_hashed_assets(response):
+        # Nome com hash nunca muda de conteúdo: o navegador não precisa revalidar
+        if (request.path.startswith(dist_prefix) and HASHED_NAME.search(request.path)
+                and response.status_code in (200, 304)):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
@@ -0,0 +1,161 @@
+"""Sugestões de autor e gênero para os formulários (``GET /api/autocomplete``).
+
+Cada usuário tem um índice em memória com os valores distintos de cada campo
+em uma lista ordenada pela forma normalizada (minúsculas, sem acentos); a
+busca por prefixo é um ``bisect`` seguido de uma varredura curta. Valores
+combinados como a Google Books os grava (``"Ficção, Fantasia"``) entram
+separados.
+
+O índice é montado na primeira consulta do usuário (uma leitura de
+``author``/``genre`` da coleção) e guarda a ``collection_version`` em que foi
+montado. As rotas de criação, edição e remoção aplicam a própria alteração
+(``record_book_change``) quando o índice está exatamente uma versão atrás;
+qualquer outra escrita (lotes, importação, outro processo) deixa a versão
+diferente e o índice é remontado na consulta seguinte. Os índices ficam em um
+``LRUCache`` (``AUTOCOMPLETE_CACHE_SIZE`` usuários).
+"""
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.conditional import collection_state
+from app.models import Book
+from app.terms import TERM_FIELDS, normalize, split_values
+
+AUTOCOMPLETE_FIELDS = TERM_FIELDS
+
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 50
+
+
+class PrefixIndex:
+    """Valores distintos de um campo, ordenados pela chave normalizada"""
+
+    def __init__(self, values=()):
+        self._keys = []
+        # chave -> Counter(grafia original -> livros que a usam)
+        self._variants = {}
+        for value in values:
+            self.add(value)
+
+    def add(self, value):
+        key = normalize(value)
+        if not key:
+            return
+        variants = self._variants.get(key)
+        if variants is None:
+            variants = self._variants[key] = Counter()
+            insort(self._keys, key)
+        variants[value] += 1
+
+    def remove(self, value):
+        key = normalize(value)
+        variants = self._variants.get(key)
+        if not variants:
+            return
+        variants[value] -= 1
+        if variants[value] <= 0:
+            del variants[value]
+        if not variants:
+            del self._variants[key]
+            del self._keys[bisect_left(self._keys, key)]
+
+    def search(self, prefix, limit=DEFAULT_SUGGESTIONS):
+        """Até ``limit`` valores que começam com ``prefix``, em ordem alfabética"""
+        key = normalize(prefix)
+        start = bisect_left(self._keys, key)
+        results = []
+        for candidate in self._keys[start:start + limit]:
+            if not candidate.startswith(key):
+                break
+            # Grafia mais usada entre as equivalentes ("ficção" x "Ficção")
+            results.append(self._variants[candidate].most_common(1)[0][0])
+        return results
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class UserIndex:
+    """Índices de autor e gênero de um usuário, na versão ``version`` da coleção"""
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.lock = threading.Lock()
+        self.fields = {field: PrefixIndex() for field in AUTOCOMPLETE_FIELDS}
+        for row in rows:
+            self._apply(row, 1)
+
+    def _apply(self, values, sign):
+        for field in AUTOCOMPLETE_FIELDS:
+            index = self.fields[field]
+            for value in split_values(values.get(field)):
+                if sign > 0:
+                    index.add(value)
+                else:
+                    index.remove(value)
+
+    def apply_change(self, version, removed=None, added=None):
+        """Aplica uma escrita que levou a coleção a ``version``; False se estiver defasado"""
+        with self.lock:
+            if version == self.version:
+                # Nada foi gravado (edição sem alterações)
+                return True
+            if version != self.version + 1:
+                return False
+            if removed:
+                self._apply(removed, -1)
+            if added:
+                self._apply(added, 1)
+            self.version = version
+            return True
+
+    def search(self, field, prefix, limit):
+        with self.lock:
+            return self.fields[field].search(prefix, limit)
+
+
+def _cache():
+    return current_app.extensions['autocomplete_cache']
+
+
+def _build(user_id, version):
+    books = Book.__table__
+    rows = db.session.execute(
+        select(books.c.author, books.c.genre).where(books.c.user_id == user_id)
+    ).mappings()
+    return UserIndex(version, rows)
+
+
+def suggest(user_id, field, prefix, limit=DEFAULT_SUGGESTIONS):
+    """Sugestões do campo para o prefixo, montando o índice se preciso"""
+    version, _ = collection_state(user_id)
+    index = _cache().get(user_id)
+    if index is None or index.version != version:
+        index = _build(user_id, version)
+        _cache().set(user_id, index)
+    return index.search(field, prefix, limit)
+
+
+def book_values(book):
+    """Valores indexados de um livro (capturar antes de alterá-lo)"""
+    return {field: getattr(book, field) for field in AUTOCOMPLETE_FIELDS}
+
+
+def record_book_change(user_id, version=None, removed=None, added=None):
+    """Leva ao índice cacheado uma escrita já confirmada pela rota.
+
+    ``version`` é a ``collection_version`` resultante (``book.version`` depois
+    do commit); sem ela, e só se houver índice, é lida do banco.
+    """
+    index = _cache().get(user_id)
+    if index is None:
+        return
+    if version is None:
+        version, _ = collection_state(user_id)
+    if not index.apply_change(version, removed, added):
+        _cache().delete(user_id)
@@ -0,0 +1,146 @@
+"""Alterações em lote: um UPDATE/DELETE por conjunto em uma única transação.
+
+A seleção é uma lista de ``ids`` ou um ``filter`` com os mesmos parâmetros de
+``get_books``; em ambos os casos a posse é restrita a ``user_id``.
+"""
+from sqlalchemy import case, select
+
+from app import db
+from app.covers import schedule_covers
+from app.models import (
+    Book, BookTombstone, InvalidYear, current_collection_version, delete_book_terms, record_tombstones,
+    set_book_terms, touch_collection, validate_year
+)
+from app.queries import READING_STATUSES, filter_books_query
+from app.terms import TERM_FIELDS
+
+# Limite de ids explícitos por requisição
+MAX_BATCH_IDS = 1000
+
+FILTER_PARAMS = ('search', 'genre', 'status', 'min_rating')
+
+UPDATABLE_FIELDS = (
+    'title', 'author', 'year', 'genre', 'description',
+    'cover_image_url', 'rating', 'reading_status'
+)
+
+
+class BatchRequestError(ValueError):
+    """Corpo da requisição em lote inválido (resposta 400)"""
+
+
+def batch_selection(user_id, payload):
+    """Critério WHERE com os livros selecionados do usuário"""
+    ids = payload.get('ids')
+    book_filter = payload.get('filter')
+
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise BatchRequestError('ids deve ser uma lista não vazia')
+        if len(ids) > MAX_BATCH_IDS:
+            raise BatchRequestError(f'No máximo {MAX_BATCH_IDS} ids por requisição')
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            raise BatchRequestError('ids deve conter apenas números')
+        return (Book.user_id == user_id) & Book.id.in_(ids)
+
+    if isinstance(book_filter, dict):
+        params = {k: str(v) for k, v in book_filter.items() if k in FILTER_PARAMS and v not in (None, '')}
+        if not params:
+            # Evita alterar a coleção inteira por engano
+            raise BatchRequestError('filter precisa de ao menos um critério')
+        filtered, _ = filter_books_query(user_id, params)
+        # Tabela derivada: o MySQL não aceita subconsulta na própria tabela alvo
+        matching = filtered.with_entities(Book.id).order_by(None).subquery()
+        return (Book.user_id == user_id) & Book.id.in_(select(matching.c.id))
+
+    raise BatchRequestError('Informe ids ou filter')
+
+
+def validate_changes(changes):
+    """Valida os campos do PATCH em lote"""
+    if not isinstance(changes, dict) or not changes:
+        raise BatchRequestError('changes deve ser um objeto não vazio')
+
+    unknown = set(changes) - set(UPDATABLE_FIELDS)
+    if unknown:
+        raise BatchRequestError(f'Campos não permitidos: {", ".join(sorted(unknown))}')
+
+    for field in ('title', 'author'):
+        if field in changes and not changes[field]:
+            raise BatchRequestError('Título e autor não podem ficar vazios')
+
+    if 'year' in changes:
+        try:
+            validate_year(changes['year'])
+        except InvalidYear as e:
+            raise BatchRequestError(str(e))
+
+    if 'rating' in changes:
+        if not isinstance(changes['rating'], int) or not 0 <= changes['rating'] <= 5:
+            raise BatchRequestError('rating deve ser um inteiro entre 0 e 5')
+
+    if 'reading_status' in changes and changes['reading_status'] not in READING_STATUSES:
+        raise BatchRequestError('reading_status inválido')
+
+    return dict(changes)
+
+
+def batch_update(user_id, payload):
+    """Aplica ``payload['changes']`` aos livros selecionados; retorna quantos mudaram"""
+    changes = validate_changes(payload.get('changes'))
+    where = batch_selection(user_id, payload)
+
+    # UPDATE em massa não dispara os eventos do ORM: versão manual (antes, ver touch_collection)
+    connection = db.session.connection()
+    touch_collection(connection, user_id)
+    version = current_collection_version(user_id)
+    books = Book.__table__
+    values = {'version': version, **changes}
+    if 'cover_image_url' in changes:
+        # Capa trocada: a cópia local deixa de valer. cover_hash vai primeiro no SET
+        # porque o MySQL avalia as atribuições em ordem (veria a URL nova)
+        values = {
+            'cover_hash': case(
+                (books.c.cover_image_url == changes['cover_image_url'], books.c.cover_hash), else_=None
+            ),
+            **values,
+        }
+    result = db.session.execute(books.update().where(where).ordered_values(*values.items()))
+
+    # Os livros alterados são os que ficaram com a versão nova: o critério original
+    # pode depender das ligações de gênero que set_book_terms apaga
+    changed = (Book.user_id == user_id) & (Book.version == version)
+    for field in TERM_FIELDS:
+        if field in changes:
+            set_book_terms(connection, changed, field, changes[field])
+    uncached = []
+    if changes.get('cover_image_url'):
+        uncached = db.session.execute(select(Book.id).where(changed, Book.cover_hash.is_(None))).scalars().all()
+    db.session.commit()
+    schedule_covers(user_id, uncached)
+    return result.rowcount
+
+
+def batch_delete(user_id, payload):
+    """Remove os livros selecionados; retorna quantos foram removidos"""
+    where = batch_selection(user_id, payload)
+
+    connection = db.session.connection()
+    # DELETE em massa não dispara os eventos do ORM: versão, remoções e contador manuais
+    touch_collection(connection, user_id)
+    removed = record_tombstones(connection, user_id, where)
+    if removed:
+        # Os removidos são os registrados agora: o critério original pode depender
+        # das ligações de gênero, que precisam sair antes dos livros
+        tombstones = BookTombstone.__table__
+        removed_ids = select(tombstones.c.book_id).where(
+            tombstones.c.user_id == user_id, tombstones.c.version == current_collection_version(user_id)
+        )
+        delete_book_terms(connection, removed_ids)
+        connection.execute(Book.__table__.delete().where(Book.user_id == user_id, Book.id.in_(removed_ids)))
+        # Contador só depois de saber quantos saíram (a versão sobe de novo, sem efeito para a sincronização)
+        touch_collection(connection, user_id, -removed)
+    db.session.commit()
+    return removed
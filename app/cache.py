@@ -0,0 +1,63 @@
+"""Cache em memória do processo com política LRU e TTL opcional.
+
+Qualquer objeto com ``get(key)``, ``set(key, value)``, ``delete(key)`` e
+``clear()`` pode substituir ``LRUCache`` como backend (por exemplo um
+adaptador para Redis quando houver vários processos).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Dicionário limitado a ``maxsize`` entradas, thread-safe.
+
+    Entradas expiram após ``ttl`` segundos quando ``ttl`` é informado.
+    ``hits``/``misses`` contam os acessos para exposição em métricas.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Contadores de uso do cache"""
+        return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,80 @@
+"""Comandos ``flask`` de manutenção (fora do caminho de inicialização do app)."""
+import os
+
+import click
+from flask import current_app
+
+from app import db
+
+
+def register_commands(app):
+    @app.cli.command('init-db')
+    def init_db():
+        """Cria as tabelas que ainda não existem (alternativa ao flask db upgrade)"""
+        db.create_all()
+        click.echo(f'Tabelas criadas em {db.engine.url.render_as_string(hide_password=True)}')
+
+    @app.cli.command('build-assets')
+    @click.option('--no-minify', is_flag=True, help='Só concatena (para depurar os pacotes)')
+    def build_assets_command(no_minify):
+        """Gera os pacotes JS/CSS com hash no nome em static/dist/"""
+        from app.assets import build_assets
+
+        manifest = build_assets(current_app.static_folder, minify=not no_minify)
+        for name, path in sorted({**manifest['bundles'], **manifest['assets']}.items()):
+            size = os.path.getsize(os.path.join(current_app.static_folder, path))
+            click.echo(f'{name}: {path} ({size} bytes)')
+
+    @app.cli.command('enrich-books')
+    @click.option('--user-id', type=int, help='Só os livros deste usuário')
+    @click.option('--batch-size', type=int, help='Livros por lote (padrão: ENRICH_BATCH_SIZE)')
+    @click.option('--concurrency', type=int, help='Consultas simultâneas (padrão: ENRICH_CONCURRENCY)')
+    @click.option('--rate-limit', type=float, help='Requisições/s ao upstream (padrão: ENRICH_RATE_LIMIT)')
+    @click.option('--limit', type=int, help='Máximo de livros nesta execução')
+    def enrich_books(user_id, batch_size, concurrency, rate_limit, limit):
+        """Completa capa, ano e gênero dos livros pela Google Books (retomável)"""
+        from app.enrichment import run_enrichment
+        from app.jobs import Job
+
+        config = current_app.config
+        job = Job('enrich', user_id)
+        run_enrichment(
+            job,
+            user_id=user_id,
+            batch_size=batch_size or config['ENRICH_BATCH_SIZE'],
+            concurrency=concurrency or config['ENRICH_CONCURRENCY'],
+            rate_limit=rate_limit if rate_limit is not None else config['ENRICH_RATE_LIMIT'],
+            limit=limit
+        )
+        progress = job.progress
+        click.echo(
+            f"{progress['scanned']} livros analisados: {progress['enriched']} enriquecidos, "
+            f"{progress['unmatched']} sem correspondência, {progress['failed']} com falha"
+        )
+
+    @app.cli.command('cache-covers')
+    @click.option('--limit', type=int, help='Máximo de livros nesta execução')
+    def cache_covers(limit):
+        """Baixa para o cache local as capas remotas ainda não cacheadas"""
+        import requests
+
+        from app.covers import CoverError, cache_book_cover, uncached_covers_query
+        from app.jobs import Job
+
+        cached = failed = last_id = 0
+        while limit is None or cached + failed < limit:
+            ids = db.session.execute(uncached_covers_query(last_id)).scalars().all()
+            if not ids:
+                break
+            for book_id in ids:
+                if limit is not None and cached + failed >= limit:
+                    break
+                try:
+                    cache_book_cover(Job('cover', None), book_id)
+                    cached += 1
+                except (requests.exceptions.RequestException, CoverError) as e:
+                    db.session.rollback()
+                    current_app.logger.warning('Capa do livro %s não baixada: %s', book_id, e)
+                    failed += 1
+                last_id = book_id
+        click.echo(f'{cached} capas cacheadas, {failed} com falha')
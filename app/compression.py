@@ -0,0 +1,69 @@
+"""Compressão gzip/brotli das respostas acima de um tamanho mínimo.
+
+Só comprime respostas completas em memória: streams (exportações) e arquivos
+enviados com ``send_file`` (capas) passam direto. Brotli é usado quando o
+pacote ``brotli`` está instalado e o cliente o aceita; senão, gzip.
+"""
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'text/html', 'text/css',
+    'text/plain', 'text/csv', 'application/x-ndjson', 'image/svg+xml',
+}
+
+
+def choose_encoding(accept_encoding):
+    if brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response, accept_encoding, min_size=1024, gzip_level=6, brotli_quality=4):
+    """Comprime ``response`` no lugar quando vale a pena"""
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    if encoding == 'br':
+        data = brotli.compress(data, quality=brotli_quality)
+    else:
+        data = gzip.compress(data, compresslevel=gzip_level)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    if not app.config['COMPRESS_RESPONSES']:
+        return
+
+    @app.after_request
+    def _compress(response):
+        config = app.config
+        return compress_response(
+            response, request.accept_encodings,
+            min_size=config['COMPRESS_MIN_SIZE'],
+            gzip_level=config['COMPRESS_GZIP_LEVEL'],
+            brotli_quality=config['COMPRESS_BROTLI_QUALITY']
+        )
@@ -0,0 +1,60 @@
+"""GETs condicionais (ETag / Last-Modified) para as rotas da coleção.
+
+O validador é calculado sem montar a resposta: a versão da coleção do
+usuário (``users.collection_version``, incrementada em toda escrita em livros,
+inclusive remoções e escritas em massa) mais a rota e os parâmetros da
+consulta. Se o cliente já tem essa versão, a rota responde 304 sem consultar
+nem serializar os livros.
+
+``If-None-Match`` tem precedência; ``If-Modified-Since`` sozinho tem resolução
+de um segundo (limite do cabeçalho HTTP).
+"""
+import hashlib
+
+from flask import make_response, request
+from sqlalchemy import select
+from werkzeug.http import is_resource_modified
+
+from app import db
+from app.models import User
+
+
+def collection_state(user_id):
+    """``(versão, última escrita)`` da coleção: uma leitura pela chave primária"""
+    users = User.__table__
+    row = db.session.execute(
+        select(users.c.collection_version, users.c.collection_updated_at).where(users.c.id == user_id)
+    ).first()
+    return (row.collection_version, row.collection_updated_at) if row else (0, None)
+
+
+def make_etag(*parts):
+    key = '|'.join(str(part) for part in parts)
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def collection_etag(user_id, version, *parts):
+    """ETag fraco da rota/parâmetros para a versão da coleção"""
+    args = '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+    return make_etag(request.endpoint, user_id, version, args, *parts)
+
+
+def not_modified(etag, last_modified=None):
+    """Resposta 304 se o cliente já tem a versão atual, senão ``None``"""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return with_validators(('', 304), etag, last_modified)
+
+
+def with_validators(response, etag, last_modified=None):
+    """Anexa ETag/Last-Modified; o cliente deve revalidar antes de reusar"""
+    response = make_response(response)
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Dados por usuário: só o cache do navegador, sempre revalidado
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,429 @@
+"""Cache local das capas dos livros.
+
+Cada capa é baixada uma vez e gravada em disco endereçada pelo SHA-256 do
+conteúdo (a mesma imagem usada por vários livros ocupa um único arquivo).
+Com o Pillow instalado também são geradas miniaturas JPEG de tamanho fixo
+(``COVER_THUMBNAIL_SIZES``); sem ele, pedidos de miniatura recebem o original.
+
+O espaço é limitado por ``COVER_CACHE_MAX_BYTES``: ao passar do limite as
+capas menos acessadas são removidas e os livros que apontavam para elas voltam
+a usar a URL remota (``books.cover_hash = NULL``); a próxima leitura desses
+livros pela API agenda o download de novo (``schedule_missing_covers``).
+O disco é a referência: os workers do gunicorn compartilham o diretório, então
+a presença de uma capa é sempre conferida no arquivo. Cada processo soma ao
+total as próprias gravações; só quando essa soma passa do limite o índice LRU
+(ordem pela data de modificação dos arquivos, renovada a cada
+``COVER_TOUCH_INTERVAL`` segundos de uso) e o total são reconstruídos do
+diretório, com as gravações de todos os processos, antes de remover capas.
+"""
+import hashlib
+import ipaddress
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from sqlalchemy import inspect, select
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow é opcional: sem ele não há miniaturas
+    Image = None
+
+COVER_URL = '/covers/{}'
+# Redirecionamentos seguidos no download (cada destino é verificado)
+MAX_REDIRECTS = 5
+COVER_SIZE_URL = '/covers/{}/{}'
+
+_MIMETYPES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+class CoverError(ValueError):
+    """Download recusado (tamanho, tipo) ou imagem inválida"""
+
+
+def cover_url(cover_hash, size=None):
+    """URL local de uma capa cacheada (``size`` = nome da miniatura)"""
+    if size:
+        return COVER_SIZE_URL.format(cover_hash, size)
+    return COVER_URL.format(cover_hash)
+
+
+def sniff_mimetype(data):
+    for magic, mimetype in _MIMETYPES:
+        if data.startswith(magic):
+            return mimetype
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+class CoverStore:
+    """Arquivos ``<raiz>/<hh>/<hash>`` e ``<hash>-<tamanho>.jpg`` com orçamento em bytes"""
+
+    def __init__(self, root, max_bytes=200 * 1024 * 1024, thumbnail_sizes=None, touch_interval=300):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.thumbnail_sizes = thumbnail_sizes or {}
+        self.touch_interval = touch_interval
+        self._entries = OrderedDict()  # hash -> bytes (original + miniaturas)
+        self._total = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._load()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            root=config['COVER_CACHE_DIR'],
+            max_bytes=config['COVER_CACHE_MAX_BYTES'],
+            thumbnail_sizes=config['COVER_THUMBNAIL_SIZES'],
+            touch_interval=config['COVER_TOUCH_INTERVAL'],
+        )
+
+    def _dir(self, cover_hash):
+        return os.path.join(self.root, cover_hash[:2])
+
+    def _file(self, cover_hash, size=None):
+        name = f'{cover_hash}-{size}.jpg' if size else cover_hash
+        return os.path.join(self._dir(cover_hash), name)
+
+    def _load(self):
+        """Reconstrói o índice LRU e o total a partir do disco (mais antigo primeiro)"""
+        found = {}
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # removido por outro processo
+                    continue
+                cover_hash = entry.name.split('-', 1)[0]
+                size, accessed = found.get(cover_hash, (0, 0))
+                found[cover_hash] = (size + stat.st_size, max(accessed, stat.st_mtime))
+        entries = OrderedDict()
+        for cover_hash, (size, _) in sorted(found.items(), key=lambda item: item[1][1]):
+            entries[cover_hash] = size
+        self._entries = entries
+        self._total = sum(entries.values())
+
+    def __contains__(self, cover_hash):
+        # Outro processo pode ter gravado ou removido a capa
+        return os.path.exists(self._file(cover_hash))
+
+    def path(self, cover_hash, size=None):
+        """Arquivo da capa (ou da miniatura) e marca o acesso; ``None`` se ausente"""
+        path = self._file(cover_hash, size) if size in self.thumbnail_sizes else None
+        if path is None or not os.path.exists(path):
+            # Sem Pillow (ou tamanho desconhecido): serve o original
+            path = self._file(cover_hash)
+        try:
+            # Ordem LRU compartilhada entre processos e reinícios; uma escrita de
+            # metadados por intervalo basta para separar capas usadas das esquecidas
+            if time.time() - os.stat(path).st_mtime >= self.touch_interval:
+                os.utime(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if cover_hash in self._entries:
+                self._entries.move_to_end(cover_hash)
+        return path
+
+    def _write(self, path, data):
+        # Escrita atômica: leitores nunca veem um arquivo pela metade
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+        with os.fdopen(fd, 'wb') as output:
+            output.write(data)
+        os.replace(tmp, path)
+
+    def _thumbnails(self, data):
+        if Image is None or not self.thumbnail_sizes:
+            return {}
+        try:
+            image = Image.open(BytesIO(data))
+            image.load()
+        except Exception:
+            raise CoverError('Imagem inválida')
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        thumbnails = {}
+        for size, width in self.thumbnail_sizes.items():
+            copy = image.copy()
+            copy.thumbnail((width, width * 3 // 2))
+            output = BytesIO()
+            copy.save(output, 'JPEG', quality=85, optimize=True)
+            thumbnails[size] = output.getvalue()
+        return thumbnails
+
+    def put(self, data):
+        """Grava a imagem; retorna ``(hash, hashes removidos pelo limite)``"""
+        if sniff_mimetype(data) is None:
+            raise CoverError('Formato de imagem não suportado')
+        cover_hash = hashlib.sha256(data).hexdigest()
+        if self.path(cover_hash) is not None:
+            return cover_hash, []
+
+        thumbnails = self._thumbnails(data)
+        os.makedirs(self._dir(cover_hash), exist_ok=True)
+        self._write(self._file(cover_hash), data)
+        for name, thumbnail in thumbnails.items():
+            self._write(self._file(cover_hash, name), thumbnail)
+        size = len(data) + sum(len(thumbnail) for thumbnail in thumbnails.values())
+
+        with self._lock:
+            self._total += size - self._entries.pop(cover_hash, 0)
+            self._entries[cover_hash] = size
+            if self._total <= self.max_bytes:
+                return cover_hash, []
+            # Total de todos os processos: relê o diretório antes de remover
+            self._load()
+            return cover_hash, self._evict(keep=cover_hash)
+
+    def _evict(self, keep):
+        evicted = []
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            cover_hash, size = next(iter(self._entries.items()))
+            if cover_hash == keep:
+                break
+            del self._entries[cover_hash]
+            self._total -= size
+            for name in [None, *self.thumbnail_sizes]:
+                try:
+                    os.remove(self._file(cover_hash, name))
+                except FileNotFoundError:
+                    pass
+            evicted.append(cover_hash)
+        return evicted
+
+    def stats(self):
+        return {'covers': len(self._entries), 'bytes': self._total, 'max_bytes': self.max_bytes}
+
+
+# ==================== DOWNLOAD E VÍNCULO COM OS LIVROS ====================
+
+def check_cover_url(url):
+    """Recusa URLs que não sejam http(s) para um host público; retorna o endereço a usar.
+
+    A URL vem do usuário (ou da importação): sem esta verificação o servidor
+    baixaria endereços da rede interna (metadados da nuvem, serviços em
+    127.0.0.1...). Todos os endereços do host precisam ser globais, e o
+    download conecta ao primeiro deles (ver ``download_cover``).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise CoverError('URL da capa deve ser http(s)')
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        addresses = socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise CoverError(f'Host da capa não encontrado: {parts.hostname}')
+    checked = []
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split('%', 1)[0])
+        if getattr(address, 'ipv4_mapped', None):
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise CoverError(f'Host da capa não é público: {parts.hostname}')
+        checked.append(address)
+    return checked[0]
+
+
+class PinnedHostAdapter(HTTPAdapter):
+    """Conexões a um endereço IP já verificado, com SNI e certificado do nome original"""
+
+    def __init__(self, hostname):
+        self.hostname = hostname
+        super().__init__(pool_connections=1, pool_maxsize=1)
+
+    def init_poolmanager(self, *args, **kwargs):
+        # Ignorado pelas conexões http (o urllib3 só o usa no TLS)
+        super().init_poolmanager(*args, server_hostname=self.hostname, **kwargs)
+
+
+def _pinned_get(session, url, address, timeout):
+    """GET em ``url`` conectando a ``address`` no lugar do que o DNS devolver agora"""
+    parts = urlsplit(url)
+    host = f'[{address}]' if address.version == 6 else str(address)
+    if parts.port:
+        host += f':{parts.port}'
+    session.close()  # conexões do salto anterior (a resposta dele já foi fechada)
+    adapter = PinnedHostAdapter(parts.hostname)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session.get(
+        parts._replace(netloc=host).geturl(), timeout=timeout, stream=True, allow_redirects=False,
+        headers={'Host': parts.netloc.rsplit('@', 1)[-1]}
+    )
+
+
+def download_cover(url, max_bytes, timeout=10):
+    """Baixa a imagem em streaming, recusando o que passar de ``max_bytes``.
+
+    Redirecionamentos são seguidos aqui (até ``MAX_REDIRECTS``) para que cada
+    destino passe por ``check_cover_url``. A conexão vai para o endereço que a
+    verificação aprovou: uma segunda resolução do nome (DNS rebinding) não
+    tem como desviar o download para a rede interna.
+    """
+    with requests.Session() as session:
+        for _ in range(MAX_REDIRECTS + 1):
+            response = _pinned_get(session, url, check_cover_url(url), timeout)
+            if not response.is_redirect:
+                break
+            url = urljoin(url, response.headers['Location'])
+            response.close()
+        else:
+            raise CoverError('Redirecionamentos demais')
+        try:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '')
+            if content_type and not content_type.startswith('image/'):
+                raise CoverError(f'Conteúdo não é imagem: {content_type}')
+            data = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                data.extend(chunk)
+                if len(data) > max_bytes:
+                    raise CoverError('Imagem maior que o limite')
+            return bytes(data)
+        finally:
+            response.close()
+
+
+def _set_cover_hash(where, cover_hash):
+    from app import db
+    from app.models import Book, current_collection_version, touch_collection
+
+    books = Book.__table__
+    owners = db.session.execute(select(books.c.user_id).where(where).distinct()).scalars().all()
+    # A URL da capa em to_dict muda: os ETags e a versão dos livros dos donos também
+    for user_id in owners:
+        touch_collection(db.session.connection(), user_id)
+    # Cache de capa não é edição do usuário: mantém updated_at
+    db.session.execute(
+        books.update().where(where).values(
+            cover_hash=cover_hash, updated_at=books.c.updated_at,
+            version=current_collection_version(books.c.user_id)
+        )
+    )
+
+
+def cache_book_cover(job, book_id):
+    """Corpo do trabalho: baixa e vincula a capa de um livro (idempotente)"""
+    from app import db
+    from app.models import Book
+
+    store = current_app.extensions['cover_store']
+    books = Book.__table__
+    book = db.session.execute(
+        select(books.c.id, books.c.cover_image_url, books.c.cover_hash).where(books.c.id == book_id)
+    ).first()
+    if book is None or not book.cover_image_url or (book.cover_hash and book.cover_hash in store):
+        return
+
+    # Mesma URL já baixada para outro livro: reaproveita sem novo download
+    known = db.session.execute(
+        select(books.c.cover_hash)
+        .where(books.c.cover_image_url == book.cover_image_url, books.c.cover_hash.is_not(None))
+        .limit(1)
+    ).scalar()
+    evicted = []
+    if known and known in store:
+        cover_hash = known
+    else:
+        data = download_cover(
+            book.cover_image_url,
+            current_app.config['COVER_MAX_DOWNLOAD_BYTES'],
+            timeout=current_app.config['GOOGLE_BOOKS_TIMEOUT']
+        )
+        cover_hash, evicted = store.put(data)
+
+    # Só vincula se a URL não mudou enquanto baixávamos
+    _set_cover_hash((books.c.id == book_id) & (books.c.cover_image_url == book.cover_image_url), cover_hash)
+    if evicted:
+        _set_cover_hash(books.c.cover_hash.in_(evicted), None)
+    db.session.commit()
+    job.progress.update({'cover_hash': cover_hash, 'evicted': len(evicted)})
+
+
+def _first_attempt(book):
+    """Marca a tentativa de baixar a capa do livro; False se já houve uma recente"""
+    attempts = current_app.extensions['cover_attempts']
+    key = (book.id, book.cover_image_url)
+    if attempts.get(key):
+        return False
+    attempts.set(key, True)
+    return True
+
+
+def schedule_cover(book):
+    """Agenda o download da capa de um livro recém-criado/alterado"""
+    if book.cover_image_url and not book.cover_hash and current_app.config['COVER_CACHE_ENABLED']:
+        _first_attempt(book)
+        current_app.extensions['jobs'].submit('cover', book.user_id, cache_book_cover, book.id)
+
+
+def _cache_book_covers(job, book_ids):
+    from app import db
+
+    failed = 0
+    for book_id in book_ids:
+        # Uma URL quebrada não impede as capas dos demais livros
+        try:
+            cache_book_cover(job, book_id)
+        except (requests.exceptions.RequestException, CoverError) as e:
+            db.session.rollback()
+            current_app.logger.warning('Capa do livro %s não baixada: %s', book_id, e)
+            failed += 1
+    job.progress['failed'] = failed
+
+
+def schedule_covers(user_id, book_ids):
+    """Agenda em um único trabalho as capas de vários livros (ex.: alteração em lote)"""
+    if book_ids and current_app.config['COVER_CACHE_ENABLED']:
+        current_app.extensions['jobs'].submit('cover', user_id, _cache_book_covers, list(book_ids))
+
+
+def schedule_missing_covers(user_id, books):
+    """Agenda as capas sem cópia local (removidas pelo limite, ou cujo download
+    falhou) dos livros que a API está servindo.
+
+    Cada (livro, URL) é tentado no máximo uma vez a cada
+    ``COVER_RETRY_INTERVAL`` segundos por processo. Livros carregados sem as
+    colunas da capa (campos esparsos) ficam de fora: lê-las custaria uma
+    consulta por livro.
+    """
+    if not current_app.config['COVER_CACHE_ENABLED']:
+        return
+    missing = [
+        book.id for book in books
+        if not {'cover_image_url', 'cover_hash'} & inspect(book).unloaded
+        and book.cover_image_url and not book.cover_hash and _first_attempt(book)
+    ]
+    schedule_covers(user_id, missing)
+
+
+def uncached_covers_query(after_id=0, limit=100):
+    """Livros com capa remota ainda não cacheada (keyset por id)"""
+    from app.models import Book
+
+    return (
+        select(Book.id)
+        .where(Book.cover_image_url.is_not(None), Book.cover_image_url != '',
+               Book.cover_hash.is_(None), Book.id > after_id)
+        .order_by(Book.id)
+        .limit(limit)
+    )
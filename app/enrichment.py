@@ -0,0 +1,201 @@
+"""Enriquecimento de metadados em segundo plano via Google Books.
+
+Livros sem capa, ano ou gênero são lidos em lotes (keyset por id), resolvidos
+na Google Books API com concorrência limitada e taxa máxima de requisições
+(``RateLimiter``) e gravados com um UPDATE executemany por lote.
+
+O trabalho é idempotente e retomável: a gravação só preenche campos ainda
+vazios (COALESCE no próprio UPDATE, então edições feitas pelo usuário no meio
+do caminho prevalecem) e marca ``enriched_at``; livros marcados não voltam à
+varredura. Falhas de rede não marcam o livro, que é tentado de novo na
+próxima execução.
+
+As consultas não passam pelo cache da Google Books (milhares de buscas
+únicas expulsariam as buscas interativas) e as capas preenchidas são
+agendadas para o cache local de capas, como as dos livros criados pela API.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from flask import current_app
+from sqlalchemy import bindparam, func, or_, select
+
+from app import db
+from app.covers import schedule_covers
+from app.google_books import normalize_query
+from app.models import Book, current_collection_version, sync_book_terms, touch_collection
+
+ENRICHED_FIELDS = ('cover_image_url', 'year', 'genre')
+
+_STRING_LIMITS = {'genre': 255, 'cover_image_url': 500}
+
+
+class RateLimiter:
+    """Balde de fichas: no máximo ``rate`` chamadas por segundo entre threads"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _blank(column):
+    return or_(column.is_(None), column == '')
+
+
+def incomplete_books_query(user_id=None, after_id=0, limit=100):
+    """Próximo lote de livros ainda não enriquecidos e com campos faltando"""
+    query = (
+        select(Book.id, Book.user_id, Book.title, Book.author,
+               Book.cover_image_url, Book.year, Book.genre)
+        .where(Book.enriched_at.is_(None), Book.id > after_id)
+        .where(or_(_blank(Book.cover_image_url), Book.year.is_(None), _blank(Book.genre)))
+        .order_by(Book.id)
+        .limit(limit)
+    )
+    if user_id is not None:
+        query = query.where(Book.user_id == user_id)
+    return query
+
+
+def _same_title(a, b):
+    a, b = normalize_query(a or ''), normalize_query(b or '')
+    return bool(a and b) and (a == b or a in b or b in a)
+
+
+def match_volume(book, volumes):
+    """Primeiro volume com título compatível; ``None`` se nenhum servir"""
+    for volume in volumes:
+        if _same_title(book.title, volume.get('title')):
+            return volume
+    return None
+
+
+def missing_values(book, volume):
+    """Valores do volume apenas para os campos vazios do livro"""
+    values = {}
+    if not book.cover_image_url and volume.get('cover_image_url'):
+        values['cover_image_url'] = volume['cover_image_url']
+    if book.year is None and volume.get('year'):
+        values['year'] = volume['year']
+    if not book.genre and volume.get('genre'):
+        values['genre'] = volume['genre']
+    for field, limit in _STRING_LIMITS.items():
+        if field in values:
+            values[field] = values[field][:limit]
+    return values
+
+
+def lookup(client, limiter, book):
+    """Resolve um livro; retorna o dicionário de campos a preencher"""
+    limiter.acquire()
+    result = client.search(f'intitle:{book.title} inauthor:{book.author}', cached=False)
+    volume = match_volume(book, result['books'])
+    return missing_values(book, volume) if volume else {}
+
+
+def _write_batch(resolved, unmatched, users, now):
+    books = Book.__table__
+    # Antes da escrita: a versão nova vai para books.version (ver touch_collection)
+    for user_id in users:
+        touch_collection(db.session.connection(), user_id)
+    if resolved:
+        # COALESCE: só preenche o que ainda estiver vazio no momento da escrita
+        db.session.execute(
+            books.update()
+            .where(books.c.id == bindparam('b_id'))
+            .values(
+                cover_image_url=func.coalesce(func.nullif(books.c.cover_image_url, ''),
+                                              bindparam('b_cover_image_url')),
+                year=func.coalesce(books.c.year, bindparam('b_year')),
+                genre=func.coalesce(func.nullif(books.c.genre, ''), bindparam('b_genre')),
+                enriched_at=now,
+                version=current_collection_version(books.c.user_id),
+            ),
+            [
+                {'b_id': book_id, **{f'b_{field}': values.get(field) for field in ENRICHED_FIELDS}}
+                for book_id, values in resolved
+            ]
+        )
+        # Gêneros preenchidos: religa com o valor que ficou gravado (COALESCE acima)
+        with_genre = [book_id for book_id, values in resolved if values.get('genre')]
+        if with_genre:
+            written = db.session.execute(
+                select(books.c.id, books.c.user_id, books.c.genre).where(books.c.id.in_(with_genre))
+            ).mappings()
+            sync_book_terms(db.session.connection(), written, fields=('genre',))
+    if unmatched:
+        # Sem correspondência: só marca, sem mexer em updated_at
+        db.session.execute(
+            books.update()
+            .where(books.c.id.in_(unmatched))
+            .values(enriched_at=now, updated_at=books.c.updated_at)
+        )
+    db.session.commit()
+
+
+def run_enrichment(job, user_id=None, batch_size=100, concurrency=4, rate_limit=5.0, limit=None):
+    """Corpo do trabalho: varre os livros incompletos e grava o que encontrar"""
+    client = current_app.extensions['google_books']
+    limiter = RateLimiter(rate_limit, burst=concurrency)
+    progress = job.progress
+    progress.update({
+        'batch_size': batch_size, 'scanned': 0, 'enriched': 0,
+        'unmatched': 0, 'failed': 0, 'last_id': 0
+    })
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='enrich') as executor:
+        while limit is None or progress['scanned'] < limit:
+            size = batch_size if limit is None else min(batch_size, limit - progress['scanned'])
+            batch = db.session.execute(
+                incomplete_books_query(user_id, progress['last_id'], size)
+            ).all()
+            if not batch:
+                break
+
+            futures = [(book, executor.submit(lookup, client, limiter, book)) for book in batch]
+            resolved, unmatched, users = [], [], set()
+            covers = {}  # usuário -> livros com capa preenchida
+            for book, future in futures:
+                try:
+                    values = future.result()
+                except requests.exceptions.RequestException as e:
+                    # Não marca: o livro volta na próxima execução
+                    current_app.logger.warning('Enriquecimento do livro %s falhou: %s', book.id, e)
+                    progress['failed'] += 1
+                    continue
+                if values:
+                    resolved.append((book.id, values))
+                    users.add(book.user_id)
+                    if 'cover_image_url' in values:
+                        covers.setdefault(book.user_id, []).append(book.id)
+                else:
+                    unmatched.append(book.id)
+
+            _write_batch(resolved, unmatched, users, datetime.utcnow())
+            for owner, book_ids in covers.items():
+                schedule_covers(owner, book_ids)
+
+            progress['scanned'] += len(batch)
+            progress['enriched'] += len(resolved)
+            progress['unmatched'] += len(unmatched)
+            progress['last_id'] = batch[-1].id
@@ -0,0 +1,161 @@
+"""Exportação da coleção em streaming (CSV, JSON e NDJSON).
+
+As linhas vêm do banco em lotes (``yield_per`` com cursor do lado do
+servidor) e são serializadas em pedaços, então o pico de memória não depende
+do tamanho da coleção.
+"""
+import csv
+import io
+import json
+import unicodedata
+from datetime import datetime
+from urllib.parse import quote
+
+from sqlalchemy import select
+from werkzeug.http import dump_options_header
+
+from app import db
+from app.models import Book
+
+# Linhas lidas do banco por ida e escritas por pedaço da resposta
+EXPORT_BATCH_SIZE = 1000
+
+STATUS_LABELS = {
+    'want_to_read': 'Quero Ler',
+    'reading': 'Lendo',
+    'read': 'Lido'
+}
+
+CSV_HEADER = [
+    'ID', 'Titulo', 'Autor', 'Ano', 'Genero', 'Descricao',
+    'Avaliacao', 'Status de Leitura', 'Data de Criacao', 'ISBN'
+]
+
+EXPORT_COLUMNS = (
+    Book.id, Book.title, Book.author, Book.year, Book.genre, Book.description,
+    Book.rating, Book.reading_status, Book.cover_image_url, Book.created_at, Book.isbn
+)
+
+
+def iter_export_rows(user_id, batch_size=EXPORT_BATCH_SIZE):
+    """Itera as colunas exportadas dos livros do usuário, sem montar objetos ORM"""
+    statement = (
+        select(*EXPORT_COLUMNS)
+        .where(Book.user_id == user_id)
+        # (created_at, id) segue o índice ix_books_user_created_at: sem ordenação
+        # em memória, a primeira linha sai antes de o banco ler a última
+        .order_by(Book.created_at, Book.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    yield from db.session.execute(statement)
+
+
+def status_label(reading_status):
+    return STATUS_LABELS.get(reading_status, 'Quero Ler')
+
+
+def export_filename(nickname, extension):
+    return f'colecao_livros_{nickname}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+
+
+def content_disposition(filename):
+    """``Content-Disposition`` de download como o ``send_file`` do werkzeug.
+
+    O cabeçalho precisa ser ASCII: ``filename`` leva o nome sem acentos (e sem
+    caracteres de controle) e ``filename*`` o nome original em UTF-8
+    percent-encoded, que os navegadores preferem.
+    """
+    simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+    simple = ''.join(char for char in simple if char.isprintable())
+    return dump_options_header('attachment', {
+        'filename': simple,
+        'filename*': "UTF-8''" + quote(filename, safe="!#$&+^`|~"),
+    })
+
+
+def book_export_dict(row):
+    """Formato de um livro nas exportações JSON/NDJSON"""
+    return {
+        'id': row.id,
+        'titulo': row.title,
+        'autor': row.author,
+        'ano': row.year,
+        'genero': row.genre,
+        'descricao': row.description,
+        'avaliacao': row.rating or 0,
+        'status_leitura': status_label(row.reading_status),
+        'url_capa': row.cover_image_url,
+        'data_criacao': row.created_at.isoformat() if row.created_at else None,
+        'isbn': row.isbn
+    }
+
+
+def _chunked(rows, batch_size, render):
+    # Junta ``batch_size`` linhas renderizadas em um único pedaço da resposta
+    buffer = []
+    for row in rows:
+        buffer.append(render(row))
+        if len(buffer) >= batch_size:
+            yield ''.join(buffer)
+            buffer.clear()
+    if buffer:
+        yield ''.join(buffer)
+
+
+def csv_chunks(rows, batch_size=EXPORT_BATCH_SIZE):
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    def write(values):
+        # Reaproveita o mesmo buffer: só uma linha fica em memória
+        output.seek(0)
+        output.truncate()
+        writer.writerow(values)
+        return output.getvalue()
+
+    def render(row):
+        return write([
+            row.id,
+            row.title,
+            row.author,
+            row.year or '',
+            row.genre or '',
+            row.description or '',
+            row.rating or 0,
+            status_label(row.reading_status),
+            row.created_at.strftime('%Y-%m-%d %H:%M:%S') if row.created_at else '',
+            row.isbn or ''
+        ])
+
+    yield write(CSV_HEADER)
+    yield from _chunked(rows, batch_size, render)
+
+
+def json_chunks(nickname, total, rows, batch_size=EXPORT_BATCH_SIZE):
+    """Mesmo documento da exportação JSON original, escrito em pedaços"""
+    header = {
+        'usuario': nickname,
+        'data_exportacao': datetime.now().isoformat(),
+        'total_livros': total,
+    }
+    # Abre o objeto com os metadados e deixa o array 'livros' aberto
+    yield json.dumps(header, ensure_ascii=False)[:-1] + ', "livros": [\n'
+
+    first = True
+
+    def render(row):
+        nonlocal first
+        separator = '' if first else ',\n'
+        first = False
+        return separator + json.dumps(book_export_dict(row), ensure_ascii=False)
+
+    yield from _chunked(rows, batch_size, render)
+    yield '\n]}\n'
+
+
+def ndjson_chunks(rows, batch_size=EXPORT_BATCH_SIZE):
+    """Um livro por linha (JSON Lines)"""
+    def render(row):
+        return json.dumps(book_export_dict(row), ensure_ascii=False) + '\n'
+
+    yield from _chunked(rows, batch_size, render)
@@ -0,0 +1,122 @@
+"""Contagens por faceta da listagem (``GET /api/books?facets=1``).
+
+Cada faceta conta os livros que passam pelos *outros* filtros da requisição:
+com um gênero escolhido, os demais gêneros continuam aparecendo (com as
+contagens que teriam se fossem escolhidos no lugar dele). A década não tem
+filtro e conta o conjunto filtrado inteiro.
+
+As quatro contagens saem de uma única consulta: um SELECT agrupado por
+faceta, unidos por UNION ALL (SQLite e MySQL não têm GROUPING SETS), cada um
+com os filtros de ``filter_books_query``. O resultado fica em um ``LRUCache``
+(``FACETS_CACHE_SIZE``) pela chave (usuário, versão da coleção, filtros):
+paginar, trocar a ordenação ou repetir a busca não recalcula nada, e qualquer
+escrita na coleção muda a versão.
+"""
+from flask import current_app
+from sqlalchemy import String, cast, func, literal, union_all
+
+from app import db
+from app.models import Book, Genre, book_genres
+from app.queries import READING_STATUSES, filter_books_query
+from app.stats import RATINGS
+from app.terms import term_key
+
+# faceta -> parâmetro de filtro que ela ignora
+FACET_FILTERS = {
+    'genre': 'genre',
+    'reading_status': 'status',
+    'rating': 'min_rating',
+    'decade': None,
+}
+
+
+def facet_filters(args):
+    """Filtros da requisição na forma canônica (chave do cache)"""
+    search = (args.get('search') or '').strip()
+    genre = (args.get('genre') or '').strip()
+    genre = term_key(genre) if genre.lower() != 'todos' else ''
+    status = (args.get('status') or '').strip()
+    try:
+        min_rating = max(int(args.get('min_rating') or 0), 0)
+    except (ValueError, TypeError):
+        min_rating = 0
+    return {
+        'search': search,
+        'genre': genre,
+        'status': status if status in READING_STATUSES else '',
+        'min_rating': min_rating,
+    }
+
+
+def facets_query(user_id, filters):
+    """UNION ALL das contagens ``(faceta, valor, livros)``"""
+    def filtered(ignored):
+        params = {name: value for name, value in filters.items() if name != ignored}
+        query, _ = filter_books_query(user_id, params)
+        return query.order_by(None)
+
+    status = func.coalesce(Book.reading_status, 'want_to_read')
+    rating = func.coalesce(Book.rating, 0)
+    decade = Book.year - Book.year % 10
+
+    parts = [
+        filtered('genre')
+        .join(book_genres, book_genres.c.book_id == Book.id)
+        .join(Genre, Genre.id == book_genres.c.genre_id)
+        .with_entities(literal('genre'), Genre.name, func.count(Book.id))
+        .group_by(Genre.id, Genre.name),
+        filtered('status')
+        .with_entities(literal('reading_status'), status, func.count(Book.id))
+        .group_by(status),
+        filtered('min_rating')
+        .with_entities(literal('rating'), cast(rating, String), func.count(Book.id))
+        .group_by(rating),
+        filtered(None)
+        .with_entities(literal('decade'), cast(decade, String), func.count(Book.id))
+        .group_by(decade),
+    ]
+    return union_all(*(part.statement for part in parts))
+
+
+def compute_facets(user_id, filters):
+    """Executa ``facets_query`` e monta o dicionário da resposta"""
+    genres = []
+    by_status = dict.fromkeys(READING_STATUSES, 0)
+    by_rating = dict.fromkeys((str(r) for r in RATINGS), 0)
+    decades = []
+
+    for facet, value, count in db.session.execute(facets_query(user_id, filters)):
+        if facet == 'genre':
+            genres.append({'value': value, 'count': count})
+        elif facet == 'reading_status':
+            by_status[value] = by_status.get(value, 0) + count
+        elif facet == 'rating':
+            by_rating[value] = by_rating.get(value, 0) + count
+        else:
+            decades.append({'value': int(value) if value is not None else None, 'count': count})
+
+    genres.sort(key=lambda item: (-item['count'], item['value'].casefold()))
+    # Livros sem ano por último
+    decades.sort(key=lambda item: (item['value'] is None, item['value'] or 0))
+
+    return {
+        'genre': genres,
+        'reading_status': by_status,
+        'rating': by_rating,
+        'decade': decades,
+    }
+
+
+def _cache():
+    return current_app.extensions['facets_cache']
+
+
+def get_book_facets(user_id, version, args):
+    """Facetas da listagem para os filtros de ``args``, do cache quando possível"""
+    filters = facet_filters(args)
+    key = (user_id, version, tuple(sorted(filters.items())))
+    facets = _cache().get(key)
+    if facets is None:
+        facets = compute_facets(user_id, filters)
+        _cache().set(key, facets)
+    return facets
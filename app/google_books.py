@@ -0,0 +1,170 @@
+"""Cliente da Google Books API com cache, pool de conexões e coalescência.
+
+Consultas iguais (após normalização) são respondidas pelo cache enquanto o
+TTL não expira; chamadas concorrentes à mesma consulta compartilham uma única
+requisição ao upstream. A URL base é configurável para permitir testes contra
+um servidor local no lugar de googleapis.com.
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.cache import LRUCache
+from app.metrics import Histogram
+
+DEFAULT_BASE_URL = 'https://www.googleapis.com/books/v1'
+
+
+def normalize_query(query):
+    """Chave de cache: caixa e espaços não mudam o resultado da busca"""
+    return ' '.join(query.split()).casefold()
+
+
+def parse_volume(item):
+    """Converte um volume da API no formato usado pelas telas de livro"""
+    volume_info = item.get('volumeInfo', {})
+
+    # Extrai as informações do livro
+    book_data = {
+        'title': volume_info.get('title', ''),
+        'authors': volume_info.get('authors', []),
+        'author': ', '.join(volume_info.get('authors', [])),
+        'publishedDate': volume_info.get('publishedDate', ''),
+        'year': None,
+        'description': volume_info.get('description', ''),
+        'categories': volume_info.get('categories', []),
+        'genre': ', '.join(volume_info.get('categories', [])),
+        'pageCount': volume_info.get('pageCount'),
+        'language': volume_info.get('language', ''),
+        'thumbnail': volume_info.get('imageLinks', {}).get('thumbnail', ''),
+        'cover_image_url': volume_info.get('imageLinks', {}).get('thumbnail', ''),
+        'publisher': volume_info.get('publisher', ''),
+        'isbn': None
+    }
+
+    # Extrai o ano da data de publicação (formato pode ser YYYY, YYYY-MM, YYYY-MM-DD)
+    if book_data['publishedDate']:
+        year_str = book_data['publishedDate'].split('-')[0]
+        if year_str.isdigit() and len(year_str) == 4:
+            book_data['year'] = int(year_str)
+
+    # Extrai ISBN se disponível
+    for identifier in volume_info.get('industryIdentifiers', []):
+        if identifier.get('type') in ['ISBN_13', 'ISBN_10']:
+            book_data['isbn'] = identifier.get('identifier')
+            break
+
+    return book_data
+
+
+class _InflightCall:
+    """Requisição em andamento que outras threads podem aguardar"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class GoogleBooksClient:
+    """Busca de volumes com cache (LRU + TTL) e sessão HTTP persistente"""
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, timeout=10, max_results=5,
+                 cache_size=512, cache_ttl=3600, pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_results = max_results
+        self.cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.upstream_latency = Histogram(
+            'google_books_upstream_seconds', 'Latência das chamadas à Google Books API', ['outcome'])
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            base_url=config['GOOGLE_BOOKS_API_URL'],
+            timeout=config['GOOGLE_BOOKS_TIMEOUT'],
+            cache_size=config['GOOGLE_BOOKS_CACHE_SIZE'],
+            cache_ttl=config['GOOGLE_BOOKS_CACHE_TTL'],
+            pool_size=config['GOOGLE_BOOKS_POOL_SIZE'],
+        )
+
+    def search(self, query, cached=True):
+        """Retorna ``{'totalItems': int, 'books': [...]}`` para a busca.
+
+        O dicionário retornado é compartilhado com o cache: não o altere.
+        Erros de rede (``requests.exceptions.RequestException``) propagam
+        para todos os chamadores da mesma requisição e não são cacheados.
+        Com ``cached=False`` (varreduras em lote) o upstream é consultado sem
+        ler nem gravar o cache, que fica para as buscas interativas.
+        """
+        if not cached:
+            return self._fetch(query)
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InflightCall()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._fetch(query)
+            self.cache.set(key, call.result)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+
+    def _fetch(self, query):
+        self.upstream_calls += 1
+        started = time.perf_counter()
+        try:
+            response = self.session.get(
+                f'{self.base_url}/volumes',
+                params={'q': query, 'maxResults': self.max_results},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            self.upstream_latency.observe(time.perf_counter() - started, 'error')
+            raise
+        self.upstream_latency.observe(time.perf_counter() - started, 'ok')
+
+        data = response.json()
+        return {
+            'totalItems': data.get('totalItems', 0),
+            'books': [parse_volume(item) for item in data.get('items', [])]
+        }
+
+    def stats(self):
+        """Contadores de cache e de chamadas ao upstream"""
+        stats = self.cache.stats()
+        stats.update({'upstream_calls': self.upstream_calls, 'coalesced': self.coalesced})
+        return stats
@@ -0,0 +1,67 @@
+"""Cache da identidade do usuário logado usada pelo Flask-Login.
+
+``load_user`` roda em toda requisição autenticada; com o cache, a maioria
+delas não vai ao banco só para autenticar. O cache guarda um retrato
+(``CachedUser``) com os campos que as rotas leem de ``current_user`` e é
+invalidado quando o usuário muda ou é removido e quando o contador de livros
+muda. Entre processos diferentes vale o TTL (``IDENTITY_CACHE_TTL``).
+"""
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+
+
+class CachedUser(UserMixin):
+    """Retrato somente-leitura de ``User`` para ``current_user``"""
+
+    def __init__(self, id, nickname, created_at, updated_at, book_count):
+        self.id = id
+        self.nickname = nickname
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.book_count = book_count
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.nickname, user.created_at, user.updated_at, user.book_count)
+
+    def __repr__(self):
+        return f'<CachedUser {self.nickname}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nickname': self.nickname,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'total_books': self.book_count or 0
+        }
+
+
+def _cache():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('identity_cache')
+
+
+def load_cached_user(user_id):
+    """Callback do Flask-Login: cache primeiro, banco só na falta"""
+    from app import db
+    from app.models import User
+
+    cache = _cache()
+    identity = cache.get(user_id) if cache is not None else None
+    if identity is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        identity = CachedUser.from_user(user)
+        if cache is not None:
+            cache.set(user_id, identity)
+    return identity
+
+
+def invalidate_identity(user_id):
+    """Descarta a identidade cacheada (senha, nickname, remoção, contador)"""
+    cache = _cache()
+    if cache is not None:
+        cache.delete(user_id)
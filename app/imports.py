@@ -0,0 +1,370 @@
+"""Importação em massa de livros a partir dos formatos de exportação.
+
+O arquivo é lido em streaming (CSV, documento JSON da exportação ou NDJSON),
+validado em lotes e inserido com um INSERT multi-linha (executemany) por lote.
+Livros com ISBN já presente na coleção são atualizados no lugar de duplicados
+(upsert): um SELECT pelo índice ``(user_id, isbn)`` por lote separa os dois
+casos. Roda como trabalho em segundo plano (ver ``app.jobs``).
+"""
+import codecs
+import csv
+import io
+import json
+import os
+
+from sqlalchemy import bindparam, case, insert, select
+
+from app import db
+from app.exports import STATUS_LABELS
+from app.isbn import InvalidISBN, normalize_isbn
+from app.models import (
+    Book, InvalidYear, current_collection_version, sync_book_terms, touch_collection, validate_year
+)
+from app.queries import READING_STATUSES, books_by_isbn
+
+IMPORT_FORMATS = ('csv', 'json', 'ndjson')
+
+# Limite de erros por linha guardados no progresso (o contador continua)
+MAX_REPORTED_ERRORS = 1000
+
+# Cabeçalhos do CSV exportado -> campos de Book
+CSV_FIELDS = {
+    'Titulo': 'title',
+    'Autor': 'author',
+    'Ano': 'year',
+    'Genero': 'genre',
+    'Descricao': 'description',
+    'Avaliacao': 'rating',
+    'Status de Leitura': 'reading_status',
+    'ISBN': 'isbn',
+}
+
+# Chaves do JSON exportado (e da própria API) -> campos de Book
+JSON_FIELDS = {
+    'titulo': 'title',
+    'autor': 'author',
+    'ano': 'year',
+    'genero': 'genre',
+    'descricao': 'description',
+    'avaliacao': 'rating',
+    'status_leitura': 'reading_status',
+    'url_capa': 'cover_image_url',
+}
+for _field in ('title', 'author', 'year', 'genre', 'description', 'rating',
+               'reading_status', 'cover_image_url', 'isbn'):
+    JSON_FIELDS[_field] = _field
+
+# Rótulos exportados ("Quero Ler", ...) -> códigos de status
+_STATUS_BY_LABEL = {label.lower(): code for code, label in STATUS_LABELS.items()}
+
+_STRING_LIMITS = {'title': 255, 'author': 255, 'genre': 255, 'cover_image_url': 500}
+
+
+class ImportRowError(ValueError):
+    """Linha inválida; a mensagem vai para o relatório do trabalho"""
+
+
+class ImportFileError(ValueError):
+    """Arquivo ilegível; interrompe o trabalho"""
+
+
+def detect_import_format(explicit=None, filename=None, mimetype=None):
+    """Formato pelo parâmetro explícito, pela extensão ou pelo Content-Type"""
+    if explicit:
+        explicit = explicit.lower()
+        return explicit if explicit in IMPORT_FORMATS else None
+    if filename:
+        extension = os.path.splitext(filename)[1].lower().lstrip('.')
+        if extension == 'jsonl':
+            return 'ndjson'
+        if extension in IMPORT_FORMATS:
+            return extension
+    return {
+        'text/csv': 'csv',
+        'application/json': 'json',
+        'application/x-ndjson': 'ndjson',
+        'application/jsonl': 'ndjson',
+    }.get(mimetype)
+
+
+# ==================== LEITURA EM STREAMING ====================
+
+def iter_csv_records(fp):
+    text = io.TextIOWrapper(fp, encoding='utf-8-sig', newline='')
+    for row in csv.DictReader(text):
+        yield {CSV_FIELDS[k]: v for k, v in row.items() if k in CSV_FIELDS}
+
+
+def iter_ndjson_records(fp):
+    for line_number, line in enumerate(io.TextIOWrapper(fp, encoding='utf-8-sig'), start=1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ImportFileError(f'Linha {line_number}: JSON inválido ({e.msg})')
+
+
+class _JSONArrayReader:
+    """Lê os objetos de um array JSON sem carregar o documento inteiro.
+
+    Aceita um array no topo (``[{...}, ...]``) ou o documento da exportação
+    (``{"usuario": ..., "livros": [{...}, ...]}``).
+    """
+
+    ARRAY_KEYS = ('livros', 'books')
+
+    def __init__(self, fp, chunk_size=64 * 1024):
+        self._reader = codecs.getreader('utf-8-sig')(fp)
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        chunk = self._reader.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        # Descarta o que já foi consumido antes de crescer o buffer
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Próximo caractere não-branco (sem consumir) ou '' no fim"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars):
+        char = self._peek()
+        if not char or char not in chars:
+            raise ImportFileError(f'JSON inválido: esperado {" ou ".join(chars)}')
+        self._pos += 1
+        return char
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # Um valor colado no fim do buffer pode estar truncado (ex.: número)
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise ImportFileError(f'JSON inválido: {e.msg}')
+            self._fill()
+
+    def _seek_array(self):
+        first = self._expect('[{')
+        if first == '[':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key in self.ARRAY_KEYS and self._peek() == '[':
+                self._pos += 1
+                return
+            self._value()
+            if self._expect(',}') == '}':
+                raise ImportFileError('JSON sem a lista "livros"')
+
+    def __iter__(self):
+        self._seek_array()
+        if self._peek() == ']':
+            return
+        while True:
+            yield self._value()
+            if self._expect(',]') == ']':
+                return
+
+
+def iter_records(fp, fmt):
+    """Itera os registros brutos (dicionários) do arquivo"""
+    if fmt == 'csv':
+        return iter_csv_records(fp)
+    if fmt == 'ndjson':
+        return iter_ndjson_records(fp)
+    return iter(_JSONArrayReader(fp))
+
+
+# ==================== VALIDAÇÃO ====================
+
+def _optional_int(value, field):
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(f'{field} deve ser um número inteiro')
+
+
+def validate_record(raw, user_id):
+    """Converte um registro bruto nos valores de INSERT de Book"""
+    if not isinstance(raw, dict):
+        raise ImportRowError('Registro deve ser um objeto')
+    # Aceita tanto as chaves da exportação quanto as da API
+    raw = {JSON_FIELDS[k]: v for k, v in raw.items() if k in JSON_FIELDS}
+
+    values = {'user_id': user_id}
+    for field in ('title', 'author', 'genre', 'description', 'cover_image_url'):
+        value = raw.get(field)
+        if value is not None and not isinstance(value, str):
+            value = str(value)
+        value = value.strip() if value else None
+        limit = _STRING_LIMITS.get(field)
+        if value and limit and len(value) > limit:
+            raise ImportRowError(f'{field} excede {limit} caracteres')
+        values[field] = value or None
+
+    if not values['title'] or not values['author']:
+        raise ImportRowError('Título e autor são obrigatórios')
+
+    # Mesmo intervalo de create/update e das alterações em lote
+    try:
+        values['year'] = validate_year(_optional_int(raw.get('year'), 'year'))
+    except InvalidYear as e:
+        raise ImportRowError(str(e))
+
+    rating = _optional_int(raw.get('rating'), 'rating') or 0
+    if not 0 <= rating <= 5:
+        raise ImportRowError('rating deve estar entre 0 e 5')
+    values['rating'] = rating
+
+    status = str(raw.get('reading_status') or 'want_to_read').strip()
+    status = _STATUS_BY_LABEL.get(status.lower(), status)
+    if status not in READING_STATUSES:
+        raise ImportRowError(f'reading_status inválido: {status}')
+    values['reading_status'] = status
+
+    try:
+        values['isbn'] = normalize_isbn(raw.get('isbn'))
+    except InvalidISBN as e:
+        raise ImportRowError(str(e))
+
+    return values
+
+
+def provided_fields(raw):
+    """Campos de Book presentes no registro bruto; no upsert só eles sobrescrevem o livro"""
+    if not isinstance(raw, dict):
+        return frozenset()
+    return frozenset(JSON_FIELDS[k] for k in raw if k in JSON_FIELDS)
+
+
+# ==================== TRABALHO DE IMPORTAÇÃO ====================
+
+# Campos que o upsert pode sobrescrever quando o ISBN já está na coleção
+UPSERT_FIELDS = ('title', 'author', 'year', 'genre', 'description', 'cover_image_url',
+                 'rating', 'reading_status')
+
+
+def _write_batch(user_id, batch):
+    """Insere o lote, atualizando os livros cujo ISBN já existe; retorna (inseridos, atualizados).
+
+    ``batch`` são pares ``(valores, campos presentes no registro)``: na
+    atualização só os campos que o arquivo trouxe mudam (o CSV exportado, por
+    exemplo, não tem a capa).
+    """
+    # ISBN repetido dentro do lote: vale a última linha
+    by_isbn = {values['isbn']: (values, provided) for values, provided in batch if values['isbn']}
+    existing = books_by_isbn(user_id, by_isbn)
+    inserts = [values for values, _ in batch if not values['isbn']]
+    inserts += [values for isbn, (values, _) in by_isbn.items() if isbn not in existing]
+    # Um UPDATE (executemany) por combinação de campos presentes
+    updates = {}
+    for isbn, (values, provided) in by_isbn.items():
+        if isbn in existing:
+            fields = tuple(field for field in UPSERT_FIELDS if field in provided)
+            updates.setdefault(fields, []).append(
+                {'b_id': existing[isbn], **{f'b_{field}': values[field] for field in fields}}
+            )
+
+    # Escrita em massa não dispara os eventos do ORM: contador/versão manual, antes da escrita
+    connection = db.session.connection()
+    touch_collection(connection, user_id, len(inserts))
+    books = Book.__table__
+    version = current_collection_version(user_id)
+    if inserts:
+        db.session.execute(insert(books).values(version=version), inserts)
+    for fields, rows in updates.items():
+        changes = {field: bindparam(f'b_{field}') for field in fields}
+        if 'cover_image_url' in fields:
+            # Capa trocada: a cópia local deixa de valer. cover_hash vai primeiro no
+            # SET porque o MySQL avalia as atribuições em ordem (veria a URL nova)
+            changes = {
+                'cover_hash': case(
+                    (books.c.cover_image_url == bindparam('b_cover_image_url'), books.c.cover_hash), else_=None
+                ),
+                **changes,
+            }
+        db.session.execute(
+            books.update().where(books.c.id == bindparam('b_id'))
+            .ordered_values(*changes.items(), ('version', version)),
+            rows
+        )
+    # Autores/gêneros: os livros do lote são os que ficaram com a versão nova (os
+    # inseridos não têm id aqui)
+    written = connection.execute(
+        select(books.c.id, books.c.user_id, books.c.author, books.c.genre)
+        .where(books.c.user_id == user_id, books.c.version == version)
+    ).mappings()
+    sync_book_terms(connection, written)
+    db.session.commit()
+    return len(inserts), sum(len(rows) for rows in updates.values())
+
+
+def run_import(job, path, fmt, user_id, batch_size, dry_run=False):
+    """Corpo do trabalho: lê ``path``, valida e insere em lotes.
+
+    Cada lote é confirmado separadamente; se o arquivo estiver corrompido no
+    meio (``ImportFileError``), os lotes anteriores permanecem importados e o
+    trabalho falha com a mensagem do erro.
+    """
+    progress = job.progress
+    progress.update({
+        'format': fmt, 'dry_run': dry_run, 'batch_size': batch_size,
+        'processed': 0, 'valid': 0, 'inserted': 0, 'updated': 0, 'failed': 0, 'errors': []
+    })
+
+    def report(row_number, message):
+        progress['failed'] += 1
+        if len(progress['errors']) < MAX_REPORTED_ERRORS:
+            progress['errors'].append({'row': row_number, 'error': message})
+
+    try:
+        with open(path, 'rb') as fp:
+            pending = []
+            for row_number, raw in enumerate(iter_records(fp, fmt), start=1):
+                pending.append((row_number, raw))
+                if len(pending) >= batch_size:
+                    _process(pending, user_id, dry_run, progress, report)
+                    pending = []
+            if pending:
+                _process(pending, user_id, dry_run, progress, report)
+    finally:
+        os.unlink(path)
+
+
+def _process(pending, user_id, dry_run, progress, report):
+    # Valida o lote inteiro e insere só as linhas válidas
+    batch = []
+    for row_number, raw in pending:
+        try:
+            batch.append((validate_record(raw, user_id), provided_fields(raw)))
+        except ImportRowError as e:
+            report(row_number, str(e))
+
+    if batch and not dry_run:
+        inserted, updated = _write_batch(user_id, batch)
+        progress['inserted'] += inserted
+        progress['updated'] += updated
+    progress['valid'] += len(batch)
+    progress['processed'] += len(pending)
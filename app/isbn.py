@@ -0,0 +1,56 @@
+"""Normalização de ISBN para a detecção de duplicatas.
+
+Todo ISBN é gravado na forma canônica de 13 dígitos, sem hífens: o mesmo
+livro informado como ISBN-10 ou ISBN-13 cai na mesma chave do índice único
+``(user_id, isbn)``.
+"""
+import re
+
+_SEPARATORS = re.compile(r'[\s-]')
+
+
+class InvalidISBN(ValueError):
+    """ISBN com formato ou dígito verificador inválido"""
+
+
+def _isbn13_check_digit(first12):
+    total = sum(int(digit) * (1 if i % 2 == 0 else 3) for i, digit in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def _isbn10_is_valid(isbn):
+    total = sum((10 - i) * (10 if char == 'X' else int(char)) for i, char in enumerate(isbn))
+    return total % 11 == 0
+
+
+def normalize_isbn(value):
+    """ISBN-10/13 com ou sem hífens -> ISBN-13; vazio -> None.
+
+    Levanta ``InvalidISBN`` para qualquer outro valor.
+    """
+    if value is None:
+        return None
+    isbn = _SEPARATORS.sub('', str(value)).upper()
+    if not isbn:
+        return None
+
+    if len(isbn) == 10 and isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] == 'X'):
+        if not _isbn10_is_valid(isbn):
+            raise InvalidISBN(f'ISBN inválido: {value}')
+        first12 = '978' + isbn[:9]
+        return first12 + _isbn13_check_digit(first12)
+
+    if len(isbn) == 13 and isbn.isdigit():
+        if _isbn13_check_digit(isbn[:12]) != isbn[12]:
+            raise InvalidISBN(f'ISBN inválido: {value}')
+        return isbn
+
+    raise InvalidISBN(f'ISBN inválido: {value}')
+
+
+def try_normalize_isbn(value):
+    """Como ``normalize_isbn``, mas ``None`` para valores inválidos (dados de terceiros)"""
+    try:
+        return normalize_isbn(value)
+    except InvalidISBN:
+        return None
@@ -0,0 +1,177 @@
+"""Execução de tarefas longas fora do worker da requisição.
+
+``JobRunner`` executa funções em um pool de threads, cada uma dentro de um
+app context próprio. Trabalhos agendados com ``persist=True`` (importação,
+enriquecimento) têm o estado gravado na tabela ``jobs``: com vários workers
+do gunicorn, a consulta de progresso pode cair em qualquer processo. O
+progresso é regravado a cada ``JOB_SAVE_INTERVAL`` segundos enquanto o
+trabalho roda, e trabalhos terminados há mais de ``JOB_RETENTION_DAYS`` dias
+são apagados quando outro é agendado. Os demais (download de capas) vivem só
+na memória do processo que os executa.
+"""
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+
+class Job:
+    """Estado de um trabalho em segundo plano"""
+
+    def __init__(self, kind, user_id, persist=False):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.user_id = user_id
+        self.persist = persist
+        self.status = 'queued'  # queued, running, done, failed
+        self.error = None
+        self.progress = {}
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+
+    @classmethod
+    def from_row(cls, row):
+        """Trabalho lido da tabela ``jobs`` (executado por outro processo)"""
+        job = cls(row.kind, row.user_id, persist=True)
+        job.id = row.id
+        job.status = row.status
+        job.error = row.error
+        job.progress = json.loads(row.progress or '{}')
+        job.created_at = row.created_at
+        job.finished_at = row.finished_at
+        return job
+
+    def row_values(self):
+        # Cópia: o trabalho continua alterando o dicionário em outra thread
+        return {
+            'status': self.status,
+            'error': self.error,
+            'progress': json.dumps(dict(self.progress), default=str),
+            'finished_at': self.finished_at,
+        }
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'error': self.error,
+            'progress': self.progress,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class JobRunner:
+    """Pool de threads com registro dos últimos ``max_jobs`` trabalhos do processo"""
+
+    def __init__(self, app, max_workers=2, max_jobs=200, save_interval=1.0, retention_days=7):
+        self.app = app
+        self.max_jobs = max_jobs
+        self.save_interval = save_interval
+        self.retention = timedelta(days=retention_days)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, app):
+        return cls(
+            app,
+            max_workers=app.config['JOB_WORKERS'],
+            save_interval=app.config['JOB_SAVE_INTERVAL'],
+            retention_days=app.config['JOB_RETENTION_DAYS'],
+        )
+
+    def submit(self, kind, user_id, func, *args, persist=False, **kwargs):
+        """Agenda ``func(job, *args, **kwargs)`` e retorna o ``Job``.
+
+        Com ``persist`` o trabalho é gravado no banco antes de ser agendado
+        (ver o docstring do módulo).
+        """
+        job = Job(kind, user_id, persist=persist)
+        if persist:
+            self._insert(job)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, job_id, user_id=None):
+        """Busca um trabalho; com ``user_id`` só retorna trabalhos do usuário"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._load(job_id)
+        if job is None or (user_id is not None and job.user_id != user_id):
+            return None
+        return job
+
+    # Conexão própria: o estado dos trabalhos não entra na transação da requisição
+
+    def _insert(self, job):
+        from app import db
+        from app.models import BackgroundJob
+
+        jobs = BackgroundJob.__table__
+        with db.engine.begin() as connection:
+            connection.execute(jobs.delete().where(jobs.c.finished_at < datetime.utcnow() - self.retention))
+            connection.execute(jobs.insert().values(
+                id=job.id, kind=job.kind, user_id=job.user_id, created_at=job.created_at, **job.row_values()
+            ))
+
+    def _load(self, job_id):
+        from app import db
+        from app.models import BackgroundJob
+
+        jobs = BackgroundJob.__table__
+        with db.engine.connect() as connection:
+            row = connection.execute(jobs.select().where(jobs.c.id == job_id)).first()
+        return Job.from_row(row) if row is not None else None
+
+    def _save(self, job):
+        from app import db
+        from app.models import BackgroundJob
+
+        jobs = BackgroundJob.__table__
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(jobs.update().where(jobs.c.id == job.id).values(**job.row_values()))
+        except Exception:
+            # Progresso não gravado não derruba o trabalho; a próxima gravação tenta de novo
+            self.app.logger.exception('Estado do trabalho %s não gravado', job.id)
+
+    def _save_periodically(self, job, stop):
+        with self.app.app_context():
+            while not stop.wait(self.save_interval):
+                self._save(job)
+
+    def _run(self, job, func, args, kwargs):
+        job.status = 'running'
+        with self.app.app_context():
+            stop = threading.Event()
+            if job.persist:
+                threading.Thread(
+                    target=self._save_periodically, args=(job, stop),
+                    name=f'job-save-{job.id[:8]}', daemon=True
+                ).start()
+            try:
+                func(job, *args, **kwargs)
+                job.status = 'done'
+            except ValueError as e:
+                # Entrada inválida (ex.: arquivo corrompido): não é um erro do servidor
+                self.app.logger.warning('Trabalho %s (%s) falhou: %s', job.id, job.kind, e)
+                job.status = 'failed'
+                job.error = str(e)
+            except Exception as e:
+                self.app.logger.exception('Falha no trabalho %s (%s)', job.id, job.kind)
+                job.status = 'failed'
+                job.error = str(e)
+            finally:
+                job.finished_at = datetime.utcnow()
+                stop.set()
+                if job.persist:
+                    self._save(job)
@@ -0,0 +1,270 @@
+"""Métricas no formato texto do Prometheus em ``GET /metrics``.
+
+Sem dependências: contadores e histogramas simples, protegidos por lock e
+atualizados uma vez por requisição (latência por endpoint, quantidade e tempo
+de SQL) e uma vez por comando SQL (dois ``perf_counter`` por evento do
+engine). Estatísticas que já existem em outros objetos (caches, cliente da
+Google Books, cache de capas) são lidas só no momento da coleta.
+
+Os valores são do processo: com vários workers do gunicorn, cada coleta vê o
+worker que atendeu a requisição; agregue por ``instance``/``pid`` no
+Prometheus ou rode a coleta por worker.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monotônico com rótulos"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Histograma cumulativo (``_bucket``/``_sum``/``_count``) com rótulos"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # rótulos -> [contagem por bucket..., +Inf, soma]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels):
+        series = self._values.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._values.items()]
+        for labels, series in items:
+            cumulative = 0
+            for bound, hits in zip((*self.buckets, float('inf')), series[:-1]):
+                cumulative += hits
+                yield (f'{self.name}_bucket',
+                       _labels(self.labelnames, labels, [('le', _number(bound))]), cumulative)
+            yield f'{self.name}_sum', _labels(self.labelnames, labels), series[-1]
+            yield f'{self.name}_count', _labels(self.labelnames, labels), cumulative
+
+
+class CallbackMetric:
+    """Valores lidos de outros objetos na hora da coleta (``collect()``)"""
+
+    def __init__(self, name, documentation, labelnames=(), collect=None, kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self):
+        for labels, value in self.collect():
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class MetricsRegistry:
+    """Conjunto de métricas do processo e sua renderização em texto"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, labelnames=(), collect=None, kind='gauge'):
+        return self.register(CallbackMetric(name, documentation, labelnames, collect, kind))
+
+    def get(self, name):
+        return self._metrics[name]
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# ==================== COLETA NO APP ====================
+
+def _cache_stats(app):
+    """``(nome, stats())`` dos caches em memória que expõem contadores"""
+    caches = [
+        ('stats', app.extensions.get('stats_cache')),
+        ('identity', app.extensions.get('identity_cache')),
+        ('autocomplete', app.extensions.get('autocomplete_cache')),
+        ('facets', app.extensions.get('facets_cache')),
+        ('google_books', app.extensions['google_books'].cache),
+    ]
+    for name, cache in caches:
+        if cache is not None and hasattr(cache, 'stats'):
+            yield name, cache.stats()
+
+
+def _register_collectors(registry, app):
+    def cache_values(key):
+        return lambda: [((name, ), stats[key]) for name, stats in _cache_stats(app)]
+
+    def hit_ratio():
+        for name, stats in _cache_stats(app):
+            total = stats['hits'] + stats['misses']
+            yield (name, ), (stats['hits'] / total if total else 0.0)
+
+    registry.callback('cache_hits_total', 'Leituras atendidas pelo cache',
+                   ['cache'], cache_values('hits'), kind='counter')
+    registry.callback('cache_misses_total', 'Leituras que não estavam no cache',
+                   ['cache'], cache_values('misses'), kind='counter')
+    registry.callback('cache_entries', 'Entradas no cache', ['cache'], cache_values('size'))
+    registry.callback('cache_hit_ratio', 'Acertos / leituras desde o início do processo',
+                   ['cache'], hit_ratio)
+
+    google_books = app.extensions['google_books']
+    registry.register(google_books.upstream_latency)
+    registry.callback('google_books_coalesced_total',
+                   'Buscas que aguardaram uma requisição igual já em andamento',
+                   collect=lambda: [((), google_books.coalesced)], kind='counter')
+
+    store = app.extensions.get('cover_store')
+    if store is not None:
+        registry.callback('cover_cache_bytes', 'Bytes ocupados pelo cache de capas',
+                       collect=lambda: [((), store.stats()['bytes'])])
+        registry.callback('cover_cache_covers', 'Capas no cache local',
+                       collect=lambda: [((), store.stats()['covers'])])
+
+
+def _instrument_engine(engine, statements, seconds):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('metrics_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        if has_request_context() and 'metrics_sql' in g:
+            g.metrics_sql[0] += 1
+            g.metrics_sql[1] += elapsed
+            origin = 'request'
+        else:
+            origin = 'background'
+        statements.inc(origin)
+        seconds.inc(origin, amount=elapsed)
+
+
+def init_metrics(app, db):
+    """Liga a instrumentação (``METRICS_ENABLED``) e registra ``/metrics``"""
+    if not app.config['METRICS_ENABLED']:
+        return
+    registry = app.extensions['metrics'] = MetricsRegistry()
+
+    requests_total = registry.counter(
+        'http_requests_total', 'Requisições atendidas', ['method', 'endpoint', 'status'])
+    latency = registry.histogram(
+        'http_request_duration_seconds', 'Tempo até a resposta ficar pronta',
+        ['method', 'endpoint'])
+    sql_per_request = registry.histogram(
+        'http_request_sql_statements', 'Comandos SQL por requisição',
+        ['endpoint'], buckets=SQL_COUNT_BUCKETS)
+    sql_time = registry.histogram(
+        'http_request_sql_seconds', 'Tempo no banco por requisição', ['endpoint'])
+    statements = registry.counter(
+        'db_statements_total', 'Comandos SQL executados', ['origin'])
+    statement_seconds = registry.counter(
+        'db_statement_seconds_total', 'Tempo total dos comandos SQL', ['origin'])
+    _register_collectors(registry, app)
+
+    with app.app_context():
+        _instrument_engine(db.engine, statements, statement_seconds)
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql = [0, 0.0]
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        # Só o nome da rota como rótulo: URLs com ids não multiplicam as séries
+        endpoint = request.endpoint or 'none'
+        latency.observe(time.perf_counter() - started, request.method, endpoint)
+        requests_total.inc(request.method, endpoint, str(response.status_code))
+        count, elapsed = g.pop('metrics_sql')
+        sql_per_request.observe(count, endpoint)
+        sql_time.observe(elapsed, endpoint)
+        return response
+
+    def metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule(app.config['METRICS_PATH'], 'metrics', metrics)
@@ -1,7 +1,13 @@
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.covers import cover_url
+from app.identity import invalidate_identity
+from app.search import register_search_ddl
+from app.passwords import get_hasher
+from app.terms import TERM_FIELDS, book_terms
 from flask_login import UserMixin
-from datetime import datetime
+from sqlalchemy import bindparam, event, inspect, select
+from sqlalchemy.orm import object_session
+from datetime import date, datetime
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -10,17 +16,22 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Contador desnormalizado de livros, mantido pelos eventos de Book (ver touch_collection)
+    book_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Versão da coleção: muda a cada escrita em livros do usuário (validador dos GETs condicionais)
+    collection_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    collection_updated_at = db.Column(db.DateTime, nullable=True)
     
     # Relacionamento com livros
     books = db.relationship('Book', backref='owner', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        """Define a senha do usuário com hash"""
-        self.password_hash = generate_password_hash(password)
+        """Define a senha do usuário com hash (no pool de hash; pode levantar HashPoolSaturated)"""
+        self.password_hash = get_hasher().hash(password)
 
     def check_password(self, password):
-        """Verifica se a senha está correta"""
-        return check_password_hash(self.password_hash, password)
+        """Verifica se a senha está correta (no pool de hash; pode levantar HashPoolSaturated)"""
+        return get_hasher().verify(self.password_hash, password)
 
     def __repr__(self):
         return f'<User {self.nickname}>'
@@ -31,18 +42,38 @@ class User(UserMixin, db.Model):
             'nickname': self.nickname,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'total_books': len(self.books)
+            'total_books': self.book_count or 0
         }
 
 class Book(db.Model):
     __tablename__ = 'books'
+    # Índices compostos para os padrões de acesso por usuário (ver routes.get_books/get_stats)
+    __table_args__ = (
+        db.Index('ix_books_user_created_at', 'user_id', 'created_at'),
+        db.Index('ix_books_user_title', 'user_id', 'title'),
+        db.Index('ix_books_user_author', 'user_id', 'author'),
+        db.Index('ix_books_user_year', 'user_id', 'year'),
+        db.Index('ix_books_user_rating', 'user_id', 'rating'),
+        db.Index('ix_books_user_status_rating', 'user_id', 'reading_status', 'rating'),
+        # Varredura do enriquecimento: pendentes (NULL) em ordem de id
+        db.Index('ix_books_enriched_at_id', 'enriched_at', 'id'),
+        db.Index('ix_books_cover_hash', 'cover_hash'),
+        # Sincronização incremental: alterações do usuário em ordem de versão
+        db.Index('ix_books_user_version', 'user_id', 'version', 'id'),
+        # Um mesmo ISBN por coleção (NULL não conflita; ver app.isbn)
+        db.Index('ix_books_user_isbn', 'user_id', 'isbn', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     author = db.Column(db.String(255), nullable=False)
     year = db.Column(db.Integer)
     genre = db.Column(db.String(255))
     description = db.Column(db.Text)
+    # ISBN-13 normalizado (ver app.isbn.normalize_isbn)
+    isbn = db.Column(db.String(13), nullable=True)
     cover_image_url = db.Column(db.String(500), nullable=True)
+    # SHA-256 da cópia local da capa (NULL = ainda não baixada; ver app.covers)
+    cover_hash = db.Column(db.String(64), nullable=True)
     
     # NOVOS CAMPOS: Rating e Status de Leitura
     rating = db.Column(db.Integer, default=0)  # 0-5 estrelas, 0 = sem avaliação
@@ -50,6 +81,10 @@ class Book(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Última passagem do enriquecimento de metadados (NULL = pendente; ver app.enrichment)
+    enriched_at = db.Column(db.DateTime, nullable=True)
+    # collection_version do dono na última escrita deste livro (ver app.sync)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Chave estrangeira para o usuário
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -57,7 +92,12 @@ class Book(db.Model):
     def __repr__(self):
         return f'<Book {self.title}>'
 
-    def to_dict(self):
+    def to_dict(self, fields=None):
+        """Representação da API; ``fields`` limita às chaves pedidas (ver BOOK_FIELDS)"""
+        if fields is not None:
+            # Só lê as colunas pedidas: as demais podem não ter sido carregadas (load_only)
+            return {name: getter(self) for name, getter in _BOOK_GETTERS.items() if name in fields}
+        # Caminho completo como literal: mais rápido que iterar _BOOK_GETTERS
         return {
             'id': self.id,
             'title': self.title,
@@ -65,10 +105,340 @@ class Book(db.Model):
             'year': self.year,
             'genre': self.genre,
             'description': self.description,
-            'cover_image_url': self.cover_image_url,
+            'isbn': self.isbn,
+            # Cópia local quando a capa já foi baixada; a URL original fica em cover_source_url
+            'cover_image_url': cover_url(self.cover_hash) if self.cover_hash else self.cover_image_url,
+            'cover_thumbnail_url': cover_url(self.cover_hash, 'sm') if self.cover_hash else self.cover_image_url,
+            'cover_source_url': self.cover_image_url,
             'rating': self.rating,
             'reading_status': self.reading_status,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'user_id': self.user_id
         }
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+# Chaves de Book.to_dict(fields), na ordem da resposta (mesmos valores do caminho completo)
+_BOOK_GETTERS = {
+    'id': lambda book: book.id,
+    'title': lambda book: book.title,
+    'author': lambda book: book.author,
+    'year': lambda book: book.year,
+    'genre': lambda book: book.genre,
+    'description': lambda book: book.description,
+    'isbn': lambda book: book.isbn,
+    'cover_image_url': lambda book: cover_url(book.cover_hash) if book.cover_hash else book.cover_image_url,
+    'cover_thumbnail_url': lambda book: cover_url(book.cover_hash, 'sm') if book.cover_hash else book.cover_image_url,
+    'cover_source_url': lambda book: book.cover_image_url,
+    'rating': lambda book: book.rating,
+    'reading_status': lambda book: book.reading_status,
+    'created_at': lambda book: _isoformat(book.created_at),
+    'updated_at': lambda book: _isoformat(book.updated_at),
+    'user_id': lambda book: book.user_id,
+}
+
+# Colunas que cada chave de to_dict lê (fields= carrega só estas; ver queries.book_columns)
+BOOK_FIELDS = {
+    'id': ('id',),
+    'title': ('title',),
+    'author': ('author',),
+    'year': ('year',),
+    'genre': ('genre',),
+    'description': ('description',),
+    'isbn': ('isbn',),
+    'cover_image_url': ('cover_image_url', 'cover_hash'),
+    'cover_thumbnail_url': ('cover_image_url', 'cover_hash'),
+    'cover_source_url': ('cover_image_url',),
+    'rating': ('rating',),
+    'reading_status': ('reading_status',),
+    'created_at': ('created_at',),
+    'updated_at': ('updated_at',),
+    'user_id': ('user_id',),
+}
+
+# Menor ano aceito em create/update (o mesmo do formulário, static/js/add_book.js)
+MIN_YEAR = 1000
+
+
+class InvalidYear(ValueError):
+    """Ano que não é inteiro ou está fora do intervalo aceito"""
+
+
+def validate_year(value):
+    """Ano opcional de um livro: ``None`` ou inteiro entre MIN_YEAR e o ano que vem"""
+    if value is None:
+        return None
+    max_year = date.today().year + 1
+    if isinstance(value, bool) or not isinstance(value, int) or not MIN_YEAR <= value <= max_year:
+        raise InvalidYear(f'year deve ser um inteiro entre {MIN_YEAR} e {max_year}')
+    return value
+
+
+class BookTombstone(db.Model):
+    """Registro de um livro removido, para a sincronização incremental (app.sync)"""
+    __tablename__ = 'book_tombstones'
+    __table_args__ = (
+        db.Index('ix_book_tombstones_user_version', 'user_id', 'version'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Sem chave estrangeira: o livro não existe mais
+    book_id = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class BackgroundJob(db.Model):
+    """Estado de um trabalho em segundo plano (app.jobs), visível a todos os processos"""
+    __tablename__ = 'jobs'
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    status = db.Column(db.String(10), nullable=False)
+    error = db.Column(db.Text)
+    # JSON do dicionário de progresso do trabalho
+    progress = db.Column(db.Text, nullable=False, default='{}')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, index=True)
+
+
+def current_collection_version(user_id):
+    """``collection_version`` do usuário como subconsulta (``user_id`` pode ser uma coluna).
+
+    Depois de ``touch_collection`` na mesma transação, é a versão que a
+    escrita deve gravar em ``books.version``/``book_tombstones.version``.
+    """
+    users = User.__table__
+    return select(users.c.collection_version).where(users.c.id == user_id).scalar_subquery()
+
+
+def record_tombstones(connection, user_id, where):
+    """Grava as remoções dos livros de ``where``; chamar antes do DELETE e depois de touch_collection"""
+    books = Book.__table__
+    tombstones = BookTombstone.__table__
+    return connection.execute(
+        tombstones.insert().from_select(
+            ['user_id', 'book_id', 'version', 'deleted_at'],
+            select(books.c.user_id, books.c.id, current_collection_version(user_id),
+                   db.literal(datetime.utcnow(), db.DateTime)).where(where)
+        )
+    ).rowcount
+
+
+def touch_collection(connection, user_id, book_delta=0):
+    """Registra uma escrita na coleção do usuário sem carregá-la.
+
+    Incrementa ``collection_version`` (que invalida os ETags), atualiza
+    ``collection_updated_at`` e soma ``book_delta`` ao contador de livros.
+    Escritas em massa (Core) que não disparam os eventos do ORM devem chamar
+    esta função na mesma transação, antes da escrita nos livros, e gravar
+    ``current_collection_version`` em ``books.version`` (e nas remoções, ver
+    ``record_tombstones``). Chamar antes também serializa os escritores da
+    mesma coleção na linha do usuário.
+    """
+    users = User.__table__
+    connection.execute(
+        users.update()
+        .where(users.c.id == user_id)
+        .values(
+            book_count=users.c.book_count + book_delta,
+            collection_version=users.c.collection_version + 1,
+            collection_updated_at=datetime.utcnow(),
+            # Mantém updated_at: escrever na coleção não é uma alteração do usuário
+            updated_at=users.c.updated_at
+        )
+    )
+    invalidate_identity(user_id)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    # Troca de senha/nickname ou remoção: a identidade cacheada fica inválida
+    invalidate_identity(target.id)
+
+
+@event.listens_for(Book, 'before_insert')
+def _book_inserting(mapper, connection, target):
+    touch_collection(connection, target.user_id, 1)
+    target.version = current_collection_version(target.user_id)
+
+
+@event.listens_for(Book, 'before_update')
+def _book_updating(mapper, connection, target):
+    # before_update também é chamado sem alterações de coluna: só versiona o que muda
+    if not object_session(target).is_modified(target, include_collections=False):
+        return
+    touch_collection(connection, target.user_id)
+    target.version = current_collection_version(target.user_id)
+
+
+@event.listens_for(Book, 'after_delete')
+def _book_deleted(mapper, connection, target):
+    touch_collection(connection, target.user_id, -1)
+    connection.execute(
+        BookTombstone.__table__.insert().values(
+            user_id=target.user_id, book_id=target.id,
+            version=current_collection_version(target.user_id), deleted_at=datetime.utcnow()
+        )
+    )
+
+
+# ==================== AUTORES E GÊNEROS ====================
+
+class Genre(db.Model):
+    """Gênero normalizado; os livros se ligam a ele por book_genres (ver sync_book_terms)"""
+    __tablename__ = 'genres'
+    id = db.Column(db.Integer, primary_key=True)
+    # Chave de comparação (app.terms.term_key): "Ficção" e "ficcao" são o mesmo gênero
+    normalized_name = db.Column(db.String(255), nullable=False, unique=True)
+    # Grafia do primeiro livro que usou o termo
+    name = db.Column(db.String(255), nullable=False)
+
+
+class Author(db.Model):
+    """Autor normalizado; os livros se ligam a ele por book_authors (ver sync_book_terms)"""
+    __tablename__ = 'authors'
+    id = db.Column(db.Integer, primary_key=True)
+    normalized_name = db.Column(db.String(255), nullable=False, unique=True)
+    name = db.Column(db.String(255), nullable=False)
+
+
+# Ligações livro -> termo. O dono do livro é repetido aqui para que o filtro por
+# gênero e as contagens distintas por usuário fiquem inteiros no índice
+# (user_id, termo, livro), sem passar pela tabela de livros.
+book_genres = db.Table(
+    'book_genres',
+    db.Column('book_id', db.Integer, db.ForeignKey('books.id'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id'), primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('users.id'), nullable=False),
+    db.Index('ix_book_genres_user_genre', 'user_id', 'genre_id', 'book_id'),
+)
+
+book_authors = db.Table(
+    'book_authors',
+    db.Column('book_id', db.Integer, db.ForeignKey('books.id'), primary_key=True),
+    db.Column('author_id', db.Integer, db.ForeignKey('authors.id'), primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('users.id'), nullable=False),
+    db.Index('ix_book_authors_user_author', 'user_id', 'author_id', 'book_id'),
+)
+
+# campo de Book -> (tabela de termos, tabela de ligação, coluna do termo na ligação)
+TERM_TABLES = {
+    'author': (Author.__table__, book_authors, book_authors.c.author_id),
+    'genre': (Genre.__table__, book_genres, book_genres.c.genre_id),
+}
+
+
+def _insert_ignore(table):
+    """INSERT que pula as linhas cuja chave única já existe (SQLite e MySQL)"""
+    return (table.insert()
+            .prefix_with('OR IGNORE', dialect='sqlite')
+            .prefix_with('IGNORE', dialect='mysql')
+            .prefix_with('IGNORE', dialect='mariadb'))
+
+
+def _ensure_terms(connection, terms_table, terms):
+    """Cria os termos ``{chave: grafia}`` que ainda não existem"""
+    connection.execute(
+        _insert_ignore(terms_table),
+        [{'normalized_name': key, 'name': name} for key, name in terms.items()]
+    )
+
+
+def sync_book_terms(connection, books, fields=TERM_FIELDS, replace=True):
+    """Liga os livros aos autores/gêneros dos seus campos de texto.
+
+    ``books`` são mapeamentos com ``id``, ``user_id`` e os campos de
+    ``fields`` (linhas de SELECT ou dicionários); com ``replace`` as ligações
+    anteriores desses livros são apagadas antes. Escritas Core que mudam autor
+    ou gênero devem chamar esta função na mesma transação; o ORM chama pelos
+    eventos de Book.
+    """
+    books = list(books)
+    if not books:
+        return
+    for field in fields:
+        terms_table, links, term_column = TERM_TABLES[field]
+        if replace:
+            connection.execute(links.delete().where(links.c.book_id.in_([book['id'] for book in books])))
+
+        terms, pairs = {}, []
+        for book in books:
+            for key, name in book_terms(book[field]).items():
+                terms.setdefault(key, name)
+                pairs.append({'b_book_id': book['id'], 'b_user_id': book['user_id'], 'b_key': key})
+        if not pairs:
+            continue
+        _ensure_terms(connection, terms_table, terms)
+        # Um INSERT ... SELECT por par (executemany): o id do termo vem da chave
+        connection.execute(
+            links.insert().from_select(
+                ['book_id', 'user_id', term_column.name],
+                select(bindparam('b_book_id', type_=db.Integer), bindparam('b_user_id', type_=db.Integer),
+                       terms_table.c.id)
+                .where(terms_table.c.normalized_name == bindparam('b_key'))
+            ),
+            pairs
+        )
+
+
+def set_book_terms(connection, where, field, value):
+    """Liga todos os livros de ``where`` ao mesmo ``value`` (alteração em lote), sem trazê-los.
+
+    ``where`` não pode depender das próprias ligações (o filtro por gênero
+    depende): ele é avaliado de novo depois que elas são apagadas.
+    """
+    books = Book.__table__
+    terms_table, links, term_column = TERM_TABLES[field]
+    selected = select(books.c.id).where(where)
+    connection.execute(links.delete().where(links.c.book_id.in_(selected)))
+
+    terms = book_terms(value)
+    if not terms:
+        return
+    _ensure_terms(connection, terms_table, terms)
+    connection.execute(
+        links.insert().from_select(
+            ['book_id', 'user_id', term_column.name],
+            select(books.c.id, books.c.user_id, terms_table.c.id)
+            .select_from(books.join(terms_table, terms_table.c.normalized_name.in_(terms)))
+            .where(where)
+        )
+    )
+
+
+def delete_book_terms(connection, book_ids):
+    """Apaga as ligações dos livros (antes do DELETE dos livros)"""
+    for _, links, _ in TERM_TABLES.values():
+        connection.execute(links.delete().where(links.c.book_id.in_(book_ids)))
+
+
+def _term_values(book):
+    return {'id': book.id, 'user_id': book.user_id, 'author': book.author, 'genre': book.genre}
+
+
+@event.listens_for(Book, 'after_insert')
+def _book_inserted(mapper, connection, target):
+    sync_book_terms(connection, [_term_values(target)], replace=False)
+
+
+@event.listens_for(Book, 'after_update')
+def _book_updated(mapper, connection, target):
+    state = inspect(target)
+    fields = [field for field in TERM_FIELDS if state.attrs[field].history.has_changes()]
+    if fields:
+        sync_book_terms(connection, [_term_values(target)], fields)
+
+
+@event.listens_for(Book, 'before_delete')
+def _book_deleting(mapper, connection, target):
+    delete_book_terms(connection, [target.id])
+
+
+# Índice de busca textual (FULLTEXT no MySQL, FTS5 no SQLite)
+register_search_ddl(Book.__table__)
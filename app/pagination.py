@@ -0,0 +1,125 @@
+"""Paginação por cursor (keyset) para listagens ordenadas por (coluna, id).
+
+Em vez de OFFSET, cada página continua a partir da última chave vista, então
+páginas profundas custam o mesmo que a primeira e não é preciso COUNT(*).
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql.expression import asc, desc
+
+
+class InvalidCursor(ValueError):
+    """Cursor malformado ou gerado para outra ordenação"""
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(sort_key, value, row_id, direction):
+    """Gera um cursor opaco (base64 url-safe de um JSON compacto)"""
+    payload = {'s': sort_key, 'v': _dump_value(value), 'i': row_id, 'd': direction}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_key):
+    """Decodifica um cursor e valida que ele pertence à ordenação atual"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        value = _load_value(payload['v'])
+        row_id = int(payload['i'])
+        direction = payload['d']
+        cursor_sort = payload['s']
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise InvalidCursor('Cursor inválido')
+
+    if cursor_sort != sort_key or direction not in ('next', 'prev'):
+        raise InvalidCursor('Cursor não corresponde à ordenação atual')
+    return value, row_id, direction
+
+
+def _after(column, id_column, value, row_id, descending):
+    """Condição "vem depois de (value, row_id)" na ordem dada.
+
+    NULLs ficam no início da ordem ascendente e no fim da descendente, que é
+    o comportamento padrão tanto do MySQL quanto do SQLite.
+    """
+    if not descending:
+        if value is None:
+            return or_(and_(column.is_(None), id_column > row_id), column.isnot(None))
+        return or_(column > value, and_(column == value, id_column > row_id))
+
+    if value is None:
+        return and_(column.is_(None), id_column < row_id)
+    return or_(
+        column < value,
+        and_(column == value, id_column < row_id),
+        column.is_(None)
+    )
+
+
+def keyset_query(query, sort_key, column, id_column, descending, per_page, cursor=None):
+    """Monta a consulta de uma página por cursor.
+
+    Retorna ``(query, reverse)``; ``reverse`` indica que a consulta percorre a
+    ordem invertida (página anterior) e o resultado precisa ser desinvertido.
+    """
+    reverse = False
+    if cursor:
+        value, row_id, direction = decode_cursor(cursor, sort_key)
+        # Para voltar, percorre a ordem invertida e depois desinverte
+        reverse = direction == 'prev'
+        query = query.filter(
+            _after(column, id_column, value, row_id, descending != reverse)
+        )
+
+    order = desc if descending != reverse else asc
+    return query.order_by(order(column), order(id_column)).limit(per_page + 1), reverse
+
+
+def keyset_page(query, sort_key, column, id_column, descending, per_page, cursor=None):
+    """Busca uma página a partir de ``cursor`` (ou a primeira página).
+
+    Retorna ``(items, next_cursor, prev_cursor)``. ``query`` não deve ter
+    ORDER BY: a ordenação (coluna, id) é aplicada aqui.
+    """
+    page_query, reverse = keyset_query(
+        query, sort_key, column, id_column, descending, per_page, cursor
+    )
+    rows = page_query.all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if reverse:
+        rows.reverse()
+
+    if not rows:
+        return rows, None, None
+
+    def make_cursor(row, to):
+        return encode_cursor(sort_key, getattr(row, column.key), row.id, to)
+
+    if reverse:
+        has_next = True
+        has_prev = has_more
+    else:
+        has_next = has_more
+        has_prev = bool(cursor)
+
+    next_cursor = make_cursor(rows[-1], 'next') if has_next else None
+    prev_cursor = make_cursor(rows[0], 'prev') if has_prev else None
+    return rows, next_cursor, prev_cursor
@@ -0,0 +1,107 @@
+"""Hash de senhas fora dos workers de requisição.
+
+``generate_password_hash``/``check_password_hash`` são propositalmente caros.
+``PasswordHasher`` os executa em um pool de processos (sem disputar o GIL)
+com fila limitada: quando o pool está saturado a chamada falha na hora com
+``HashPoolSaturated`` e a rota responde 503; o mesmo vale para uma operação
+que passe de ``PASSWORD_HASH_TIMEOUT`` segundos.
+
+O método/custo vem de ``PASSWORD_HASH_METHOD``; hashes gravados com
+parâmetros antigos são refeitos no próximo login bem-sucedido.
+
+Os processos do pool usam 'spawn' e reimportam o módulo principal: scripts
+que criam o app precisam do guarda ``if __name__ == '__main__'``.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashPoolSaturated(RuntimeError):
+    """Fila do pool de hash cheia (ou operação fora do prazo); o cliente deve tentar mais tarde"""
+
+
+def hash_method_of(password_hash):
+    """Parte do método do hash do werkzeug ('scrypt:32768:8:1$salt$hash')"""
+    return password_hash.split('$', 1)[0]
+
+
+class PasswordHasher:
+    """Executa hash/verificação em até ``workers`` processos.
+
+    Com ``workers=0`` roda no próprio processo (desenvolvimento). No máximo
+    ``workers + max_queue`` operações ficam pendentes ao mesmo tempo.
+    """
+
+    def __init__(self, method='scrypt', workers=2, max_queue=32, timeout=30):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # Hash de referência: define os parâmetros atuais e serve de alvo
+        # para usuários inexistentes, igualando o tempo de resposta
+        self.dummy_hash = generate_password_hash('dummy-password', method=method)
+        self.current_method = hash_method_of(self.dummy_hash)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            method=config['PASSWORD_HASH_METHOD'],
+            workers=config['PASSWORD_HASH_WORKERS'],
+            max_queue=config['PASSWORD_HASH_MAX_QUEUE'],
+            timeout=config['PASSWORD_HASH_TIMEOUT'],
+        )
+
+    def _pool(self):
+        # Criado sob demanda e com 'spawn': não herda threads/conexões do
+        # processo pai nem é copiado quando o servidor faz fork dos workers
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashPoolSaturated('Pool de hash de senhas saturado')
+        try:
+            future = self._pool().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # A vaga só volta quando a operação termina: um hash fora do prazo
+        # continua ocupando um processo do pool
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()  # ainda na fila: nem chega a rodar
+            raise HashPoolSaturated('Hash de senha excedeu o tempo limite')
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Verifica a senha; ``password_hash=None`` compara com o hash fictício"""
+        valid = self._run(check_password_hash, password_hash or self.dummy_hash, password)
+        return valid and password_hash is not None
+
+    def needs_rehash(self, password_hash):
+        return hash_method_of(password_hash) != self.current_method
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_hasher():
+    return current_app.extensions['password_hasher']
@@ -0,0 +1,104 @@
+"""Construção das consultas de livros compartilhada entre rotas e scripts.
+
+Manter os filtros em um único lugar garante que ``get_books``, as operações
+em lote e o script de EXPLAIN enxerguem exatamente as mesmas consultas.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+
+from app import db
+
+from app.models import BOOK_FIELDS, Book, Genre, book_genres
+from app.search import apply_search
+from app.terms import term_key
+
+READING_STATUSES = ['want_to_read', 'reading', 'read']
+
+# Colunas ordenáveis por sort_by (created_at é o padrão)
+SORT_COLUMNS = {
+    'title': Book.title,
+    'author': Book.author,
+    'year': Book.year,
+    'created_at': Book.created_at,
+}
+
+
+def resolve_sort(sort_by):
+    """Normaliza sort_by para uma chave de SORT_COLUMNS"""
+    return sort_by if sort_by in SORT_COLUMNS else 'created_at'
+
+
+def parse_fields(value):
+    """``fields=title,author`` -> conjunto de chaves de to_dict (None = todas).
+
+    ``id`` sempre entra; chaves desconhecidas levantam ``ValueError``.
+    """
+    if not value:
+        return None
+    fields = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = fields - set(BOOK_FIELDS)
+    if unknown:
+        raise ValueError(f'Campos desconhecidos: {", ".join(sorted(unknown))}')
+    fields.add('id')
+    return fields
+
+
+def book_columns(fields, *extra):
+    """Opção load_only com as colunas de ``fields`` (mais ``extra``, ex.: a ordenação)"""
+    columns = {Book.id, *extra}
+    for field in fields:
+        columns.update(getattr(Book, name) for name in BOOK_FIELDS[field])
+    return load_only(*columns)
+
+
+def filter_books_query(user_id, args):
+    """Aplica os filtros de ``get_books`` (search, genre, status, min_rating).
+
+    ``args`` pode ser ``request.args`` ou um dicionário comum. Retorna
+    ``(query, relevance)``; ``relevance`` só existe quando há busca textual
+    com ranking. ``genre`` casa com qualquer um dos gêneros do livro, sem
+    diferenciar acentos e maiúsculas (ver app.terms).
+    """
+    search_query = (args.get('search') or '').strip()
+    genre_filter = (args.get('genre') or '').strip()
+    status_filter = (args.get('status') or '').strip()
+    try:
+        rating_filter = int(args.get('min_rating') or 0)
+    except (ValueError, TypeError):
+        rating_filter = 0
+
+    # 1. Filtrar apenas livros do usuário
+    books_query = Book.query.filter_by(user_id=user_id)
+
+    # 2. Aplicar Filtros de Busca e Gênero
+    relevance = None
+    if search_query:
+        books_query, relevance = apply_search(books_query, Book, search_query)
+
+    if genre_filter and genre_filter.lower() != 'todos':
+        # Igualdade no gênero normalizado, pelo índice (user_id, genre_id, book_id);
+        # cada livro tem no máximo uma ligação com o gênero, então o JOIN não duplica
+        genre_id = select(Genre.id).where(Genre.normalized_name == term_key(genre_filter)).scalar_subquery()
+        books_query = books_query.join(book_genres, book_genres.c.book_id == Book.id).filter(
+            book_genres.c.user_id == user_id, book_genres.c.genre_id == genre_id
+        )
+
+    # Filtros de Status de Leitura e Avaliacao
+    if status_filter and status_filter in READING_STATUSES:
+        books_query = books_query.filter(Book.reading_status == status_filter)
+
+    if rating_filter and rating_filter > 0:
+        books_query = books_query.filter(Book.rating >= rating_filter)
+
+    return books_query, relevance
+
+
+def books_by_isbn(user_id, isbns):
+    """``{isbn: id}`` dos livros do usuário com esses ISBNs (um SELECT pelo índice único)"""
+    isbns = {isbn for isbn in isbns if isbn}
+    if not isbns:
+        return {}
+    rows = db.session.execute(
+        select(Book.isbn, Book.id).where(Book.user_id == user_id, Book.isbn.in_(isbns))
+    )
+    return {isbn: book_id for isbn, book_id in rows}
@@ -0,0 +1,141 @@
+"""Auditoria de consultas SQL por requisição (desenvolvimento e homologação).
+
+Com ``QUERY_AUDIT`` ligado (padrão: só no modo debug) cada comando executado
+durante uma requisição é registrado pelos eventos ``before_cursor_execute`` /
+``after_cursor_execute`` do engine e, ao final da requisição:
+
+- comandos com o mesmo SQL repetidos ``QUERY_AUDIT_REPEAT_LIMIT`` vezes ou
+  mais são registrados no log como provável N+1 (com a contagem de execuções
+  idênticas, mesmo SQL e mesmos parâmetros);
+- o total é comparado com o orçamento da rota (``@query_budget(n)``); acima
+  dele a requisição falha com ``QueryBudgetExceeded`` quando
+  ``QUERY_BUDGET_STRICT`` está ligado (padrão: em ``TESTING``) e só gera um
+  aviso no log caso contrário.
+
+Comandos mais lentos que ``QUERY_AUDIT_SLOW_MS`` (dentro ou fora de
+requisições) vão para o log com o plano de execução (EXPLAIN).
+"""
+import time
+from collections import Counter
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """A rota executou mais comandos SQL que o orçamento declarado"""
+
+
+def query_budget(limit):
+    """Declara quantos comandos SQL a rota executa no pior caso esperado"""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def _explain(conn, statement, parameters):
+    """Plano de execução do comando, na própria conexão"""
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return '\n'.join('  ' + ' | '.join(str(value) for value in row) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def _shorten(parameters):
+    """Parâmetros para o log, sem despejar textos longos (hashes, sinopses)"""
+    if isinstance(parameters, (list, tuple)):
+        return type(parameters)(_shorten(value) for value in parameters)
+    if isinstance(parameters, dict):
+        return {key: _shorten(value) for key, value in parameters.items()}
+    if isinstance(parameters, str) and len(parameters) > 40:
+        return parameters[:20] + '...'
+    return parameters
+
+
+def _log_slow(conn, statement, parameters, elapsed, executemany):
+    logger = current_app.logger
+    where = request.endpoint if has_request_context() else 'segundo plano'
+    plan = ''
+    if not executemany and statement.lstrip().upper().startswith('SELECT'):
+        try:
+            plan = '\nPlano:\n' + _explain(conn, statement, parameters)
+        except Exception as e:  # o diagnóstico nunca derruba a consulta auditada
+            plan = f'\nPlano indisponível: {e}'
+    logger.warning('Consulta lenta (%.1f ms) em %s:\n%s\nParâmetros: %r%s',
+                   elapsed * 1000, where, statement, _shorten(parameters), plan)
+
+
+def _instrument_engine(engine, slow_seconds):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('audit_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('audit_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        if has_request_context() and 'audit_queries' in g:
+            g.audit_queries.append((statement, repr(parameters)))
+        if slow_seconds is not None and elapsed >= slow_seconds and has_app_context():
+            _log_slow(conn, statement, parameters, elapsed, executemany)
+
+
+def _report(queries, repeat_limit):
+    """Avisos de N+1: ``[(vezes, idênticas, sql)]`` dos comandos repetidos"""
+    by_statement = Counter(statement for statement, _ in queries)
+    identical = Counter(queries)
+    repeated = []
+    for statement, times in by_statement.most_common():
+        if times < repeat_limit:
+            break
+        same = max(count for (text, _), count in identical.items() if text == statement)
+        repeated.append((times, same, statement))
+    return repeated
+
+
+def init_query_audit(app, db):
+    """Liga a auditoria conforme ``QUERY_AUDIT`` (None = só com debug)"""
+    enabled = app.config['QUERY_AUDIT']
+    if enabled is None:
+        enabled = app.debug
+    if not enabled:
+        return
+    strict = app.config['QUERY_BUDGET_STRICT']
+    if strict is None:
+        strict = app.testing
+    repeat_limit = app.config['QUERY_AUDIT_REPEAT_LIMIT']
+    slow_ms = app.config['QUERY_AUDIT_SLOW_MS']
+
+    with app.app_context():
+        _instrument_engine(db.engine, slow_ms / 1000 if slow_ms is not None else None)
+
+    @app.before_request
+    def start_query_audit():
+        g.audit_queries = []
+
+    @app.after_request
+    def finish_query_audit(response):
+        queries = g.pop('audit_queries', None)
+        if queries is None:
+            return response
+        endpoint = request.endpoint or 'none'
+        response.headers['X-Query-Count'] = str(len(queries))
+
+        for times, same, statement in _report(queries, repeat_limit):
+            app.logger.warning('Possível N+1 em %s: %d execuções (%d idênticas) de\n%s',
+                               endpoint, times, same, statement)
+
+        view = app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        if budget is not None and len(queries) > budget:
+            message = f'{endpoint} executou {len(queries)} comandos SQL (orçamento: {budget})'
+            if strict:
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(message)
+        return response
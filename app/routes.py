@@ -1,27 +1,55 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, current_app, Response, stream_with_context, send_file, abort
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
-from app.models import Book, User
+from app.models import Book, InvalidYear, User, validate_year
+from app.autocomplete import AUTOCOMPLETE_FIELDS, DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS, book_values, record_book_change, suggest
+from app.batch import BatchRequestError, batch_delete, batch_update
+from app.conditional import collection_etag, collection_state, make_etag, not_modified, with_validators
+from app.covers import cover_url, schedule_cover, schedule_missing_covers, sniff_mimetype
+from app.enrichment import run_enrichment
+from app.exports import (
+    content_disposition, csv_chunks, export_filename, iter_export_rows, json_chunks, ndjson_chunks
+)
+from app.facets import get_book_facets
+from app.imports import IMPORT_FORMATS, detect_import_format, run_import
+from app.isbn import InvalidISBN, normalize_isbn, try_normalize_isbn
+from app.passwords import HashPoolSaturated, get_hasher
+from app.pagination import InvalidCursor, keyset_page
+from app.query_audit import query_budget
+from app.queries import SORT_COLUMNS, book_columns, books_by_isbn, filter_books_query, parse_fields, resolve_sort
+from app.stats import get_user_stats
+from app.sync import DEFAULT_CHANGES_LIMIT, MAX_CHANGES_LIMIT, collection_changes
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql.expression import asc, desc
+from werkzeug.exceptions import RequestEntityTooLarge
 import requests
-import urllib.parse
+import os
+import re
+import shutil
+import tempfile
 
 main = Blueprint('main', __name__)
 
+# Limite de itens por página no modo cursor; a paginação por número de página segue sem limite
+MAX_PER_PAGE = 100
+
 # ==================== ROTAS DE AUTENTICAÇÃO ====================
 
 @main.route('/register')
+@query_budget(0)
 def register_page():
     """Página de registro"""
     return render_template('register.html')
 
 @main.route('/login')
+@query_budget(0)
 def login_page():
     """Página de login"""
     return render_template('login.html')
 
 @main.route('/api/register', methods=['POST'])
+@query_budget(3)
 def register():
     """API para registrar um novo usuário"""
     data = request.get_json()
@@ -45,7 +73,10 @@ def register():
     
     # Criar novo usuário
     user = User(nickname=nickname)
-    user.set_password(password)
+    try:
+        user.set_password(password)
+    except HashPoolSaturated:
+        return _server_busy()
     
     try:
         db.session.add(user)
@@ -56,6 +87,7 @@ def register():
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
 @main.route('/api/login', methods=['POST'])
+@query_budget(2)  # usuário + rehash da senha quando o método mudou
 def login():
     """API para fazer login"""
     data = request.get_json()
@@ -69,9 +101,25 @@ def login():
     # Buscar usuário
     user = User.query.filter_by(nickname=nickname).first()
     
-    if not user or not user.check_password(password):
+    # Nickname inexistente também passa pelo hash (contra um hash fictício),
+    # para não revelar pelo tempo de resposta quais nicknames existem
+    hasher = get_hasher()
+    try:
+        valid = hasher.verify(user.password_hash if user else None, password)
+    except HashPoolSaturated:
+        return _server_busy()
+    
+    if not valid:
         return jsonify({'error': 'Nickname ou senha incorretos'}), 401
     
+    # Hash gravado com método/custo antigo: refaz com os parâmetros atuais
+    if hasher.needs_rehash(user.password_hash):
+        try:
+            user.set_password(password)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+    
     # Fazer login
     login_user(user)
     return jsonify({
@@ -79,7 +127,14 @@ def login():
         'user': user.to_dict()
     }), 200
 
+def _server_busy():
+    """Resposta rápida quando o pool de hash de senhas está saturado"""
+    response = jsonify({'error': 'Servidor ocupado, tente novamente em instantes'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @main.route('/api/logout', methods=['POST'])
+@query_budget(1)
 @login_required
 def logout():
     """API para fazer logout"""
@@ -87,6 +142,7 @@ def logout():
     return jsonify({'message': 'Logout realizado com sucesso!'}), 200
 
 @main.route('/api/current-user', methods=['GET'])
+@query_budget(1)
 def current_user_info():
     """API para obter informações do usuário atual"""
     if current_user.is_authenticated:
@@ -100,17 +156,20 @@ def current_user_info():
 # ==================== ROTAS PRINCIPAIS ====================
 
 @main.route('/')
+@query_budget(1)
 def index():
     """Página principal - lista todos os livros do usuário"""
     return render_template('index.html')
 
 @main.route('/add-book')
+@query_budget(1)
 @login_required
 def add_book_page():
     """Página para adicionar livro"""
     return render_template('add_book.html')
 
 @main.route('/edit-book/<int:book_id>')
+@query_budget(2)
 @login_required
 def edit_book_page(book_id):
     """Página para editar livro"""
@@ -121,19 +180,17 @@ def edit_book_page(book_id):
 # ==================== API DE LIVROS ====================
 
 @main.route('/api/books', methods=['GET'])
+@query_budget(5)  # usuário + versão da coleção + COUNT + página + facetas (só com o cache frio)
 @login_required
 def get_books():
     """API para obter todos os livros do usuário atual com filtros, ordenação e paginação"""
-    search_query = request.args.get('search', '').strip()
-    genre_filter = request.args.get('genre', '').strip()
-    
-    # NOVO: Parametros de Filtro por Status e Avaliacao
-    status_filter = request.args.get('status', '').strip()
-    try:
-        rating_filter = int(request.args.get('min_rating', 0))
-    except (ValueError, TypeError):
-        rating_filter = 0
-    
+    # GET condicional: a versão da coleção decide antes de qualquer consulta de livros
+    version, last_modified = collection_state(current_user.id)
+    etag = collection_etag(current_user.id, version)
+    unchanged = not_modified(etag, last_modified)
+    if unchanged is not None:
+        return unchanged
+
     # Parâmetros de Ordenação
     sort_by = request.args.get('sort_by', 'created_at') # Padrão: data de criação
     order = request.args.get('order', 'desc') # Padrão: descendente
@@ -142,52 +199,79 @@ def get_books():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
 
-    # 1. Filtrar apenas livros do usuário atual
-    books_query = Book.query.filter_by(user_id=current_user.id)
+    # Modo cursor (opt-in): 'cursor=' vazio pede a primeira página
+    cursor = request.args.get('cursor')
+    with_total = request.args.get('with_total', '').lower() in ('1', 'true')
+    with_facets = request.args.get('facets', '').lower() in ('1', 'true')
 
-    # 2. Aplicar Filtros de Busca e Gênero
-    if search_query:
-        books_query = books_query.filter(
-            (Book.title.ilike(f'%{search_query}%')) |
-            (Book.author.ilike(f'%{search_query}%')) |
-            (Book.genre.ilike(f'%{search_query}%'))
-        )
-    
-    if genre_filter and genre_filter.lower() != 'todos':
-        books_query = books_query.filter(Book.genre.ilike(f'%{genre_filter}%'))
-    
-    # NOVO: Aplicar Filtros de Status de Leitura e Avaliacao
-    if status_filter and status_filter in ['want_to_read', 'reading', 'read']:
-        books_query = books_query.filter(Book.reading_status == status_filter)
-    
-    if rating_filter and rating_filter > 0:
-        books_query = books_query.filter(Book.rating >= rating_filter)
+    # Campos esparsos: fields=title,author,... carrega só as colunas necessárias
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # 1-2. Filtrar livros do usuário atual (busca, gênero, status, avaliação)
+    books_query, relevance = filter_books_query(current_user.id, request.args)
 
     # 3. Aplicar Ordenação
     sort_column = None
-    if sort_by == 'title':
-        sort_column = Book.title
-    elif sort_by == 'author':
-        sort_column = Book.author
-    elif sort_by == 'year':
-        sort_column = Book.year
-    else: # Default: created_at
-        sort_column = Book.created_at
-        
+    if sort_by == 'relevance' and relevance is not None:
+        if cursor is not None:
+            return jsonify({'error': 'Ordenação por relevância não suporta paginação por cursor'}), 400
+        # Relevância: mais relevante primeiro, desempate pelos mais recentes
+        books_query = books_query.order_by(desc(relevance), desc(Book.created_at))
+    else: # Default: created_at (também usado quando não há ranking)
+        sort_by = resolve_sort(sort_by)
+        sort_column = SORT_COLUMNS[sort_by]
+
+    if fields is not None:
+        # A coluna de ordenação entra sempre: o cursor é montado a partir dela
+        books_query = books_query.options(book_columns(fields, *([sort_column] if sort_column else [])))
+
+    # 4a. Paginação por cursor (keyset): sem OFFSET e sem COUNT(*) obrigatório
+    if cursor is not None:
+        per_page = max(1, min(per_page, MAX_PER_PAGE))
+        total = books_query.order_by(None).count() if with_total else None
+        try:
+            books, next_cursor, prev_cursor = keyset_page(
+                books_query, sort_by, sort_column, Book.id,
+                descending=(order != 'asc'), per_page=per_page, cursor=cursor
+            )
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Capas removidas pelo limite do cache (ou que falharam) voltam para a fila
+        schedule_missing_covers(current_user.id, books)
+        payload = {
+            'books': [book.to_dict(fields) for book in books],
+            'pagination': {
+                'total': total,
+                'per_page': per_page,
+                'has_next': next_cursor is not None,
+                'has_prev': prev_cursor is not None,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor
+            }
+        }
+        if with_facets:
+            payload['facets'] = get_book_facets(current_user.id, version, request.args)
+        return with_validators(jsonify(payload), etag, last_modified)
+
     if sort_column:
         if order == 'asc':
             books_query = books_query.order_by(asc(sort_column))
         else:
             books_query = books_query.order_by(desc(sort_column))
 
-    # 4. Aplicar Paginação
+    # 4b. Aplicar Paginação
     # Usamos o método paginate do SQLAlchemy para lidar com a paginação
     paginated_books = books_query.paginate(page=page, per_page=per_page, error_out=False)
 
     # 5. Preparar a resposta
-    books_list = [book.to_dict() for book in paginated_books.items]
+    schedule_missing_covers(current_user.id, paginated_books.items)
+    books_list = [book.to_dict(fields) for book in paginated_books.items]
     
-    return jsonify({
+    payload = {
         'books': books_list,
         'pagination': {
             'total': paginated_books.total,
@@ -199,16 +283,43 @@ def get_books():
             'next_num': paginated_books.next_num,
             'prev_num': paginated_books.prev_num
         }
-    })
+    }
+    # Contagens por gênero, status, avaliação e década (ver app.facets)
+    if with_facets:
+        payload['facets'] = get_book_facets(current_user.id, version, request.args)
+    return with_validators(jsonify(payload), etag, last_modified)
+
+@main.route('/api/books/changes', methods=['GET'])
+@query_budget(4)  # usuário + versão da coleção + livros + remoções
+@login_required
+def get_book_changes():
+    """API de sincronização incremental: livros alterados e removidos desde ``since``"""
+    since = request.args.get('since', 0, type=int)
+    after_id = request.args.get('after_id', type=int)
+    deleted_after = request.args.get('deleted_after', type=int)
+    limit = request.args.get('limit', DEFAULT_CHANGES_LIMIT, type=int)
+    if since < 0:
+        return jsonify({'error': 'since deve ser um número inteiro não negativo'}), 400
+    limit = max(1, min(limit, MAX_CHANGES_LIMIT))
+
+    return jsonify(collection_changes(current_user.id, since, after_id, limit, deleted_after))
 
 @main.route('/api/books/<int:book_id>', methods=['GET'])
+@query_budget(2)
 @login_required
 def get_book(book_id):
     """API para obter um livro específico do usuário atual"""
     book = Book.query.filter_by(id=book_id, user_id=current_user.id).first_or_404()
-    return jsonify(book.to_dict())
+    # Validador do próprio livro: muda com updated_at e com a capa cacheada
+    etag = make_etag(book.id, book.updated_at, book.cover_hash)
+    unchanged = not_modified(etag, book.updated_at)
+    if unchanged is not None:
+        return unchanged
+    schedule_missing_covers(current_user.id, [book])
+    return with_validators(jsonify(book.to_dict()), etag, book.updated_at)
 
 @main.route('/api/books', methods=['POST'])
+@query_budget(8)  # + termos e ligações de autor e gênero (2 cada)
 @login_required
 def create_book():
     """API para criar um novo livro para o usuário atual"""
@@ -216,13 +327,20 @@ def create_book():
     
     if not data or not data.get('title') or not data.get('author'):
         return jsonify({'error': 'Título e autor são obrigatórios'}), 400
+
+    try:
+        isbn = normalize_isbn(data.get('isbn'))
+        year = validate_year(data.get('year'))
+    except (InvalidISBN, InvalidYear) as e:
+        return jsonify({'error': str(e)}), 400
     
     book = Book(
         title=data['title'],
         author=data['author'],
-        year=data.get('year'),
+        year=year,
         genre=data.get('genre'),
         description=data.get('description'),
+        isbn=isbn,
         cover_image_url=data.get('cover_image_url'),
         rating=data.get('rating', 0),  # NOVO: Rating (padrão 0)
         reading_status=data.get('reading_status', 'want_to_read'),  # NOVO: Status de leitura
@@ -232,12 +350,23 @@ def create_book():
     try:
         db.session.add(book)
         db.session.commit()
+        schedule_cover(book)
+        record_book_change(current_user.id, book.version, added=book_values(book))
         return jsonify(book.to_dict()), 201
+    except IntegrityError:
+        db.session.rollback()
+        return _duplicate_isbn_response(isbn)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+def _duplicate_isbn_response(isbn):
+    """409 com o livro da coleção que já usa o ISBN (índice único (user_id, isbn))"""
+    existing = books_by_isbn(current_user.id, [isbn]).get(isbn)
+    return jsonify({'error': 'Este livro (ISBN) já está na sua coleção', 'book_id': existing}), 409
+
 @main.route('/api/books/<int:book_id>', methods=['PUT'])
+@query_budget(11)  # + ligações de autor e gênero, quando mudam (3 cada)
 @login_required
 def update_book(book_id):
     """API para atualizar um livro do usuário atual"""
@@ -246,6 +375,7 @@ def update_book(book_id):
     
     if not data:
         return jsonify({'error': 'Dados não fornecidos'}), 400
+    previous = book_values(book)
     
     # Atualizar campos
     if 'title' in data:
@@ -253,13 +383,24 @@ def update_book(book_id):
     if 'author' in data:
         book.author = data['author']
     if 'year' in data:
-        book.year = data['year']
+        try:
+            book.year = validate_year(data['year'])
+        except InvalidYear as e:
+            return jsonify({'error': str(e)}), 400
     if 'genre' in data:
         book.genre = data['genre']
     if 'description' in data:
         book.description = data['description']
-    if 'cover_image_url' in data:
+    if 'isbn' in data:
+        try:
+            book.isbn = normalize_isbn(data['isbn'])
+        except InvalidISBN as e:
+            return jsonify({'error': str(e)}), 400
+    # A URL local devolvida por to_dict (capa cacheada) não é uma troca de capa
+    if 'cover_image_url' in data and data['cover_image_url'] not in (
+            book.cover_image_url, book.cover_hash and cover_url(book.cover_hash)):
         book.cover_image_url = data['cover_image_url']
+        book.cover_hash = None
     if 'rating' in data:  # NOVO: Atualizar rating
         book.rating = data['rating']
     if 'reading_status' in data:  # NOVO: Atualizar status de leitura
@@ -267,59 +408,112 @@ def update_book(book_id):
     
     try:
         db.session.commit()
+        schedule_cover(book)
+        record_book_change(current_user.id, book.version, removed=previous, added=book_values(book))
         return jsonify(book.to_dict()), 200
+    except IntegrityError:
+        db.session.rollback()
+        return _duplicate_isbn_response(normalize_isbn(data.get('isbn')))
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
 @main.route('/api/books/<int:book_id>', methods=['DELETE'])
+@query_budget(8)  # + ligações de autor e gênero + versão da coleção quando há índice de sugestões
 @login_required
 def delete_book(book_id):
     """API para deletar um livro do usuário atual"""
     book = Book.query.filter_by(id=book_id, user_id=current_user.id).first_or_404()
+    previous = book_values(book)
     
     try:
         db.session.delete(book)
         db.session.commit()
+        record_book_change(current_user.id, removed=previous)
         return jsonify({'message': 'Livro deletado com sucesso'}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+# ==================== API DE LIVROS EM LOTE ====================
+
+@main.route('/api/books', methods=['PATCH'])
+@query_budget(10)  # + ligações de autor e gênero, quando mudam (3 cada) + livros com capa nova
+@login_required
+def update_books():
+    """API para atualizar vários livros do usuário atual em uma transação"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'Dados não fornecidos'}), 400
+
+    try:
+        updated = batch_update(current_user.id, data)
+    except BatchRequestError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+    return jsonify({'message': f'{updated} livro(s) atualizado(s)', 'updated': updated}), 200
+
+@main.route('/api/books', methods=['DELETE'])
+@query_budget(7)  # + ligações de autor e gênero
+@login_required
+def delete_books():
+    """API para deletar vários livros do usuário atual em uma transação"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'Dados não fornecidos'}), 400
+
+    try:
+        deleted = batch_delete(current_user.id, data)
+    except BatchRequestError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+    return jsonify({'message': f'{deleted} livro(s) deletado(s)', 'deleted': deleted}), 200
+
 # ==================== API DE ESTATÍSTICAS ====================
 
 @main.route('/api/stats', methods=['GET'])
+@query_budget(3)  # usuário + versão da coleção + agregados (só com o cache de estatísticas frio)
 @login_required
 def get_stats():
     """API para obter estatísticas dos livros do usuário atual"""
-    # Total de livros do usuário
-    total_books = Book.query.filter_by(user_id=current_user.id).count()
-    
-    # Gêneros únicos do usuário
-    genres = db.session.query(Book.genre).filter(
-        Book.user_id == current_user.id,
-        Book.genre.isnot(None),
-        Book.genre != ''
-    ).distinct().all()
-    unique_genres = len([g[0] for g in genres if g[0]])
-    
-    # Autores únicos do usuário
-    authors = db.session.query(Book.author).filter(
-        Book.user_id == current_user.id,
-        Book.author.isnot(None),
-        Book.author != ''
-    ).distinct().all()
-    unique_authors = len([a[0] for a in authors if a[0]])
-    
-    return jsonify({
-        'total_books': total_books,
-        'unique_genres': unique_genres,
-        'unique_authors': unique_authors
-    })
+    # Total, gêneros/autores únicos, contagem por status, histograma de
+    # avaliações e livros por ano; vem do cache enquanto a coleção não muda
+    version, last_modified = collection_state(current_user.id)
+    etag = collection_etag(current_user.id, version)
+    unchanged = not_modified(etag, last_modified)
+    if unchanged is not None:
+        return unchanged
+    # Corpo da mesma versão do ETag: o cache é por (usuário, versão)
+    return with_validators(jsonify(get_user_stats(current_user.id, version)), etag, last_modified)
 
 # ==================== API GOOGLE BOOKS ====================
 
+@main.route('/api/autocomplete', methods=['GET'])
+@query_budget(3)  # usuário + versão da coleção + montagem do índice (só na primeira vez)
+@login_required
+def autocomplete():
+    """API de sugestões de autor/gênero por prefixo para os formulários"""
+    field = request.args.get('field', '')
+    if field not in AUTOCOMPLETE_FIELDS:
+        return jsonify({'error': f'field deve ser um de: {", ".join(AUTOCOMPLETE_FIELDS)}'}), 400
+    prefix = request.args.get('prefix', '').strip()
+    limit = request.args.get('limit', DEFAULT_SUGGESTIONS, type=int)
+    limit = max(1, min(limit, MAX_SUGGESTIONS))
+
+    return jsonify({
+        'field': field,
+        'prefix': prefix,
+        'suggestions': suggest(current_user.id, field, prefix, limit)
+    })
+
 @main.route('/api/search-google-books', methods=['GET'])
+@query_budget(2)  # usuário + livros da página já na coleção (por ISBN)
 @login_required
 def search_google_books():
     """API para buscar livros na Google Books API"""
@@ -329,64 +523,21 @@ def search_google_books():
         return jsonify({'error': 'Parâmetro de busca é obrigatório'}), 400
     
     try:
-        # Codifica a query para URL
-        encoded_query = urllib.parse.quote(query)
-        
-        # URL da Google Books API
-        api_url = f'https://www.googleapis.com/books/v1/volumes?q={encoded_query}&maxResults=5'
-        
-        # Faz a requisição para a Google Books API
-        response = requests.get(api_url, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        books = []
-        
-        # Processa os resultados
-        if 'items' in data:
-            for item in data['items']:
-                volume_info = item.get('volumeInfo', {})
-                
-                # Extrai as informações do livro
-                book_data = {
-                    'title': volume_info.get('title', ''),
-                    'authors': volume_info.get('authors', []),
-                    'author': ', '.join(volume_info.get('authors', [])),
-                    'publishedDate': volume_info.get('publishedDate', ''),
-                    'year': None,
-                    'description': volume_info.get('description', ''),
-                    'categories': volume_info.get('categories', []),
-                    'genre': ', '.join(volume_info.get('categories', [])),
-                    'pageCount': volume_info.get('pageCount'),
-                    'language': volume_info.get('language', ''),
-                    'thumbnail': volume_info.get('imageLinks', {}).get('thumbnail', ''),
-                    'cover_image_url': volume_info.get('imageLinks', {}).get('thumbnail', ''), # Adicionado cover_image_url
-                    'publisher': volume_info.get('publisher', ''),
-                    'isbn': None
-                }
-                
-                # Extrai o ano da data de publicação
-                if book_data['publishedDate']:
-                    try:
-                        # Tenta extrair o ano (formato pode ser YYYY, YYYY-MM, YYYY-MM-DD)
-                        year_str = book_data['publishedDate'].split('-')[0]
-                        if year_str.isdigit() and len(year_str) == 4:
-                            book_data['year'] = int(year_str)
-                    except (ValueError, IndexError):
-                        pass
-                
-                # Extrai ISBN se disponível
-                industry_identifiers = volume_info.get('industryIdentifiers', [])
-                for identifier in industry_identifiers:
-                    if identifier.get('type') in ['ISBN_13', 'ISBN_10']:
-                        book_data['isbn'] = identifier.get('identifier')
-                        break
-                
-                books.append(book_data)
+        # Cache por consulta normalizada + sessão HTTP persistente
+        result = current_app.extensions['google_books'].search(query)
+
+        # "Já na coleção": um SELECT pelo índice (user_id, isbn) para a página inteira.
+        # Os dicionários são do cache do cliente: marca cópias, não os originais
+        isbns = [try_normalize_isbn(book['isbn']) for book in result['books']]
+        owned = books_by_isbn(current_user.id, isbns)
+        books = [
+            dict(book, in_collection=isbn in owned, book_id=owned.get(isbn))
+            for book, isbn in zip(result['books'], isbns)
+        ]
         
         return jsonify({
             'success': True,
-            'totalItems': data.get('totalItems', 0),
+            'totalItems': result['totalItems'],
             'books': books
         })
         
@@ -395,107 +546,173 @@ def search_google_books():
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@main.route('/api/search-google-books/stats', methods=['GET'])
+@query_budget(1)
+@login_required
+def google_books_stats():
+    """API com os contadores do cache da Google Books API"""
+    return jsonify(current_app.extensions['google_books'].stats())
+
 
 # ==================== ROTAS DE EXPORTACAO ====================
 
+def _export_response(chunks, mimetype, extension):
+    """Resposta em streaming com o arquivo para download"""
+    filename = export_filename(current_user.nickname, extension)
+    return Response(
+        stream_with_context(chunk.encode('utf-8') for chunk in chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': content_disposition(filename)}
+    )
+
+
 @main.route('/api/books/export/csv', methods=['GET'])
+@query_budget(1)  # as consultas do streaming rodam depois da resposta
 @login_required
 def export_books_csv():
     """API para exportar todos os livros do usuario em formato CSV"""
     try:
-        # Buscar todos os livros do usuario atual
-        books = Book.query.filter_by(user_id=current_user.id).all()
-        
-        # Criar um arquivo CSV em memoria
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Escrever cabecalho
-        writer.writerow([
-            'ID', 'Titulo', 'Autor', 'Ano', 'Genero', 'Descricao', 
-            'Avaliacao', 'Status de Leitura', 'Data de Criacao'
-        ])
-        
-        # Escrever dados dos livros
-        for book in books:
-            status_labels = {
-                'want_to_read': 'Quero Ler',
-                'reading': 'Lendo',
-                'read': 'Lido'
-            }
-            status_label = status_labels.get(book.reading_status, 'Quero Ler')
-            
-            writer.writerow([
-                book.id,
-                book.title,
-                book.author,
-                book.year or '',
-                book.genre or '',
-                book.description or '',
-                book.rating or 0,
-                status_label,
-                book.created_at.strftime('%Y-%m-%d %H:%M:%S') if book.created_at else ''
-            ])
-        
-        # Preparar o arquivo para download
-        output.seek(0)
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'colecao_livros_{current_user.nickname}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        )
-    
+        rows = iter_export_rows(current_user.id)
+        return _export_response(csv_chunks(rows), 'text/csv', 'csv')
     except Exception as e:
         return jsonify({'error': f'Erro ao exportar para CSV: {str(e)}'}), 500
 
 
 @main.route('/api/books/export/json', methods=['GET'])
+@query_budget(1)
 @login_required
 def export_books_json():
     """API para exportar todos os livros do usuario em formato JSON"""
     try:
-        # Buscar todos os livros do usuario atual
-        books = Book.query.filter_by(user_id=current_user.id).all()
-        
-        # Preparar dados para JSON
-        books_data = []
-        for book in books:
-            status_labels = {
-                'want_to_read': 'Quero Ler',
-                'reading': 'Lendo',
-                'read': 'Lido'
-            }
-            status_label = status_labels.get(book.reading_status, 'Quero Ler')
-            
-            books_data.append({
-                'id': book.id,
-                'titulo': book.title,
-                'autor': book.author,
-                'ano': book.year,
-                'genero': book.genre,
-                'descricao': book.description,
-                'avaliacao': book.rating or 0,
-                'status_leitura': status_label,
-                'url_capa': book.cover_image_url,
-                'data_criacao': book.created_at.isoformat() if book.created_at else None
-            })
-        
-        # Preparar o JSON com metadados
-        export_data = {
-            'usuario': current_user.nickname,
-            'data_exportacao': datetime.now().isoformat(),
-            'total_livros': len(books_data),
-            'livros': books_data
-        }
-        
-        # Retornar como download
-        return send_file(
-            io.BytesIO(json.dumps(export_data, ensure_ascii=False, indent=2).encode('utf-8')),
-            mimetype='application/json',
-            as_attachment=True,
-            download_name=f'colecao_livros_{current_user.nickname}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-        )
-    
+        rows = iter_export_rows(current_user.id)
+        chunks = json_chunks(current_user.nickname, current_user.book_count, rows)
+        return _export_response(chunks, 'application/json', 'json')
     except Exception as e:
         return jsonify({'error': f'Erro ao exportar para JSON: {str(e)}'}), 500
+
+
+@main.route('/api/books/export/ndjson', methods=['GET'])
+@query_budget(1)
+@login_required
+def export_books_ndjson():
+    """API para exportar todos os livros do usuario em JSON Lines (um livro por linha)"""
+    try:
+        rows = iter_export_rows(current_user.id)
+        return _export_response(ndjson_chunks(rows), 'application/x-ndjson', 'ndjson')
+    except Exception as e:
+        return jsonify({'error': f'Erro ao exportar para NDJSON: {str(e)}'}), 500
+
+
+# ==================== ROTAS DE IMPORTACAO ====================
+
+@main.route('/api/books/import', methods=['POST'])
+@query_budget(3)  # usuário + limpeza e registro do trabalho na tabela jobs
+@login_required
+def import_books():
+    """API para importar livros em massa (CSV, JSON ou NDJSON) em segundo plano"""
+    try:
+        upload = request.files.get('file')
+    except RequestEntityTooLarge:
+        return _upload_too_large()
+    fmt = detect_import_format(
+        request.args.get('format') or request.form.get('format'),
+        upload.filename if upload else None,
+        request.mimetype
+    )
+    if fmt is None:
+        return jsonify({'error': f'Formato inválido. Use um de: {", ".join(IMPORT_FORMATS)}'}), 400
+
+    dry_run = (request.args.get('dry_run') or request.form.get('dry_run') or '').lower() in ('1', 'true')
+    batch_size = request.args.get('batch_size', current_app.config['IMPORT_BATCH_SIZE'], type=int)
+    batch_size = max(1, min(batch_size, current_app.config['IMPORT_MAX_BATCH_SIZE']))
+
+    # Copia o corpo para um arquivo temporário: o trabalho roda depois da resposta
+    fd, path = tempfile.mkstemp(prefix='import_', suffix=f'.{fmt}')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            shutil.copyfileobj(upload.stream if upload else request.stream, output)
+        job = current_app.extensions['jobs'].submit(
+            'import', current_user.id, run_import,
+            path, fmt, current_user.id, batch_size, dry_run, persist=True
+        )
+    except RequestEntityTooLarge:
+        os.unlink(path)
+        return _upload_too_large()
+    except Exception:
+        # O trabalho (que apagaria o arquivo) não foi agendado
+        os.unlink(path)
+        raise
+    return jsonify({
+        'job': job.to_dict(),
+        'status_url': url_for('main.import_status', job_id=job.id)
+    }), 202
+
+def _upload_too_large():
+    limit = current_app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    return jsonify({'error': f'Arquivo maior que o limite de {limit} MB'}), 413
+
+@main.route('/api/books/import/<job_id>', methods=['GET'])
+@query_budget(2)  # usuário + trabalho (quando roda em outro processo)
+@login_required
+def import_status(job_id):
+    """API para acompanhar o progresso de uma importação"""
+    job = current_app.extensions['jobs'].get(job_id, user_id=current_user.id)
+    if job is None or job.kind != 'import':
+        return jsonify({'error': 'Importação não encontrada'}), 404
+    return jsonify(job.to_dict())
+
+
+
+# ==================== ROTAS DE ENRIQUECIMENTO ====================
+
+@main.route('/api/books/enrich', methods=['POST'])
+@query_budget(3)  # usuário + limpeza e registro do trabalho na tabela jobs
+@login_required
+def enrich_books():
+    """API para completar capa, ano e gênero dos livros do usuário em segundo plano"""
+    config = current_app.config
+    job = current_app.extensions['jobs'].submit(
+        'enrich', current_user.id, run_enrichment,
+        current_user.id, config['ENRICH_BATCH_SIZE'],
+        config['ENRICH_CONCURRENCY'], config['ENRICH_RATE_LIMIT'], persist=True
+    )
+    return jsonify({
+        'job': job.to_dict(),
+        'status_url': url_for('main.enrich_status', job_id=job.id)
+    }), 202
+
+@main.route('/api/books/enrich/<job_id>', methods=['GET'])
+@query_budget(2)  # usuário + trabalho (quando roda em outro processo)
+@login_required
+def enrich_status(job_id):
+    """API para acompanhar o progresso de um enriquecimento"""
+    job = current_app.extensions['jobs'].get(job_id, user_id=current_user.id)
+    if job is None or job.kind != 'enrich':
+        return jsonify({'error': 'Enriquecimento não encontrado'}), 404
+    return jsonify(job.to_dict())
+
+
+# ==================== CAPAS CACHEADAS ====================
+
+_COVER_HASH = re.compile(r'[0-9a-f]{64}')
+
+@main.route('/covers/<cover_hash>', methods=['GET'])
+@main.route('/covers/<cover_hash>/<size>', methods=['GET'])
+@query_budget(0)
+def get_cover(cover_hash, size=None):
+    """Serve uma capa cacheada; o conteúdo de um hash nunca muda"""
+    store = current_app.extensions.get('cover_store')
+    if store is None or not _COVER_HASH.fullmatch(cover_hash):
+        abort(404)
+    path = store.path(cover_hash, size)
+    if path is None:
+        abort(404)
+
+    with open(path, 'rb') as f:
+        mimetype = sniff_mimetype(f.read(16)) or 'application/octet-stream'
+    # ETag forte: mesmo hash e tamanho = mesmos bytes
+    response = send_file(path, mimetype=mimetype, etag=f'{cover_hash}-{size or "original"}',
+                         max_age=31536000, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
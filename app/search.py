@@ -0,0 +1,130 @@
+"""Busca textual indexada sobre título, autor, gênero e descrição dos livros.
+
+No MySQL é usado um índice FULLTEXT (MATCH ... AGAINST em modo booleano) e no
+SQLite uma tabela virtual FTS5 (``books_fts``) mantida por triggers. Para
+qualquer outro banco cai-se no ILIKE antigo.
+"""
+import re
+
+from sqlalchemy import DDL, event, func, literal_column, select, table, column
+from sqlalchemy.dialects import mysql
+
+# Tokens de busca: sequências de letras/dígitos (inclui acentos)
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# InnoDB ignora termos menores que innodb_ft_min_token_size (3 por padrão)
+MYSQL_MIN_TOKEN_SIZE = 3
+
+# Colunas cobertas pelo índice, na mesma ordem em todos os bancos
+SEARCH_COLUMNS = ('title', 'author', 'genre', 'description')
+
+FTS_TABLE = 'books_fts'
+
+# ==================== DDL ====================
+
+MYSQL_FULLTEXT_DDL = (
+    'CREATE FULLTEXT INDEX ix_books_fulltext ON books (title, author, genre, description)'
+)
+
+SQLITE_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, author, genre, description,
+        content='books', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, author, genre, description)
+        VALUES (new.id, new.title, new.author, new.genre, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, genre, description)
+        VALUES ('delete', old.id, old.title, old.author, old.genre, old.description);
+    END""",
+    # Só as colunas indexadas: capa, avaliação, versão etc. não reescrevem o índice
+    f"""CREATE TRIGGER IF NOT EXISTS books_fts_au
+        AFTER UPDATE OF title, author, genre, description ON books BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, author, genre, description)
+        VALUES ('delete', old.id, old.title, old.author, old.genre, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, author, genre, description)
+        VALUES (new.id, new.title, new.author, new.genre, new.description);
+    END""",
+]
+
+
+def register_search_ddl(books_table):
+    """Garante que db.create_all() também crie o índice de busca"""
+    event.listen(
+        books_table, 'after_create',
+        DDL(MYSQL_FULLTEXT_DDL).execute_if(dialect=('mysql', 'mariadb'))
+    )
+    for statement in SQLITE_FTS_DDL:
+        event.listen(
+            books_table, 'after_create',
+            DDL(statement).execute_if(dialect='sqlite')
+        )
+
+
+# ==================== CONSULTA ====================
+
+def tokenize(search_query):
+    """Quebra a busca do usuário em termos simples (sem operadores)"""
+    return _TOKEN_RE.findall(search_query.lower())
+
+
+def _sqlite_match_expression(tokens):
+    # Cada termo entre aspas (neutraliza a sintaxe FTS5) e com '*' para prefixo
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _mysql_match_expression(tokens):
+    # '+' exige o termo e '*' faz a busca por prefixo
+    return ' '.join(f'+{token}*' for token in tokens)
+
+
+def apply_search(query, model, search_query):
+    """Aplica a busca textual em ``query``.
+
+    Retorna a tupla ``(query, relevance)``, onde ``relevance`` é uma expressão
+    para ordenar por relevância (maior primeiro) ou ``None`` quando o banco
+    não oferece ranking.
+    """
+    tokens = tokenize(search_query)
+    if not tokens:
+        return query, None
+
+    dialect = query.session.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        fts = table(FTS_TABLE, column('rowid'), column('rank'))
+        matches = (
+            select(fts.c.rowid.label('book_id'), fts.c.rank.label('rank'))
+            .where(literal_column(FTS_TABLE).op('MATCH')(_sqlite_match_expression(tokens)))
+            .subquery()
+        )
+        query = query.join(matches, matches.c.book_id == model.id)
+        # bm25 do FTS5 é negativo: quanto menor, mais relevante
+        return query, -matches.c.rank
+
+    short_tokens = tokens
+    relevance = None
+
+    if dialect in ('mysql', 'mariadb'):
+        indexed_tokens = [t for t in tokens if len(t) >= MYSQL_MIN_TOKEN_SIZE]
+        short_tokens = [t for t in tokens if len(t) < MYSQL_MIN_TOKEN_SIZE]
+        if indexed_tokens:
+            relevance = mysql.match(
+                *(getattr(model, name) for name in SEARCH_COLUMNS),
+                against=_mysql_match_expression(indexed_tokens)
+            ).in_boolean_mode()
+            query = query.filter(relevance)
+
+    # Fallback sem índice: busca por substring em cada termo restante
+    for token in short_tokens:
+        pattern = f'%{token}%'
+        query = query.filter(
+            model.title.ilike(pattern) |
+            model.author.ilike(pattern) |
+            model.genre.ilike(pattern) |
+            func.coalesce(model.description, '').ilike(pattern)
+        )
+    return query, relevance
@@ -0,0 +1,96 @@
+"""Estatísticas da coleção por usuário, calculadas em uma consulta e cacheadas.
+
+O cache fica em ``current_app.extensions['stats_cache']`` com a chave
+``(usuário, collection_version)``: qualquer escrita na coleção, em qualquer
+processo, muda a versão, então não há invalidação a fazer e um worker nunca
+serve as estatísticas de uma versão anterior.
+"""
+from flask import current_app
+from sqlalchemy import case, distinct, func, select
+
+from app import db
+from app.conditional import collection_state
+from app.models import Book, book_authors, book_genres
+from app.queries import READING_STATUSES
+
+RATINGS = range(0, 6)
+
+
+def stats_query(user_id):
+    """Uma única consulta agregada, agrupada por ano.
+
+    Contagens por status e avaliação vêm de SUM(CASE ...) em cada grupo e os
+    totais distintos de gêneros/autores de subconsultas escalares, então o
+    banco responde tudo em uma ida.
+    """
+    status = func.coalesce(Book.reading_status, 'want_to_read')
+    rating = func.coalesce(Book.rating, 0)
+
+    # Termos normalizados (app.terms): só o índice (user_id, termo, livro) é lido
+    unique_genres = (
+        select(func.count(distinct(book_genres.c.genre_id)))
+        .where(book_genres.c.user_id == user_id)
+        .scalar_subquery()
+    )
+    unique_authors = (
+        select(func.count(distinct(book_authors.c.author_id)))
+        .where(book_authors.c.user_id == user_id)
+        .scalar_subquery()
+    )
+
+    columns = [Book.year, func.count(Book.id)]
+    columns += [func.sum(case((status == s, 1), else_=0)) for s in READING_STATUSES]
+    columns += [func.sum(case((rating == r, 1), else_=0)) for r in RATINGS]
+    columns += [unique_genres, unique_authors]
+
+    return select(*columns).where(Book.user_id == user_id).group_by(Book.year)
+
+
+def compute_stats(user_id):
+    """Executa ``stats_query`` e monta o dicionário da resposta"""
+    by_status = dict.fromkeys(READING_STATUSES, 0)
+    histogram = dict.fromkeys((str(r) for r in RATINGS), 0)
+    per_year = []
+    total = unique_genres = unique_authors = 0
+
+    n_status = len(READING_STATUSES)
+    for row in db.session.execute(stats_query(user_id)):
+        year, count = row[0], row[1]
+        status_counts = row[2:2 + n_status]
+        rating_counts = row[2 + n_status:2 + n_status + len(RATINGS)]
+        unique_genres, unique_authors = row[-2], row[-1]
+
+        total += count
+        per_year.append({'year': year, 'count': count})
+        for s, n in zip(READING_STATUSES, status_counts):
+            by_status[s] += n or 0
+        for r, n in zip(RATINGS, rating_counts):
+            histogram[str(r)] += n or 0
+
+    # Livros sem ano por último
+    per_year.sort(key=lambda item: (item['year'] is None, item['year'] or 0))
+
+    return {
+        'total_books': total,
+        'unique_genres': unique_genres,
+        'unique_authors': unique_authors,
+        'by_status': by_status,
+        'rating_histogram': histogram,
+        'books_per_year': per_year,
+    }
+
+
+def _cache():
+    return current_app.extensions['stats_cache']
+
+
+def get_user_stats(user_id, version=None):
+    """Estatísticas da coleção na versão ``version`` (lida do banco se omitida), do cache quando possível"""
+    if version is None:
+        version, _ = collection_state(user_id)
+    key = (user_id, version)
+    stats = _cache().get(key)
+    if stats is None:
+        stats = compute_stats(user_id)
+        _cache().set(key, stats)
+    return stats
@@ -0,0 +1,99 @@
+"""Sincronização incremental da coleção (``GET /api/books/changes``).
+
+Toda escrita em um livro grava em ``books.version`` a ``collection_version``
+do dono naquela transação, e toda remoção deixa um registro em
+``book_tombstones`` com a versão em que aconteceu (ver
+``models.touch_collection``). Um cliente que guardou a versão da última
+sincronização recebe só o que mudou depois dela:
+
+- ``since=0``: cópia completa, sem remoções;
+- ``since=N``: livros com ``version > N`` e remoções com ``version > N``;
+- ``since`` maior que a versão atual (banco recriado, outro servidor): a
+  resposta vem com ``reset`` e a cópia completa.
+
+Livros e remoções formam uma única sequência por versão (remoções antes dos
+livros da mesma versão), paginada em blocos de ``limit`` itens: com
+``has_more`` o cliente repete a chamada com os parâmetros de ``next`` (a
+versão do último item e a posição em cada tabela) e, ao terminar, guarda a
+``version`` da primeira página (o que mudar durante a paginação volta na
+próxima sincronização). Livros e remoções trazem a própria versão: o cliente
+os aplica nessa ordem, o que resolve ids reaproveitados.
+
+Livros anteriores à sincronização incremental têm ``version = 0`` e só vêm na
+cópia completa.
+"""
+from sqlalchemy import and_, or_, select
+
+from app import db
+from app.conditional import collection_state
+from app.models import Book, BookTombstone
+
+# Livros por página de alterações
+DEFAULT_CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 2000
+
+
+def _after(version_column, id_column, since, after_id):
+    """``(version, id) > (since, after_id)``; sem ``after_id``, só ``version > since``"""
+    condition = version_column > since
+    if after_id is not None:
+        condition = or_(condition, and_(version_column == since, id_column > after_id))
+    return condition
+
+
+def collection_changes(user_id, since=0, after_id=None, limit=DEFAULT_CHANGES_LIMIT, deleted_after=None):
+    """Livros alterados e removidos desde ``since`` (ver o docstring do módulo)"""
+    version, _ = collection_state(user_id)
+    reset = since > version
+    if reset:
+        since, after_id, deleted_after = 0, None, None
+    if since == 0 and after_id is None:
+        after_id = 0  # cópia completa: inclui os livros anteriores à sincronização (version = 0)
+
+    books = db.session.execute(
+        select(Book).where(Book.user_id == user_id, _after(Book.version, Book.id, since, after_id))
+        .order_by(Book.version, Book.id).limit(limit + 1)
+    ).scalars().all()
+
+    deleted = []
+    if since > 0:
+        tombstones = BookTombstone.__table__
+        deleted = db.session.execute(
+            select(tombstones.c.id, tombstones.c.book_id, tombstones.c.version)
+            .where(tombstones.c.user_id == user_id,
+                   _after(tombstones.c.version, tombstones.c.id, since, deleted_after))
+            .order_by(tombstones.c.version, tombstones.c.id).limit(limit + 1)
+        ).all()
+
+    # Intercala as duas sequências por versão e corta em ``limit`` itens: cada
+    # consulta trouxe limit + 1, o bastante para saber onde a página termina
+    page_books, page_deleted = [], []
+    while len(page_books) + len(page_deleted) < limit:
+        next_book = books[len(page_books)] if len(page_books) < len(books) else None
+        next_deleted = deleted[len(page_deleted)] if len(page_deleted) < len(deleted) else None
+        if next_deleted is not None and (next_book is None or next_deleted.version <= next_book.version):
+            page_deleted.append(next_deleted)
+        elif next_book is not None:
+            page_books.append(next_book)
+        else:
+            break
+    has_more = len(page_books) < len(books) or len(page_deleted) < len(deleted)
+
+    next_page = None
+    if has_more:
+        # Posição em cada tabela dentro da versão do último item (0 = nada dela ainda)
+        last = max(item.version for item in page_books[-1:] + page_deleted[-1:])
+        next_page = {
+            'since': last,
+            'after_id': max((book.id for book in page_books if book.version == last), default=0),
+            'deleted_after': max((row.id for row in page_deleted if row.version == last), default=0),
+        }
+
+    return {
+        'version': version,
+        'reset': reset,
+        'books': [dict(book.to_dict(), version=book.version) for book in page_books],
+        'deleted': [{'id': row.book_id, 'version': row.version} for row in page_deleted],
+        'has_more': has_more,
+        'next': next_page,
+    }
@@ -0,0 +1,43 @@
+"""Normalização de autores e gêneros.
+
+Os campos ``author`` e ``genre`` continuam gravados como texto livre (é o que
+a API devolve), mas cada valor individual também é ligado a uma linha das
+tabelas ``authors``/``genres`` pela chave normalizada daqui (ver
+``models.sync_book_terms``). Valores combinados como a Google Books os grava
+(``"Ficção, Fantasia"``) viram um termo por parte.
+"""
+import unicodedata
+
+TERM_FIELDS = ('author', 'genre')
+
+# Tamanho das colunas name/normalized_name das tabelas de termos
+MAX_TERM_LENGTH = 255
+
+
+def normalize(value):
+    """Chave de comparação: sem acentos, minúsculas e espaços simples"""
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+def split_values(value):
+    """Valores individuais de um campo (a Google Books junta vários com vírgula)"""
+    if not value:
+        return []
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def term_key(value):
+    """Chave gravada em ``normalized_name`` (e usada nos filtros)"""
+    return normalize(value)[:MAX_TERM_LENGTH]
+
+
+def book_terms(value):
+    """``{chave: grafia}`` dos termos de um campo; a primeira grafia de cada chave vence"""
+    terms = {}
+    for part in split_values(value):
+        key = term_key(part)
+        if key:
+            terms.setdefault(key, part[:MAX_TERM_LENGTH])
+    return terms
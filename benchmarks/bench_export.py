@@ -0,0 +1,128 @@
+"""Benchmark das exportações em streaming: pico de RSS e tempo até o 1º byte.
+
+Uso:
+    python benchmarks/bench_export.py [--rows 1000000] [--formats csv,json,ndjson]
+                                      [--output resultado.json]
+
+Cria um banco SQLite temporário com ``--rows`` livros para um usuário e mede
+cada formato em um subprocesso novo, para que o pico de RSS de um formato não
+contamine o outro.
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from werkzeug.security import generate_password_hash
+
+from benchlib import PASSWORD, make_app, write_report
+
+NICKNAME = 'benchmark'
+
+
+def peak_rss_mb():
+    # ru_maxrss é em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed(db_path, rows):
+    from app import db
+
+    app = make_app(f'sqlite:///{db_path}')
+    with app.app_context():
+        db.create_all()
+
+    # Inserção direta: o foco é a exportação, não o caminho de escrita. O hash
+    # barato evita que o login infle o pico de RSS medido depois.
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        'INSERT INTO users (nickname, password_hash, book_count) VALUES (?, ?, ?)',
+        (NICKNAME, generate_password_hash(PASSWORD, method='pbkdf2:sha256:1000'), rows)
+    )
+    user_id = conn.execute('SELECT id FROM users WHERE nickname = ?', (NICKNAME,)).fetchone()[0]
+    now = datetime.utcnow().isoformat(sep=' ')
+    description = 'Uma descrição de tamanho típico para um livro de exemplo. ' * 4
+
+    def generate():
+        for i in range(rows):
+            yield (f'Livro {i}', f'Autor {i % 5000}', 1900 + i % 125, 'Ficção',
+                   description, i % 6, 'read', now, now, user_id)
+
+    conn.executemany(
+        'INSERT INTO books (title, author, year, genre, description, rating, '
+        'reading_status, created_at, updated_at, user_id) VALUES (?,?,?,?,?,?,?,?,?,?)',
+        generate()
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure(db_path, fmt):
+    """Roda dentro do subprocesso: exporta um formato e imprime o resultado em JSON"""
+    app = make_app(f'sqlite:///{db_path}')
+    client = app.test_client()
+    client.post('/api/login', json={'nickname': NICKNAME, 'password': PASSWORD})
+
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    response = client.get(f'/api/books/export/{fmt}', buffered=False)
+    chunks = iter(response.response)
+
+    first = next(chunks)
+    ttfb = time.perf_counter() - started
+    size = len(first)
+    for chunk in chunks:
+        size += len(chunk)
+    total = time.perf_counter() - started
+    response.close()
+
+    print(json.dumps({
+        'format': fmt,
+        'status': response.status_code,
+        'bytes': size,
+        'ttfb_ms': round(ttfb * 1000, 2),
+        'total_s': round(total, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'peak_rss_growth_mb': round(peak_rss_mb() - rss_before, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--formats', default='csv,json,ndjson')
+    parser.add_argument('--output', help='arquivo JSON para gravar os resultados')
+    parser.add_argument('--measure', nargs=2, metavar=('DB', 'FORMAT'), help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.measure:
+        measure(*options.measure)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        started = time.perf_counter()
+        seed(db_path, options.rows)
+        print(f'{options.rows} livros gerados em {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+        results = []
+        for fmt in options.formats.split(','):
+            output = subprocess.run(
+                [sys.executable, __file__, '--measure', db_path, fmt],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+
+    write_report({'benchmark': 'export', 'rows': options.rows, 'results': results}, options.output)
+
+
+if __name__ == '__main__':
+    main()
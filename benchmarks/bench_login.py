@@ -0,0 +1,111 @@
+"""Benchmark do login: logins/s e latência por método/custo de hash de senha.
+
+Uso:
+    python benchmarks/bench_login.py [--threads 8] [--duration 5]
+                                     [--methods pbkdf2:sha256:600000,scrypt:32768:8:1]
+                                     [--workers 0,2] [--output resultado.json]
+
+Para cada combinação de método e ``PASSWORD_HASH_WORKERS`` cria um usuário já
+com o hash naquele método (sem rehash durante a medição) e dispara logins de
+``--threads`` threads durante ``--duration`` segundos. Respostas 503 (pool
+saturado) são contadas à parte.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.security import generate_password_hash
+
+from benchlib import PASSWORD, make_app, summarize, write_report
+
+NICKNAME = 'benchmark'
+DEFAULT_METHODS = 'pbkdf2:sha256:100000,pbkdf2:sha256:600000,scrypt:16384:8:1,scrypt:32768:8:1'
+
+
+def run(method, workers, threads, duration, max_queue):
+    from app import db
+    from app.models import User
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(
+            f'sqlite:///{os.path.join(tmp, "bench.db")}',
+            PASSWORD_HASH_METHOD=method,
+            PASSWORD_HASH_WORKERS=workers,
+            PASSWORD_HASH_MAX_QUEUE=max_queue,
+        )
+        with app.app_context():
+            db.create_all()
+            user = User(nickname=NICKNAME)
+            user.password_hash = generate_password_hash(PASSWORD, method=method)
+            db.session.add(user)
+            db.session.commit()
+
+        # Aquece o pool (processos 'spawn' levam um tempo para subir)
+        app.test_client().post('/api/login', json={'nickname': NICKNAME, 'password': PASSWORD})
+
+        latencies = []
+        statuses = {}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            client = app.test_client()
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                status = client.post(
+                    '/api/login', json={'nickname': NICKNAME, 'password': PASSWORD}
+                ).status_code
+                elapsed = time.perf_counter() - started
+                with lock:
+                    statuses[status] = statuses.get(status, 0) + 1
+                    if status == 200:
+                        latencies.append(elapsed)
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        app.extensions['password_hasher'].shutdown()
+
+    latency = summarize(latencies)
+    return {
+        'method': method,
+        'workers': workers,
+        'threads': threads,
+        'logins': len(latencies),
+        'logins_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': latency.get('p50_ms'),
+        'p95_ms': latency.get('p95_ms'),
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--methods', default=DEFAULT_METHODS)
+    parser.add_argument('--workers', default='0,2', help='valores de PASSWORD_HASH_WORKERS')
+    parser.add_argument('--max-queue', type=int, default=32)
+    parser.add_argument('--output', help='arquivo JSON para gravar os resultados')
+    options = parser.parse_args()
+
+    results = []
+    for method in options.methods.split(','):
+        for workers in (int(w) for w in options.workers.split(',')):
+            result = run(method, workers, options.threads, options.duration, options.max_queue)
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+
+    write_report({'benchmark': 'login', 'results': results}, options.output)
+
+
+if __name__ == '__main__':
+    main()
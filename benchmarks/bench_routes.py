@@ -0,0 +1,190 @@
+"""Microbenchmark de cada rota da API, no próprio processo (test client).
+
+Uso:
+    python benchmarks/bench_routes.py [--database-url URL] [--users 5] [--books 2000]
+                                      [--seed 42] [--repeat 50] [--only get_books]
+                                      [--output resultado.json]
+
+Sem ``--database-url`` gera um SQLite temporário com ``datagen``; com ele usa
+o banco informado (já populado por ``datagen.py``) e mede como ``user00000``.
+
+Cenários:
+    get_books      cada filtro (nenhum, busca, gênero, status, avaliação, todos)
+                   x ordenação x sentido, mais OFFSET profundo, cursor, fields=
+                   e GET condicional (304)
+    changes        sincronização: cópia completa e sem alterações
+    facets         get_books com facetas, com o cache quente e frio
+    get_book       um livro por id
+    get_stats      com o cache quente e frio (cache limpo a cada chamada)
+    export         csv, json e ndjson completos
+    login          login com o hasher configurado (scrypt por padrão)
+
+Cada cenário roda ``--warmup`` vezes sem medir e ``--repeat`` vezes medindo;
+o relatório traz p50/p95/p99, média, operações/s e bytes por resposta.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from benchlib import PASSWORD, make_app, nickname, summarize, write_report
+from datagen import generate
+
+FILTERS = {
+    'none': {},
+    'search': {'search': 'canção'},
+    'genre': {'genre': 'Fantasia'},
+    'status': {'status': 'read'},
+    'min_rating': {'min_rating': 4},
+    'all': {'search': 'canção', 'genre': 'Ficção', 'status': 'read', 'min_rating': 3},
+}
+SORTS = ('created_at', 'title', 'author', 'year')
+ORDERS = ('desc', 'asc')
+LIST_FIELDS = 'title,author,year,genre,description,cover_thumbnail_url,rating,reading_status'
+
+
+class Scenario:
+    """Uma requisição repetida; ``prepare`` roda antes de cada medição"""
+
+    def __init__(self, name, method, url, expected=200, json=None, headers=None, prepare=None):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.expected = expected
+        self.json = json
+        self.headers = headers or {}
+        self.prepare = prepare
+
+
+def book_scenarios(client, per_page):
+    scenarios = []
+    for filter_name, params in FILTERS.items():
+        sorts = SORTS + (('relevance',) if 'search' in params else ())
+        for sort_by in sorts:
+            for order in ORDERS if sort_by != 'relevance' else ('desc',):
+                query = {**params, 'sort_by': sort_by, 'order': order, 'per_page': per_page}
+                scenarios.append(Scenario(
+                    f'get_books filter={filter_name} sort={sort_by} order={order}',
+                    'GET', f'/api/books?{urlencode(query)}'
+                ))
+
+    first = client.get(f'/api/books?per_page={per_page}')
+    pages = first.get_json()['pagination']['pages']
+    cursor_page = client.get(f'/api/books?per_page={per_page}&cursor=').get_json()
+    scenarios += [
+        Scenario('get_books deep offset (última página)', 'GET',
+                 f'/api/books?per_page={per_page}&page={pages}'),
+        Scenario('get_books cursor primeira página', 'GET', f'/api/books?per_page={per_page}&cursor='),
+        Scenario('get_books cursor segunda página', 'GET',
+                 f'/api/books?per_page={per_page}&{urlencode({"cursor": cursor_page["pagination"]["next_cursor"]})}'),
+        Scenario('get_books fields da listagem', 'GET',
+                 f'/api/books?per_page={per_page}&{urlencode({"fields": LIST_FIELDS})}'),
+        Scenario('get_books condicional (304)', 'GET', f'/api/books?per_page={per_page}',
+                 expected=304, headers={'If-None-Match': first.headers['ETag']}),
+        Scenario('get_book', 'GET', f'/api/books/{first.get_json()["books"][0]["id"]}'),
+        Scenario('changes cópia completa (1a página)', 'GET', '/api/books/changes?since=0'),
+        Scenario('changes sem alterações', 'GET',
+                 f'/api/books/changes?since={client.get("/api/books/changes?since=0&limit=1").get_json()["version"]}'),
+    ]
+    return scenarios
+
+
+def other_scenarios(app):
+    user = nickname(0)
+
+    def clear_stats():
+        app.extensions['stats_cache'].clear()
+
+    def clear_facets():
+        app.extensions['facets_cache'].clear()
+
+    return [
+        Scenario('get_books facetas cache quente', 'GET', '/api/books?facets=1&genre=Fantasia'),
+        Scenario('get_books facetas cache frio', 'GET', '/api/books?facets=1&genre=Fantasia',
+                 prepare=clear_facets),
+        Scenario('get_stats cache quente', 'GET', '/api/stats'),
+        Scenario('get_stats cache frio', 'GET', '/api/stats', prepare=clear_stats),
+        Scenario('export csv', 'GET', '/api/books/export/csv'),
+        Scenario('export json', 'GET', '/api/books/export/json'),
+        Scenario('export ndjson', 'GET', '/api/books/export/ndjson'),
+        Scenario('login', 'POST', '/api/login', json={'nickname': user, 'password': PASSWORD}),
+    ]
+
+
+def run(client, scenario, warmup, repeat):
+    def call():
+        if scenario.prepare:
+            scenario.prepare()
+        started = time.perf_counter()
+        response = client.open(scenario.url, method=scenario.method, json=scenario.json,
+                               headers=scenario.headers)
+        size = len(response.get_data())  # consome streams (exportações)
+        return time.perf_counter() - started, response.status_code, size
+
+    for _ in range(warmup):
+        call()
+    samples, errors, size = [], 0, 0
+    for _ in range(repeat):
+        elapsed, status, size = call()
+        if status != scenario.expected:
+            errors += 1
+        samples.append(elapsed)
+
+    result = {'name': scenario.name, 'method': scenario.method, 'url': scenario.url,
+              'status': scenario.expected, 'errors': errors, 'bytes': size}
+    result.update(summarize(samples))
+    result['ops_per_s'] = round(len(samples) / sum(samples), 1) if samples else None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='banco já populado (padrão: SQLite temporário)')
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--books', type=int, default=2000, help='livros por usuário')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--only', help='só cenários cujo nome contém este texto')
+    parser.add_argument('--output', help='arquivo JSON para gravar os resultados')
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = options.database_url
+        dataset = {'database_url': 'externo' if database_url else 'sqlite temporário'}
+        if not database_url:
+            database_url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+            dataset.update(generate(database_url, options.users, options.books, options.seed))
+
+        # Hasher no próprio processo: o login mede o custo real do scrypt
+        app = make_app(database_url, PASSWORD_HASH_WORKERS=0)
+        client = app.test_client()
+        response = client.post('/api/login', json={'nickname': nickname(0), 'password': PASSWORD})
+        if response.status_code != 200:
+            raise SystemExit(f'Login de {nickname(0)} falhou: {response.get_data(as_text=True)}')
+
+        scenarios = book_scenarios(client, options.per_page) + other_scenarios(app)
+        if options.only:
+            scenarios = [scenario for scenario in scenarios if options.only in scenario.name]
+
+        results = []
+        for scenario in scenarios:
+            result = run(client, scenario, options.warmup, options.repeat)
+            print(f"{result['name']:<60} p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms",
+                  file=sys.stderr)
+            results.append(result)
+
+    write_report({
+        'benchmark': 'routes',
+        'dataset': dataset,
+        'options': {key: value for key, value in vars(options).items()
+                    if key not in ('output', 'database_url')},
+        'results': results,
+    }, options.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Benchmark da listagem: tamanho do payload e tempo de serialização.
+
+Uso:
+    python benchmarks/bench_serialization.py [--books 1000] [--per-page 100]
+                                             [--repeat 200] [--output resultado.json]
+
+Compara ``GET /api/books`` em quatro configurações sobre o mesmo banco:
+
+    stdlib        provedor JSON padrão, todos os campos, sem compressão (antes)
+    orjson        provedor orjson, todos os campos
+    orjson+fields orjson com ``fields=`` (os campos que a listagem usa)
+    +gzip         o anterior com compressão gzip
+
+Para cada uma mede o tamanho da resposta, a mediana do tempo da requisição
+completa e, sobre os livros já carregados, o tempo de ``to_dict`` e o de
+``jsonify`` separadamente.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from werkzeug.security import generate_password_hash
+
+from benchlib import PASSWORD, make_app, write_report
+
+NICKNAME = 'benchmark'
+
+# Campos que static/js/books.js usa nos cards da listagem
+LIST_FIELDS = 'title,author,year,genre,description,cover_thumbnail_url,rating,reading_status'
+
+CONFIGS = [
+    ('stdlib', {'JSON_PROVIDER': 'stdlib', 'COMPRESS_RESPONSES': False}, None, None),
+    ('orjson', {'JSON_PROVIDER': 'orjson', 'COMPRESS_RESPONSES': False}, None, None),
+    ('orjson+fields', {'JSON_PROVIDER': 'orjson', 'COMPRESS_RESPONSES': False}, LIST_FIELDS, None),
+    ('orjson+fields+gzip', {'JSON_PROVIDER': 'orjson'}, LIST_FIELDS, 'gzip'),
+]
+
+
+def seed(db_path, books):
+    from app import db
+
+    app = make_app(f'sqlite:///{db_path}')
+    with app.app_context():
+        db.create_all()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        'INSERT INTO users (nickname, password_hash, book_count) VALUES (?, ?, ?)',
+        (NICKNAME, generate_password_hash(PASSWORD, method='pbkdf2:sha256:1000'), books)
+    )
+    user_id = conn.execute('SELECT id FROM users WHERE nickname = ?', (NICKNAME,)).fetchone()[0]
+    now = datetime.utcnow().isoformat(sep=' ')
+    # Sinopse no tamanho típico das que vêm da Google Books
+    description = 'Uma sinopse de tamanho típico, como as que chegam da Google Books. ' * 12
+    conn.executemany(
+        'INSERT INTO books (title, author, year, genre, description, cover_image_url, rating, '
+        'reading_status, created_at, updated_at, user_id) VALUES (?,?,?,?,?,?,?,?,?,?,?)',
+        ((f'Livro {i}', f'Autor {i % 300}', 1900 + i % 125, 'Ficção', description,
+          f'http://books.google.com/books/content?id={i:012d}&printsec=frontcover&img=1&zoom=1',
+          i % 6, 'read', now, now, user_id) for i in range(books))
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure(db_path, name, overrides, fields, encoding, per_page, repeat):
+    from flask import jsonify
+
+    from app.models import Book
+
+    app = make_app(f'sqlite:///{db_path}', **overrides)
+    client = app.test_client()
+    client.post('/api/login', json={'nickname': NICKNAME, 'password': PASSWORD})
+
+    url = f'/api/books?per_page={per_page}' + (f'&fields={fields}' if fields else '')
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+
+    response = client.get(url, headers=headers)
+    size = len(response.data)
+
+    request_times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        client.get(url, headers=headers)
+        request_times.append(time.perf_counter() - started)
+
+    # Serialização isolada sobre os mesmos livros: to_dict e jsonify separados
+    field_set = set(fields.split(',')) | {'id'} if fields else None
+    with app.test_request_context():
+        books = Book.query.order_by(Book.created_at.desc()).limit(per_page).all()
+        to_dict_times, dumps_times = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            payload = {'books': [book.to_dict(field_set) for book in books]}
+            to_dict_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            jsonify(payload).get_data()
+            dumps_times.append(time.perf_counter() - started)
+
+    return {
+        'config': name,
+        'bytes': size,
+        'request_ms': round(statistics.median(request_times) * 1000, 3),
+        'to_dict_ms': round(statistics.median(to_dict_times) * 1000, 3),
+        'dumps_ms': round(statistics.median(dumps_times) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=1000)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--output', help='arquivo JSON para gravar os resultados')
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        seed(db_path, options.books)
+        results = []
+        for name, overrides, fields, encoding in CONFIGS:
+            result = measure(db_path, name, overrides, fields, encoding, options.per_page, options.repeat)
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+
+    write_report({'benchmark': 'serialization', 'books': options.books,
+                  'per_page': options.per_page, 'results': results}, options.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Benchmark de vazão: servidor de desenvolvimento x gunicorn.
+
+Uso:
+    python benchmarks/bench_server.py [--books 2000] [--clients 16] [--duration 10]
+                                      [--modes dev,dev-nodebug,prod] [--output resultado.json]
+
+Cria um banco SQLite (WAL) temporário, sobe cada modo como processo separado
+e dispara ``--clients`` clientes HTTP concorrentes (sessões logadas) contra
+``GET /api/books`` e ``GET /api/stats`` durante ``--duration`` segundos.
+
+Modos:
+    dev          python run.py com FLASK_DEBUG=1 (reloader + debugger)
+    dev-nodebug  python run.py com FLASK_DEBUG=0
+    prod         gunicorn -c gunicorn.conf.py wsgi:app (WEB_CONCURRENCY/GUNICORN_THREADS)
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+from werkzeug.security import generate_password_hash
+
+from benchlib import PASSWORD, ROOT, make_app, summarize, write_report
+
+NICKNAME = 'benchmark'
+PATHS = ('/api/books?per_page=20', '/api/stats')
+
+COMMANDS = {
+    'dev': ([sys.executable, 'run.py'], {'FLASK_DEBUG': '1'}),
+    'dev-nodebug': ([sys.executable, 'run.py'], {'FLASK_DEBUG': '0'}),
+    'prod': ([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+             {'GUNICORN_ACCESS_LOG': ''}),
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def seed(db_path, books):
+    from app import db
+
+    app = make_app(f'sqlite:///{db_path}')
+    with app.app_context():
+        db.create_all()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        'INSERT INTO users (nickname, password_hash, book_count) VALUES (?, ?, ?)',
+        (NICKNAME, generate_password_hash(PASSWORD, method='pbkdf2:sha256:1000'), books)
+    )
+    user_id = conn.execute('SELECT id FROM users WHERE nickname = ?', (NICKNAME,)).fetchone()[0]
+    now = datetime.utcnow().isoformat(sep=' ')
+    conn.executemany(
+        'INSERT INTO books (title, author, year, genre, rating, reading_status, '
+        'created_at, updated_at, user_id) VALUES (?,?,?,?,?,?,?,?,?)',
+        ((f'Livro {i}', f'Autor {i % 300}', 1900 + i % 125, f'Gênero {i % 12}', i % 6,
+          ('want_to_read', 'reading', 'read')[i % 3], now, now, user_id) for i in range(books))
+    )
+    conn.commit()
+    conn.close()
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=5)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f'Servidor não respondeu em {url}')
+
+
+def load(base_url, clients, duration):
+    login = requests.Session()
+    response = login.post(f'{base_url}/api/login', json={'nickname': NICKNAME, 'password': PASSWORD})
+    response.raise_for_status()
+    cookies = login.cookies.get_dict()
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        nonlocal errors
+        session = requests.Session()
+        session.cookies.update(cookies)
+        i = index
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                ok = session.get(base_url + PATHS[i % len(PATHS)], timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            i += 1
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latency = summarize(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'req_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': latency.get('p50_ms'),
+        'p95_ms': latency.get('p95_ms'),
+    }
+
+
+def run_mode(mode, db_path, clients, duration):
+    command, extra_env = COMMANDS[mode]
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', PORT=str(port),
+               HOST='127.0.0.1', **extra_env)
+    # Sessão própria: o reloader do modo debug cria um processo filho
+    process = subprocess.Popen(command, cwd=ROOT, env=env, start_new_session=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_ready(base_url + '/login')
+        result = load(base_url, clients, duration)
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+    result.update({'mode': mode, 'clients': clients})
+    if mode == 'prod':
+        result['workers'] = env.get('WEB_CONCURRENCY', f'{os.cpu_count() * 2 + 1} (padrão)')
+        result['threads'] = env.get('GUNICORN_THREADS', '4 (padrão)')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--modes', default='dev,dev-nodebug,prod')
+    parser.add_argument('--output', help='arquivo JSON para gravar os resultados')
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        seed(db_path, options.books)
+
+        results = []
+        for mode in options.modes.split(','):
+            result = run_mode(mode, db_path, options.clients, options.duration)
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+
+    write_report({'benchmark': 'server', 'books': options.books, 'results': results}, options.output)
+
+
+if __name__ == '__main__':
+    main()
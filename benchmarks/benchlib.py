@@ -0,0 +1,92 @@
+"""Funções comuns da suíte de benchmarks (datagen, bench_routes, load, compare e bench_*).
+
+Percentis, criação do app contra um banco qualquer e gravação dos
+resultados em JSON com os metadados necessários para comparar execuções
+entre commits (commit, árvore suja, Python, CPUs, data).
+"""
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PASSWORD = 'benchmark123'
+
+
+def nickname(index):
+    """Apelido do ``index``-ésimo usuário gerado por datagen"""
+    return f'user{index:05d}'
+
+
+def make_app(database_url, **overrides):
+    """App contra ``database_url`` sem efeitos colaterais em segundo plano"""
+    from app import create_app
+
+    config = {
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'COVER_CACHE_ENABLED': False,
+        'METRICS_ENABLED': False,
+        'PASSWORD_HASH_WORKERS': 0,
+    }
+    config.update(overrides)
+    return create_app(config)
+
+
+def percentile(sorted_samples, p):
+    """Percentil por posição mais próxima (``sorted_samples`` já ordenado)"""
+    if not sorted_samples:
+        return None
+    index = max(0, math.ceil(p / 100 * len(sorted_samples)) - 1)
+    return sorted_samples[index]
+
+
+def summarize(samples):
+    """Latências em segundos -> p50/p95/p99/média em ms"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {'samples': 0}
+    ms = lambda value: round(value * 1000, 3)  # noqa: E731
+    return {
+        'samples': len(ordered),
+        'p50_ms': ms(percentile(ordered, 50)),
+        'p95_ms': ms(percentile(ordered, 95)),
+        'p99_ms': ms(percentile(ordered, 99)),
+        'mean_ms': ms(sum(ordered) / len(ordered)),
+        'max_ms': ms(ordered[-1]),
+    }
+
+
+def _git(*args):
+    try:
+        result = subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def metadata():
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def write_report(report, output=None):
+    """Imprime o relatório e, com ``output``, grava o mesmo JSON em arquivo"""
+    report = {**report, 'meta': metadata()}
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+    return report
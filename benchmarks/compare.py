@@ -0,0 +1,72 @@
+"""Compara dois relatórios JSON da suíte (bench_routes ou load).
+
+Uso:
+    python benchmarks/compare.py antes.json depois.json [--metric p50_ms]
+                                 [--threshold 10] [--fail-on-regression]
+
+Casa os resultados pelo nome do cenário (``bench_routes``) ou pela rota
+(``load``) e mostra a variação percentual da métrica escolhida. Com
+``--fail-on-regression`` termina com código 1 se algum cenário piorar mais
+que ``--threshold`` por cento (útil para comparar commits no CI).
+"""
+import argparse
+import json
+import sys
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    if report.get('benchmark') == 'load':
+        results = dict(report['routes'])
+        results['(total)'] = report['overall']
+    else:
+        results = {result['name']: result for result in report['results']}
+    return report, results
+
+
+def describe(report):
+    meta = report.get('meta', {})
+    commit = (meta.get('commit') or '?')[:10] + ('+sujo' if meta.get('dirty') else '')
+    return f"{report.get('benchmark')} @ {commit} ({meta.get('timestamp', '?')})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--metric', default='p50_ms', help='p50_ms, p95_ms, p99_ms, mean_ms, ...')
+    parser.add_argument('--threshold', type=float, default=10.0, help='variação (%%) destacada')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    options = parser.parse_args()
+
+    before_report, before = load_results(options.before)
+    after_report, after = load_results(options.after)
+    print(f'antes:  {describe(before_report)}')
+    print(f'depois: {describe(after_report)}')
+    print(f'\n{"cenário":<60} {"antes":>10} {"depois":>10} {"variação":>9}')
+
+    regressions = 0
+    for name in [*before, *(name for name in after if name not in before)]:
+        old = before.get(name, {}).get(options.metric)
+        new = after.get(name, {}).get(options.metric)
+        if old is None or new is None:
+            change, flag = '', ' (só em um lado)'
+        else:
+            delta = (new - old) / old * 100 if old else 0.0
+            change = f'{delta:+.1f}%'
+            flag = ''
+            if delta > options.threshold:
+                flag, regressions = '  <-- pior', regressions + 1
+            elif delta < -options.threshold:
+                flag = '  melhor'
+        print(f'{name:<60} {old if old is not None else "-":>10} {new if new is not None else "-":>10} '
+              f'{change:>9}{flag}')
+
+    if options.fail_on_regression and regressions:
+        print(f'\n{regressions} cenário(s) com regressão acima de {options.threshold}%', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
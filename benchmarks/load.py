@@ -0,0 +1,243 @@
+"""Gerador de carga concorrente: vazão e p50/p95/p99 por rota.
+
+Uso:
+    python benchmarks/load.py [--url http://127.0.0.1:8000] [--database-url URL]
+                              [--users 8] [--books 1000] [--clients 16] [--duration 30]
+                              [--mix books=6,stats=2,book=1,cursor=1]
+                              [--output resultado.json]
+
+Com ``--url`` dispara contra um servidor já no ar, cujo banco foi populado por
+``datagen.py`` (os clientes logam como ``user00000`` ... ``user{users-1}``).
+Sem ``--url`` gera um SQLite temporário (ou usa ``--database-url``) e sobe o
+gunicorn com ``gunicorn.conf.py`` (``WEB_CONCURRENCY``/``GUNICORN_THREADS``
+do ambiente valem normalmente).
+
+``--mix`` define o peso de cada tipo de requisição:
+    books    GET /api/books com filtro/ordenação sorteados
+    cursor   GET /api/books?cursor= (primeira página, paginação keyset)
+    book     GET /api/books/<id> de um livro do usuário
+    stats    GET /api/stats
+    export   GET /api/books/export/ndjson
+    create   POST + DELETE /api/books (escrita; conta como uma requisição cada)
+
+Cada cliente é uma thread com sessão HTTP própria; as latências dos primeiros
+``--warmup`` segundos são descartadas.
+"""
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode
+
+import requests
+
+from bench_server import free_port, wait_ready
+from benchlib import PASSWORD, ROOT, nickname, summarize, write_report
+from datagen import generate
+
+DEFAULT_MIX = 'books=6,stats=2,book=1,cursor=1'
+
+FILTERS = [
+    {}, {}, {'genre': 'Fantasia'}, {'status': 'read'}, {'min_rating': 4}, {'search': 'canção'},
+]
+SORTS = ['created_at', 'title', 'author', 'year']
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in REQUESTS:
+            raise SystemExit(f'Tipo de requisição desconhecido em --mix: {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ==================== TIPOS DE REQUISIÇÃO ====================
+# Cada função recebe (session, base_url, state, rng) e retorna [(rota, resposta)]
+
+def _books(session, base_url, state, rng):
+    params = {**rng.choice(FILTERS), 'sort_by': rng.choice(SORTS),
+              'order': rng.choice(['asc', 'desc']), 'per_page': 20}
+    return [('GET /api/books', session.get(f'{base_url}/api/books?{urlencode(params)}', timeout=60))]
+
+
+def _cursor(session, base_url, state, rng):
+    return [('GET /api/books?cursor', session.get(f'{base_url}/api/books?per_page=20&cursor=', timeout=60))]
+
+
+def _book(session, base_url, state, rng):
+    return [('GET /api/books/<id>', session.get(f'{base_url}/api/books/{rng.choice(state["ids"])}', timeout=60))]
+
+
+def _stats(session, base_url, state, rng):
+    return [('GET /api/stats', session.get(f'{base_url}/api/stats', timeout=60))]
+
+
+def _export(session, base_url, state, rng):
+    response = session.get(f'{base_url}/api/books/export/ndjson', timeout=300)
+    return [('GET /api/books/export/ndjson', response)]
+
+
+def _create(session, base_url, state, rng):
+    created = session.post(f'{base_url}/api/books', json={
+        'title': f'Livro de carga {rng.getrandbits(32)}', 'author': 'Carga', 'rating': 3,
+    }, timeout=60)
+    results = [('POST /api/books', created)]
+    if created.status_code == 201:
+        book_id = created.json()['id']
+        results.append(('DELETE /api/books/<id>', session.delete(f'{base_url}/api/books/{book_id}', timeout=60)))
+    return results
+
+
+REQUESTS = {
+    'books': _books, 'cursor': _cursor, 'book': _book,
+    'stats': _stats, 'export': _export, 'create': _create,
+}
+
+
+# ==================== EXECUÇÃO ====================
+
+def login(base_url, user_index):
+    session = requests.Session()
+    response = session.post(f'{base_url}/api/login',
+                            json={'nickname': nickname(user_index), 'password': PASSWORD}, timeout=60)
+    response.raise_for_status()
+    ids = [book['id'] for book in session.get(f'{base_url}/api/books?per_page=100', timeout=60).json()['books']]
+    return session, {'ids': ids}
+
+
+def drive(base_url, users, clients, duration, warmup, mix, seed):
+    names, weights = zip(*mix.items())
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    sessions = [login(base_url, index % users) for index in range(clients)]
+
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    def client(index):
+        session, state = sessions[index]
+        rng = random.Random(seed + index)
+        while True:
+            started = time.perf_counter()
+            if started >= deadline:
+                return
+            kind = rng.choices(names, weights)[0]
+            try:
+                responses = REQUESTS[kind](session, base_url, state, rng)
+                failed = [(route, response) for route, response in responses if response.status_code >= 400]
+            except requests.RequestException:
+                responses, failed = [(kind, None)], [(kind, None)]
+            elapsed = time.perf_counter() - started
+            if started < measure_from:
+                continue
+            with lock:
+                for route, response in responses:
+                    # Escritas compostas: divide o tempo entre as requisições
+                    latencies[route].append(elapsed / len(responses))
+                for route, _ in failed:
+                    errors[route] += 1
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - measure_from
+
+    routes = {}
+    for route in sorted(latencies):
+        routes[route] = {**summarize(latencies[route]), 'errors': errors.get(route, 0),
+                         'req_per_s': round(len(latencies[route]) / elapsed, 1)}
+    total = [value for values in latencies.values() for value in values]
+    overall = {**summarize(total), 'errors': sum(errors.values()),
+               'req_per_s': round(len(total) / elapsed, 1)}
+    return overall, routes
+
+
+def start_server(database_url):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, PORT=str(port), HOST='127.0.0.1',
+               GUNICORN_ACCESS_LOG='', COVER_CACHE_DIR=tempfile.mkdtemp())
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=ROOT, env=env, start_new_session=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_ready(base_url + '/login')
+    except RuntimeError:
+        stop_server(process)
+        raise
+    return process, base_url
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='servidor já no ar (padrão: sobe o gunicorn)')
+    parser.add_argument('--database-url', help='banco já populado para o gunicorn')
+    parser.add_argument('--users', type=int, default=8, help='usuários gerados/usados')
+    parser.add_argument('--books', type=int, default=1000, help='livros por usuário (banco gerado)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--output', help='arquivo JSON para gravar os resultados')
+    options = parser.parse_args()
+    mix = parse_mix(options.mix)
+
+    dataset = {'users': options.users}
+    process = None
+    with tempfile.TemporaryDirectory() as tmp:
+        base_url = options.url
+        if not base_url:
+            database_url = options.database_url
+            if not database_url:
+                database_url = f'sqlite:///{os.path.join(tmp, "load.db")}'
+                dataset.update(generate(database_url, options.users, options.books, options.seed))
+            process, base_url = start_server(database_url)
+        try:
+            overall, routes = drive(base_url, options.users, options.clients, options.duration,
+                                    options.warmup, mix, options.seed)
+        finally:
+            if process is not None:
+                stop_server(process)
+
+    for route, result in routes.items():
+        print(f"{route:<32} {result['req_per_s']:>7} req/s  p50 {result['p50_ms']:>8} ms  "
+              f"p95 {result['p95_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  erros {result['errors']}",
+              file=sys.stderr)
+
+    write_report({
+        'benchmark': 'load',
+        'dataset': dataset,
+        'server': {
+            'url': 'externo' if options.url else 'gunicorn',
+            'workers': os.environ.get('WEB_CONCURRENCY', 'padrão'),
+            'threads': os.environ.get('GUNICORN_THREADS', 'padrão'),
+        },
+        'options': {'clients': options.clients, 'duration': options.duration,
+                    'warmup': options.warmup, 'mix': mix, 'seed': options.seed},
+        'overall': overall,
+        'routes': routes,
+    }, options.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""Configuração do gunicorn lida do ambiente.
+
+    WEB_CONCURRENCY   processos (padrão: 2 x núcleos + 1)
+    GUNICORN_THREADS  threads por processo (padrão: 4; > 1 usa o worker gthread)
+    PORT / HOST       endereço de escuta (padrão: 0.0.0.0:8000)
+    GUNICORN_TIMEOUT  segundos até reciclar um worker travado (padrão: 60)
+    GUNICORN_MAX_REQUESTS  requisições até reciclar um worker (padrão: 0, desligado)
+
+Cada processo abre o próprio pool do SQLAlchemy: o máximo de conexões ao
+banco é WEB_CONCURRENCY x (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+"""
+import multiprocessing
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = 5
+# Reciclagem periódica de processos (0 desliga; com um único worker a troca
+# deixa o servidor parado enquanto o novo processo sobe)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
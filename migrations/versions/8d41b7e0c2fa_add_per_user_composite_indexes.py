@@ -0,0 +1,39 @@
+"""add per-user composite indexes on books
+
+Revision ID: 8d41b7e0c2fa
+Revises: 5f3c2a9d1e47
+Create Date: 2025-12-09 09:02:17.530941
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41b7e0c2fa'
+down_revision = '5f3c2a9d1e47'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_books_user_created_at', ['user_id', 'created_at']),
+    ('ix_books_user_title', ['user_id', 'title']),
+    ('ix_books_user_author', ['user_id', 'author']),
+    ('ix_books_user_year', ['user_id', 'year']),
+    ('ix_books_user_genre', ['user_id', 'genre']),
+    ('ix_books_user_rating', ['user_id', 'rating']),
+    ('ix_books_user_status_rating', ['user_id', 'reading_status', 'rating']),
+]
+
+
+def upgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        for name, columns in INDEXES:
+            batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        for name, _ in reversed(INDEXES):
+            batch_op.drop_index(name)
@@ -0,0 +1,28 @@
+"""add books.isbn with a per-user unique index
+
+Revision ID: a5d1e8c3f7b2
+Revises: f2c9a4e7b3d8
+Create Date: 2026-02-17 10:05:48.208317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d1e8c3f7b2'
+down_revision = 'f2c9a4e7b3d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('isbn', sa.String(length=13), nullable=True))
+        batch_op.create_index('ix_books_user_isbn', ['user_id', 'isbn'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_index('ix_books_user_isbn')
+        batch_op.drop_column('isbn')
@@ -0,0 +1,32 @@
+"""add users.book_count and backfill it
+
+Revision ID: a7e93c4b6d10
+Revises: 8d41b7e0c2fa
+Create Date: 2025-12-10 14:41:03.228610
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e93c4b6d10'
+down_revision = '8d41b7e0c2fa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('book_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill único: a partir daqui o contador é mantido pela aplicação
+    op.execute(
+        'UPDATE users SET book_count = '
+        '(SELECT COUNT(*) FROM books WHERE books.user_id = users.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('book_count')
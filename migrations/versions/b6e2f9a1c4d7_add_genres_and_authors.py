@@ -0,0 +1,123 @@
+"""add normalized genres/authors with link tables and backfill them
+
+Revision ID: b6e2f9a1c4d7
+Revises: a5d1e8c3f7b2
+Create Date: 2026-03-02 10:17:44.518302
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e2f9a1c4d7'
+down_revision = 'a5d1e8c3f7b2'
+branch_labels = None
+depends_on = None
+
+# Livros lidos por vez no backfill
+CHUNK_SIZE = 1000
+
+
+def _terms(value):
+    """Cópia de app.terms.book_terms na data desta migração: {chave: grafia}"""
+    terms = {}
+    for part in (value or '').split(','):
+        part = part.strip()
+        decomposed = unicodedata.normalize('NFKD', part)
+        stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+        key = ' '.join(stripped.casefold().split())[:255]
+        if key:
+            terms.setdefault(key, part[:255])
+    return terms
+
+
+def _create_terms_table(name, link_name, term_column):
+    op.create_table(
+        name,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('normalized_name', sa.String(length=255), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('normalized_name')
+    )
+    op.create_table(
+        link_name,
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column(term_column, sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id'], ),
+        sa.ForeignKeyConstraint([term_column], [f'{name}.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('book_id', term_column)
+    )
+    with op.batch_alter_table(link_name, schema=None) as batch_op:
+        batch_op.create_index(f'ix_{link_name}_user_{term_column[:-3]}',
+                              ['user_id', term_column, 'book_id'], unique=False)
+
+
+def _backfill(connection):
+    """Liga os livros existentes aos termos, em blocos de CHUNK_SIZE livros por id"""
+    books = sa.table('books', sa.column('id'), sa.column('user_id'),
+                     sa.column('author'), sa.column('genre'))
+    fields = {}
+    for field, name, link_name, term_column in (('author', 'authors', 'book_authors', 'author_id'),
+                                                ('genre', 'genres', 'book_genres', 'genre_id')):
+        terms = sa.table(name, sa.column('id'), sa.column('normalized_name'), sa.column('name'))
+        links = sa.table(link_name, sa.column('book_id'), sa.column(term_column), sa.column('user_id'))
+        # chave -> id dos termos já criados (as tabelas começam vazias)
+        fields[field] = (terms, links, term_column, {})
+
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(books.c.id, books.c.user_id, books.c.author, books.c.genre)
+            .where(books.c.id > last_id).order_by(books.c.id).limit(CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        for field, (terms, links, term_column, ids) in fields.items():
+            values = [(row, _terms(getattr(row, field))) for row in rows]
+            new = {}
+            for _, book_terms in values:
+                for key, name in book_terms.items():
+                    if key not in ids:
+                        new.setdefault(key, name)
+            if new:
+                connection.execute(terms.insert(), [{'normalized_name': key, 'name': name}
+                                                    for key, name in new.items()])
+                ids.update(connection.execute(
+                    sa.select(terms.c.normalized_name, terms.c.id)
+                    .where(terms.c.normalized_name.in_(list(new)))
+                ).all())
+            pairs = [{'book_id': row.id, term_column: ids[key], 'user_id': row.user_id}
+                     for row, book_terms in values for key in book_terms]
+            if pairs:
+                connection.execute(links.insert(), pairs)
+
+
+def upgrade():
+    _create_terms_table('genres', 'book_genres', 'genre_id')
+    _create_terms_table('authors', 'book_authors', 'author_id')
+
+    _backfill(op.get_bind())
+
+    # O filtro por gênero passa a usar ix_book_genres_user_genre
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_index('ix_books_user_genre')
+
+
+def downgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.create_index('ix_books_user_genre', ['user_id', 'genre'], unique=False)
+
+    for name, link_name, term_column in (('authors', 'book_authors', 'author_id'),
+                                         ('genres', 'book_genres', 'genre_id')):
+        with op.batch_alter_table(link_name, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{link_name}_user_{term_column[:-3]}')
+        op.drop_table(link_name)
+        op.drop_table(name)
@@ -0,0 +1,28 @@
+"""add books.enriched_at for metadata enrichment
+
+Revision ID: c3e8f1a2b9d4
+Revises: a7e93c4b6d10
+Create Date: 2026-01-14 10:22:47.531204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8f1a2b9d4'
+down_revision = 'a7e93c4b6d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('enriched_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_books_enriched_at_id', ['enriched_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_index('ix_books_enriched_at_id')
+        batch_op.drop_column('enriched_at')
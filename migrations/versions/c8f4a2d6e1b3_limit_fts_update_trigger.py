@@ -0,0 +1,49 @@
+"""limit the books_fts update trigger to the indexed columns
+
+Revision ID: c8f4a2d6e1b3
+Revises: b6e2f9a1c4d7
+Create Date: 2026-03-09 14:32:07.640218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f4a2d6e1b3'
+down_revision = 'b6e2f9a1c4d7'
+branch_labels = None
+depends_on = None
+
+
+_TRIGGER_BODY = """BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, genre, description)
+        VALUES ('delete', old.id, old.title, old.author, old.genre, old.description);
+        INSERT INTO books_fts(rowid, title, author, genre, description)
+        VALUES (new.id, new.title, new.author, new.genre, new.description);
+    END"""
+
+# Escritas que não tocam título, autor, gênero ou descrição (capa, avaliação,
+# versão da coleção...) deixam de reescrever o índice FTS
+SQLITE_UPGRADE = (
+    'CREATE TRIGGER books_fts_au AFTER UPDATE OF title, author, genre, description ON books '
+    + _TRIGGER_BODY
+)
+
+# Gatilho original de 5f3c2a9d1e47
+SQLITE_DOWNGRADE = 'CREATE TRIGGER books_fts_au AFTER UPDATE ON books ' + _TRIGGER_BODY
+
+
+def _replace_trigger(statement):
+    # No MySQL o índice FULLTEXT é mantido pelo próprio InnoDB
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS books_fts_au')
+        op.execute(statement)
+
+
+def upgrade():
+    _replace_trigger(SQLITE_UPGRADE)
+
+
+def downgrade():
+    _replace_trigger(SQLITE_DOWNGRADE)
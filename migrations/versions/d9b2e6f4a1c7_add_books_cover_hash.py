@@ -0,0 +1,28 @@
+"""add books.cover_hash for the local cover cache
+
+Revision ID: d9b2e6f4a1c7
+Revises: c3e8f1a2b9d4
+Create Date: 2026-01-21 16:05:12.884310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9b2e6f4a1c7'
+down_revision = 'c3e8f1a2b9d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cover_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index('ix_books_cover_hash', ['cover_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_index('ix_books_cover_hash')
+        batch_op.drop_column('cover_hash')
@@ -0,0 +1,34 @@
+"""add users.collection_version / collection_updated_at for conditional GETs
+
+Revision ID: e4a7c2d8b5f1
+Revises: d9b2e6f4a1c7
+Create Date: 2026-02-03 09:47:30.116582
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c2d8b5f1'
+down_revision = 'd9b2e6f4a1c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('collection_version', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('collection_updated_at', sa.DateTime(), nullable=True))
+
+    # Última escrita conhecida: o updated_at mais recente da coleção
+    op.execute(
+        'UPDATE users SET collection_updated_at = '
+        '(SELECT MAX(updated_at) FROM books WHERE books.user_id = users.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('collection_updated_at')
+        batch_op.drop_column('collection_version')
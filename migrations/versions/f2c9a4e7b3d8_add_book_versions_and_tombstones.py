@@ -0,0 +1,47 @@
+"""add books.version and book_tombstones for incremental sync
+
+Revision ID: f2c9a4e7b3d8
+Revises: e4a7c2d8b5f1
+Create Date: 2026-02-10 14:22:05.731904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c9a4e7b3d8'
+down_revision = 'e4a7c2d8b5f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Livros existentes ficam com version = 0: entram só na cópia completa (since=0)
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index('ix_books_user_version', ['user_id', 'version', 'id'], unique=False)
+
+    op.create_table(
+        'book_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('book_tombstones', schema=None) as batch_op:
+        batch_op.create_index('ix_book_tombstones_user_version', ['user_id', 'version'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('book_tombstones', schema=None) as batch_op:
+        batch_op.drop_index('ix_book_tombstones_user_version')
+
+    op.drop_table('book_tombstones')
+
+    with op.batch_alter_table('books', schema=None) as batch_op:
+        batch_op.drop_index('ix_books_user_version')
+        batch_op.drop_column('version')
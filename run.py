@@ -1,10 +1,18 @@
-from app import create_app, db
+import os
 
-app = create_app()
+# Debug por padrão ao rodar direto; definido antes de criar o app para que
+# create_app já o veja (auditoria de consultas, pacotes de assets)
+os.environ.setdefault('FLASK_DEBUG', '1')
 
-if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-    app.run(host='0.0.0.0', port=5000, debug=True)
+from app import create_app  # noqa: E402
 
+app = create_app()
 
+if __name__ == '__main__':
+    # Servidor de desenvolvimento; em produção use o gunicorn (ver wsgi.py).
+    # Tabelas: flask --app run init-db (ou flask --app run db upgrade)
+    app.run(
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', 5000)),
+        debug=app.debug
+    )
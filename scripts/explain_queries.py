@@ -0,0 +1,133 @@
+"""Roda EXPLAIN para cada formato de consulta que get_books/get_stats emitem (com facetas).
+
+Uso:
+    python scripts/explain_queries.py [--user-id N] [--verbose]
+
+Sai com código 1 se algum formato cair em varredura completa da tabela
+``books`` (``SCAN books`` no SQLite, ``type=ALL`` no MySQL).
+"""
+import argparse
+import itertools
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import func, text
+from sqlalchemy.sql.expression import asc, desc
+
+from app import create_app, db
+from app.facets import facet_filters, facets_query
+from app.models import Book
+from app.pagination import encode_cursor, keyset_query
+from app.queries import SORT_COLUMNS, filter_books_query
+from app.stats import stats_query
+
+# Valores de exemplo para cada filtro (None = filtro ausente)
+FILTER_VALUES = {
+    'search': [None, 'tolkien'],
+    'genre': [None, 'Fantasia'],
+    'status': [None, 'read'],
+    'min_rating': [None, '4'],
+}
+
+# Última chave vista usada para montar a consulta da segunda página
+CURSOR_SAMPLES = {
+    'title': 'M',
+    'author': 'M',
+    'year': 2000,
+    'created_at': datetime(2024, 1, 1),
+}
+
+
+def compile_sql(statement, dialect):
+    return str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+
+def explain(sql, dialect_name):
+    """Retorna (linhas do plano, houve varredura completa?)"""
+    if dialect_name == 'sqlite':
+        rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+        details = [row[-1] for row in rows]
+        full_scan = any(
+            d.startswith('SCAN books') and not d.startswith('SCAN books_fts')
+            for d in details
+        )
+        return details, full_scan
+
+    result = db.session.execute(text(f'EXPLAIN {sql}'))
+    columns = list(result.keys())
+    rows = [dict(zip(columns, row)) for row in result.all()]
+    details = [
+        f"{r.get('table')}: type={r.get('type')} key={r.get('key')} extra={r.get('Extra')}"
+        for r in rows
+    ]
+    full_scan = any(r.get('table') == 'books' and r.get('type') == 'ALL' for r in rows)
+    return details, full_scan
+
+
+def book_query_shapes(user_id):
+    """Gera (descrição, consulta) para cada combinação de filtros/ordenação/paginação"""
+    names = list(FILTER_VALUES)
+    for values in itertools.product(*(FILTER_VALUES[n] for n in names)):
+        args = {n: v for n, v in zip(names, values) if v is not None}
+        label = ','.join(f'{k}={v}' for k, v in args.items()) or 'sem filtros'
+
+        base, relevance = filter_books_query(user_id, args)
+        yield f'count [{label}]', base.order_by(None).with_entities(func.count(Book.id))
+        yield f'facets [{label}]', facets_query(user_id, facet_filters(args))
+
+        if relevance is not None:
+            yield f'relevance [{label}]', base.order_by(desc(relevance)).limit(10)
+
+        for sort_by, column in SORT_COLUMNS.items():
+            for order in (asc, desc):
+                desc_label = f'{sort_by} {order.__name__} [{label}]'
+                yield f'offset {desc_label}', base.order_by(order(column)).limit(10).offset(100)
+                yield f'cursor {desc_label}', _cursor_query(base, sort_by, column, order is desc)
+
+
+def _cursor_query(base, sort_by, column, descending):
+    # Consulta da segunda página, a partir de um cursor de exemplo
+    sample = CURSOR_SAMPLES[sort_by]
+    cursor = encode_cursor(sort_by, sample, 1000, 'next')
+    query, _ = keyset_query(base, sort_by, column, Book.id, descending, 10, cursor)
+    return query
+
+
+def stats_query_shapes(user_id):
+    yield 'stats', stats_query(user_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--user-id', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='mostra o plano de todas as consultas')
+    options = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        dialect = db.engine.dialect
+        shapes = itertools.chain(book_query_shapes(options.user_id), stats_query_shapes(options.user_id))
+
+        failures = 0
+        total = 0
+        for label, query in shapes:
+            total += 1
+            statement = getattr(query, 'statement', query)
+            sql = compile_sql(statement, dialect)
+            details, full_scan = explain(sql, dialect.name)
+            if full_scan:
+                failures += 1
+            if full_scan or options.verbose:
+                print(f"{'FULL SCAN' if full_scan else 'ok':9} {label}")
+                for line in details:
+                    print(f'          {line}')
+
+        print(f'{total} formatos de consulta analisados, {failures} com varredura completa')
+        return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Servidor local que imita ``GET /volumes`` da Google Books API.
+
+Uso:
+    python scripts/google_books_stub.py [--port 8099] [--latency 0.1] [--miss-rate 0.2]
+
+Aponte o app para ele com ``GOOGLE_BOOKS_API_URL=http://127.0.0.1:8099``.
+A resposta é determinística para cada consulta: o título vem de ``intitle:``
+(ou da consulta inteira) e capa/ano/gênero são derivados de um hash da
+consulta. Com ``--miss-rate`` uma fração das consultas volta sem resultados.
+"""
+import argparse
+import hashlib
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+GENRES = ['Fiction', 'Fantasy', 'History', 'Science', 'Biography', 'Poetry']
+
+
+def fake_volume(query):
+    digest = int(hashlib.sha1(query.encode()).hexdigest(), 16)
+    title = re.search(r'intitle:(.*?)(?:\s+in\w+:|$)', query)
+    author = re.search(r'inauthor:(.*)$', query)
+    return digest, {
+        'volumeInfo': {
+            'title': title.group(1).strip() if title else query,
+            'authors': [author.group(1).strip() if author else 'Autor Desconhecido'],
+            'publishedDate': f'{1900 + digest % 124}-01-01',
+            'categories': [GENRES[digest % len(GENRES)]],
+            'imageLinks': {'thumbnail': f'https://books.example/covers/{digest % 10**12}.jpg'},
+            'industryIdentifiers': [{'type': 'ISBN_13', 'identifier': f'978{digest % 10**10:010d}'}],
+        }
+    }
+
+
+def make_handler(latency, miss_rate):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if not url.path.endswith('/volumes'):
+                self.send_error(404)
+                return
+            query = parse_qs(url.query).get('q', [''])[0]
+            time.sleep(latency)
+
+            digest, volume = fake_volume(query)
+            items = [] if (digest % 1000) / 1000 < miss_rate else [volume]
+            body = json.dumps({'totalItems': len(items), 'items': items}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.1, help='atraso por resposta (s)')
+    parser.add_argument('--miss-rate', type=float, default=0.2, help='fração de consultas sem resultado')
+    options = parser.parse_args()
+
+    server = ThreadingHTTPServer((options.host, options.port),
+                                 make_handler(options.latency, options.miss_rate))
+    print(f'Stub da Google Books em http://{options.host}:{options.port}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -94,6 +94,7 @@ function getFormData() {
         author: formData.get('author').trim(),
         genre: formData.get('genre').trim() || null,
         description: formData.get('description').trim() || null,
+        isbn: formData.get('isbn').trim() || null,
         cover_image_url: formData.get('cover_image_url') || null // <-- CAMPO ADICIONADO
     };
     
@@ -333,6 +334,7 @@ function displaySearchResults(data, container) {
             <div class="result-info">
                 <div class="result-title">${book.title}</div>
                 <div class="result-author">${book.author || 'Autor não informado'}</div>
+                ${book.in_collection ? '<div class="result-owned"><i class="fas fa-check"></i> Já está na sua coleção</div>' : ''}
                 <div class="result-details">
                     ${book.year ? `${book.year} • ` : ''}
                     ${book.genre || 'Gênero não informado'}
@@ -355,6 +357,7 @@ function selectGoogleBook(book) {
     document.getElementById('year').value = book.year || '';
     document.getElementById('genre').value = book.genre || '';
     document.getElementById('description').value = book.description || '';
+    document.getElementById('isbn').value = book.isbn || '';
     
     // NOVO: Preencher o campo oculto com a URL da capa
     document.getElementById('cover_image_url').value = book.cover_image_url || '';
@@ -1,14 +1,39 @@
 // api.js - Define o objeto BookAPI para centralizar as chamadas AJAX
 
 const BookAPI = {
-    // Funcao generica para requisicoes GET
+    // Respostas já recebidas por URL, com o ETag para revalidação (304)
+    _etagCache: new Map(),
+    _etagCacheLimit: 50,
+
+    // Funcao generica para requisicoes GET (condicional: reusa a resposta se nada mudou)
     async get(url) {
-        const response = await fetch(url);
+        const cached = this._etagCache.get(url);
+        const headers = cached ? { 'If-None-Match': cached.etag } : {};
+        const response = await fetch(url, { headers: headers, cache: 'no-store' });
+
+        if (response.status === 304 && cached) {
+            // Renova a posição da entrada (menos usada sai primeiro)
+            this._etagCache.delete(url);
+            this._etagCache.set(url, cached);
+            return cached.data;
+        }
         if (!response.ok) {
             const errorData = await response.json().catch(() => ({ error: 'Erro desconhecido' }));
-            throw new Error(errorData.error || `Erro HTTP: ${response.status}`);
+            const error = new Error(errorData.error || `Erro HTTP: ${response.status}`);
+            error.status = response.status;
+            throw error;
         }
-        return response.json();
+
+        const data = await response.json();
+        const etag = response.headers.get('ETag');
+        if (etag) {
+            this._etagCache.delete(url);
+            this._etagCache.set(url, { etag: etag, data: data });
+            if (this._etagCache.size > this._etagCacheLimit) {
+                this._etagCache.delete(this._etagCache.keys().next().value);
+            }
+        }
+        return data;
     },
 
     // Funcao generica para requisicoes POST, PUT, DELETE
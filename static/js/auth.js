@@ -23,6 +23,9 @@ async function checkAuthStatus() {
             if (welcomeScreen) welcomeScreen.style.display = "none";
             if (mainContent) mainContent.style.display = "block";
 
+            // Usuário atual (a cópia local da coleção é separada por usuário)
+            window.currentUser = data.user;
+
             // Carregar livros se estivermos na página principal
             if (window.location.pathname === "/" && typeof loadBooks === 'function') {
                 loadBooks();
@@ -0,0 +1,64 @@
+// autocomplete.js - Sugestões de autor e gênero nos formulários (/api/autocomplete)
+
+document.addEventListener('DOMContentLoaded', function() {
+    setupAutocomplete('author', 'author', 'authorList');
+    setupAutocomplete('genre', 'genre', 'genreList');
+});
+
+// Liga o campo a um <datalist> preenchido com as sugestões da coleção do usuário
+function setupAutocomplete(inputId, field, datalistId) {
+    const input = document.getElementById(inputId);
+    const datalist = document.getElementById(datalistId);
+    if (!input || !datalist) return;
+
+    // Opções fixas do template: voltam quando não há sugestões
+    const defaultOptions = datalist.innerHTML;
+    const cache = new Map();
+    let latest = '';
+
+    async function update() {
+        // Com vários valores ("Ficção, Fantasia") sugere só o último
+        const parts = input.value.split(',');
+        const prefix = parts.pop().trim();
+        const head = parts.length ? parts.join(',') + ', ' : '';
+        latest = prefix;
+
+        let suggestions = cache.get(prefix);
+        if (!suggestions) {
+            try {
+                const params = new URLSearchParams({ field: field, prefix: prefix });
+                const data = await BookAPI.get(`/api/autocomplete?${params.toString()}`);
+                suggestions = data.suggestions;
+                cache.set(prefix, suggestions);
+            } catch (error) {
+                return; // Sem sugestões (ex.: não autenticado): o campo continua livre
+            }
+        }
+        // Resposta de uma digitação anterior: descarta
+        if (prefix !== latest) return;
+
+        if (!suggestions.length) {
+            datalist.innerHTML = defaultOptions;
+            return;
+        }
+        datalist.innerHTML = '';
+        suggestions.forEach(value => {
+            const option = document.createElement('option');
+            option.value = head + value;
+            datalist.appendChild(option);
+        });
+    }
+
+    input.setAttribute('list', datalistId);
+    input.setAttribute('autocomplete', 'off');
+    input.addEventListener('input', debounceAutocomplete(update, 150));
+    input.addEventListener('focus', update, { once: true });
+}
+
+function debounceAutocomplete(func, wait) {
+    let timeout;
+    return function() {
+        clearTimeout(timeout);
+        timeout = setTimeout(func, wait);
+    };
+}
@@ -9,6 +9,17 @@ let currentGenre = '';
 let currentStatus = '';
 let currentRating = '';
 
+// Rolagem infinita: usa a paginação por cursor da API quando o navegador suporta
+const infiniteScrollSupported = 'IntersectionObserver' in window;
+let nextCursor = null;
+let isLoadingMore = false;
+
+// Cópia local da coleção (store.js): filtros, ordenação e páginas sem ida ao servidor
+let localStoreReady = null;
+let localMode = false;
+let localShown = 0;
+let localTotal = 0;
+
 // Variáveis para dados (mantidas para filtros de frontend, mas a API agora gerencia a listagem)
 let allBooks = []; 
 let bookToDeleteId = null;
@@ -16,6 +27,7 @@ let bookToDeleteId = null;
 // Inicialização da página
 document.addEventListener('DOMContentLoaded', function() {
     setupEventListeners();
+    setupInfiniteScroll();
     // loadBooks() é chamado por auth.js se o usuário estiver autenticado
 });
 
@@ -92,6 +104,37 @@ function setupEventListeners() {
 
 }
 
+// Observar o sentinela no fim da lista para carregar a próxima página
+function setupInfiniteScroll() {
+    const sentinel = document.getElementById('scrollSentinel');
+    if (!infiniteScrollSupported || !sentinel) return;
+
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadMoreBooks();
+        }
+    }, { rootMargin: '200px' });
+    observer.observe(sentinel);
+}
+
+// Abre a cópia local uma vez; sem IndexedDB (ou se falhar) a listagem usa a API
+function useLocalStore() {
+    if (localStoreReady === null) {
+        const available = typeof BookStore !== 'undefined' && BookStore.supported() && window.currentUser;
+        localStoreReady = !available ? Promise.resolve(false) :
+            BookStore.open(window.currentUser.id).then(() => true, error => {
+                console.error('Cópia local indisponível:', error);
+                return false;
+            });
+    }
+    return localStoreReady;
+}
+
+// A ordenação por relevância não é paginável por cursor
+function useCursorPagination() {
+    return infiniteScrollSupported && currentSortBy !== 'relevance';
+}
+
 // Manipular mudança de filtro (busca ou gênero)
 function handleFilterChange(event) {
     const searchInput = document.getElementById('searchInput');
@@ -138,34 +181,48 @@ function changePage(page) {
     loadBooks();
 }
 
+// Livros por página (ou por carga da rolagem infinita)
+const PER_PAGE = 10;
+
+// Campos que os cards da listagem exibem (a API devolve só estes)
+const LIST_FIELDS = 'title,author,year,genre,description,cover_thumbnail_url,rating,reading_status';
+
+// Parâmetros de filtro e ordenação comuns aos dois modos de paginação
+function buildBookParams() {
+    return new URLSearchParams({
+        per_page: PER_PAGE,
+        search: currentSearch,
+        genre: currentGenre,
+        // NOVO: Adicionar parâmetros de status e avaliacao
+        status: currentStatus,
+        min_rating: currentRating,
+        sort_by: currentSortBy,
+        order: currentOrder,
+        fields: LIST_FIELDS
+    });
+}
+
 // Carregar livros da API (AGORA COM PAGINAÇÃO E ORDENAÇÃO)
 async function loadBooks() {
+    localMode = await useLocalStore();
+    if (localMode) {
+        return loadLocalBooks();
+    }
+    if (useCursorPagination()) {
+        return loadFirstCursorPage();
+    }
+
     try {
         showLoading();
         
         // Construir URL com todos os parâmetros
-        const params = new URLSearchParams({
-            page: currentPage,
-            per_page: 10, // Manter fixo por enquanto
-            search: currentSearch,
-            genre: currentGenre,
-            // NOVO: Adicionar parâmetros de status e avaliacao
-            status: currentStatus,
-            min_rating: currentRating,
-            sort_by: currentSortBy,
-            order: currentOrder
-        });
+        const params = buildBookParams();
+        params.set('page', currentPage);
+        // Contagens dos filtros: cacheadas no servidor, não pesam ao paginar
+        params.set('facets', 1);
         
-        const response = await fetch(`/api/books?${params.toString()}`);
-        if (!response.ok) {
-            if (response.status === 401) {
-                // Não autenticado, auth.js já deve ter redirecionado
-                return;
-            }
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        
-        const data = await response.json();
+        // GET condicional: se nada mudou, o servidor responde 304 e reusamos a última resposta
+        const data = await BookAPI.get(`/api/books?${params.toString()}`);
         
         // Atualizar variáveis globais
         allBooks = data.books; // A API agora retorna apenas os livros da página atual
@@ -174,10 +231,14 @@ async function loadBooks() {
         
         renderBooks(allBooks);
         updateStats(); // Atualizar estatísticas (requer uma chamada separada ou modificação da API)
-        populateGenreFilter();
+        populateFilters(data.facets);
         updatePaginationControls(pagination);
         
     } catch (error) {
+        if (error.status === 401) {
+            // Não autenticado, auth.js já deve ter redirecionado
+            return;
+        }
         console.error('Erro ao carregar livros:', error);
         showNotification('error', 'Erro ao carregar livros.');
         showEmptyState();
@@ -186,14 +247,137 @@ async function loadBooks() {
     }
 }
 
-// Renderizar livros na tela
-function renderBooks(books) {
+// Filtros atuais no formato de BookStore.query (os mesmos de /api/books)
+function localFilters() {
+    return {
+        search: currentSearch,
+        genre: currentGenre,
+        status: currentStatus,
+        min_rating: currentRating,
+        sort_by: currentSortBy,
+        order: currentOrder
+    };
+}
+
+// Listagem sobre a cópia local: baixa só as alterações e filtra/ordena no navegador
+async function loadLocalBooks() {
+    try {
+        await BookStore.sync();
+    } catch (error) {
+        if (error.status === 401) {
+            return;
+        }
+        // Sem conexão com o servidor: mostra a última cópia sincronizada
+        console.error('Erro ao sincronizar livros:', error);
+        showNotification('error', 'Não foi possível atualizar a lista; exibindo a cópia local.');
+    }
+
+    if (infiniteScrollSupported) {
+        const result = BookStore.query(localFilters(), 0, PER_PAGE);
+        allBooks = result.books;
+        localShown = allBooks.length;
+        localTotal = result.total;
+        renderBooks(allBooks);
+
+        const controls = document.getElementById('paginationControls');
+        if (controls) {
+            controls.style.display = 'none';
+        }
+    } else {
+        const total = BookStore.query(localFilters(), 0, 0).total;
+        const pages = Math.max(1, Math.ceil(total / PER_PAGE));
+        currentPage = Math.min(currentPage, pages);
+        allBooks = BookStore.query(localFilters(), (currentPage - 1) * PER_PAGE, PER_PAGE).books;
+        renderBooks(allBooks);
+        updatePaginationControls({
+            total: total,
+            pages: pages,
+            current_page: currentPage,
+            has_prev: currentPage > 1,
+            has_next: currentPage < pages
+        });
+    }
+    updateStats();
+    populateFilters(BookStore.facets(localFilters()));
+}
+
+// Primeira página no modo cursor (rolagem infinita)
+async function loadFirstCursorPage() {
+    try {
+        showLoading();
+        nextCursor = null;
+
+        const params = buildBookParams();
+        params.set('cursor', '');
+        params.set('facets', 1);
+
+        const data = await BookAPI.get(`/api/books?${params.toString()}`);
+        allBooks = data.books;
+        nextCursor = data.pagination.next_cursor;
+
+        renderBooks(allBooks);
+        updateStats();
+        populateFilters(data.facets);
+
+        const controls = document.getElementById('paginationControls');
+        if (controls) {
+            controls.style.display = 'none';
+        }
+
+    } catch (error) {
+        if (error.status === 401) {
+            return;
+        }
+        console.error('Erro ao carregar livros:', error);
+        showNotification('error', 'Erro ao carregar livros.');
+        showEmptyState();
+    }
+}
+
+// Próxima página no modo cursor, anexada ao fim da lista
+async function loadMoreBooks() {
+    if (localMode) {
+        // Cópia local: a próxima fatia já está em memória
+        if (localShown >= localTotal) return;
+        const books = BookStore.query(localFilters(), localShown, PER_PAGE).books;
+        allBooks = allBooks.concat(books);
+        localShown += books.length;
+        renderBooks(books, true);
+        return;
+    }
+    if (!useCursorPagination() || !nextCursor || isLoadingMore) return;
+
+    isLoadingMore = true;
+    try {
+        const params = buildBookParams();
+        params.set('cursor', nextCursor);
+
+        const data = await BookAPI.get(`/api/books?${params.toString()}`);
+        allBooks = allBooks.concat(data.books);
+        nextCursor = data.pagination.next_cursor;
+        renderBooks(data.books, true);
+
+    } catch (error) {
+        console.error('Erro ao carregar mais livros:', error);
+        showNotification('error', 'Erro ao carregar mais livros.');
+    } finally {
+        isLoadingMore = false;
+    }
+}
+
+// Renderizar livros na tela (append=true anexa ao que já está na lista)
+function renderBooks(books, append = false) {
     const container = document.getElementById('booksContainer');
     const emptyState = document.getElementById('emptyState');
     const noResults = document.getElementById('noResults');
     
     if (!container || !emptyState || !noResults) return;
 
+    if (append) {
+        container.insertAdjacentHTML('beforeend', books.map(bookCardHtml).join(''));
+        return;
+    }
+
     if (books.length === 0) {
         if (currentSearch || currentGenre) {
             container.innerHTML = '';
@@ -210,52 +394,55 @@ function renderBooks(books) {
     emptyState.style.display = 'none';
     noResults.style.display = 'none';
     
-    container.innerHTML = books.map(book => {
-        const ratingStars = Array.from({length: 5}, (_, i) => 
-            `<span class="star ${i < book.rating ? 'filled' : ''}">★</span>`
-        ).join('');
-        
-        const statusLabels = {
-            'want_to_read': 'Quero Ler',
-            'reading': 'Lendo',
-            'read': 'Lido'
-        };
-        const statusLabel = statusLabels[book.reading_status] || 'Quero Ler';
-        
-        return `
-            <div class="book-card" data-book-id="${book.id}">
-                ${book.cover_image_url ? `<img src="${escapeHtml(book.cover_image_url)}" alt="Capa do Livro" class="book-cover">` : ''}
-                <h3 class="book-title">${escapeHtml(book.title)}</h3>
-                <p class="book-author">por ${escapeHtml(book.author)}</p>
-                
-                <div class="book-rating">
-                    <div class="rating-display">${ratingStars}</div>
-                    <span class="reading-status status-${book.reading_status}">${statusLabel}</span>
-                </div>
-                
-                <div class="book-meta">
-                    ${book.year ? `<span class="book-year">${book.year}</span>` : ''}
-                    ${book.genre ? `<span class="book-genre">${escapeHtml(book.genre)}</span>` : ''}
-                </div>
-                
-                ${book.description ? `
-                    <p class="book-description">${escapeHtml(truncateText(book.description, 120))}</p>
-                ` : ''}
-                
-                <div class="book-actions">
-                    <a href="/edit-book/${book.id}" class="btn btn-secondary btn-small">
-                        <i class="fas fa-edit"></i>
-                        Editar
-                    </a>
-                    <button onclick="showDeleteModal(${book.id}, '${escapeHtml(book.title)}')" 
-                            class="btn btn-danger btn-small">
-                        <i class="fas fa-trash"></i>
-                        Excluir
-                    </button>
-                </div>
+    container.innerHTML = books.map(bookCardHtml).join('');
+}
+
+// HTML do card de um livro
+function bookCardHtml(book) {
+    const ratingStars = Array.from({length: 5}, (_, i) => 
+        `<span class="star ${i < book.rating ? 'filled' : ''}">★</span>`
+    ).join('');
+    
+    const statusLabels = {
+        'want_to_read': 'Quero Ler',
+        'reading': 'Lendo',
+        'read': 'Lido'
+    };
+    const statusLabel = statusLabels[book.reading_status] || 'Quero Ler';
+    
+    return `
+        <div class="book-card" data-book-id="${book.id}">
+            ${book.cover_thumbnail_url ? `<img src="${escapeHtml(book.cover_thumbnail_url)}" alt="Capa do Livro" class="book-cover" loading="lazy">` : ''}
+            <h3 class="book-title">${escapeHtml(book.title)}</h3>
+            <p class="book-author">por ${escapeHtml(book.author)}</p>
+            
+            <div class="book-rating">
+                <div class="rating-display">${ratingStars}</div>
+                <span class="reading-status status-${book.reading_status}">${statusLabel}</span>
             </div>
-        `;
-    }).join('');
+            
+            <div class="book-meta">
+                ${book.year ? `<span class="book-year">${book.year}</span>` : ''}
+                ${book.genre ? `<span class="book-genre">${escapeHtml(book.genre)}</span>` : ''}
+            </div>
+            
+            ${book.description ? `
+                <p class="book-description">${escapeHtml(truncateText(book.description, 120))}</p>
+            ` : ''}
+            
+            <div class="book-actions">
+                <a href="/edit-book/${book.id}" class="btn btn-secondary btn-small">
+                    <i class="fas fa-edit"></i>
+                    Editar
+                </a>
+                <button onclick="showDeleteModal(${book.id}, '${escapeHtml(book.title)}')" 
+                        class="btn btn-danger btn-small">
+                    <i class="fas fa-trash"></i>
+                    Excluir
+                </button>
+            </div>
+        </div>
+    `;
 }
 
 // Atualizar estatísticas (AGORA REQUER CHAMADA SEPARADA, POIS A API DE LIVROS É PAGINADA)
@@ -263,11 +450,7 @@ function renderBooks(books) {
 // o que não é o ideal. O ideal seria chamar /api/stats.
 async function updateStats() {
     try {
-        const response = await fetch('/api/stats');
-        if (!response.ok) {
-            throw new Error('Erro ao carregar estatísticas');
-        }
-        const stats = await response.json();
+        const stats = await BookAPI.get('/api/stats');
         
         const totalBooks = document.getElementById('totalBooks');
         const totalGenres = document.getElementById('totalGenres');
@@ -290,52 +473,71 @@ async function updateStats() {
     }
 }
 
-// Popular filtro de gêneros (AGORA REQUER CHAMADA SEPARADA)
-async function populateGenreFilter() {
+// Popular os filtros com as contagens da listagem (facetas de /api/books)
+function populateFilters(facets) {
+    if (!facets) return;
+    populateGenreFilter(facets.genre);
+    updateStatusFilterCounts(facets.reading_status);
+    updateRatingFilterCounts(facets.rating);
+}
+
+// Gêneros presentes na coleção, mais frequentes primeiro
+function populateGenreFilter(genres) {
     const genreFilter = document.getElementById('genreFilter');
     if (!genreFilter) return;
-    
-    // A API de estatísticas já retorna os gêneros únicos, mas não é o ideal.
-    // Para simplificar, vamos usar a lógica anterior, mas baseada em todos os livros
-    // que a API poderia retornar se não estivesse paginada.
-    // O ideal seria criar uma rota /api/genres.
-    
-    // Por enquanto, vamos manter a lógica de carregar todos os livros para obter os gêneros,
-    // mas isso é ineficiente. A implementação correta seria uma rota de API dedicada.
-    // Como a API de stats já é chamada, vamos usar ela para obter os gêneros únicos.
-    
-    try {
-        const response = await fetch('/api/stats');
-        if (!response.ok) return;
-        const stats = await response.json();
-        
-        // Simulação: A API de stats não retorna a lista de gêneros, apenas a contagem.
-        // Para popular o filtro, precisaríamos de uma rota dedicada ou de uma lista de todos os livros.
-        // Vamos manter a lógica anterior, mas com o conhecimento de que ela não é escalável.
-        
-        // Para fins de teste e funcionalidade mínima, vamos usar uma lista estática.
-        const staticGenres = ["Ficção", "Romance", "Mistério", "Fantasia", "Ficção Científica", "Biografia", "História", "Autoajuda", "Técnico", "Infantil"];
-        
-        // Limpar opções existentes (exceto a primeira)
-        const selectedGenre = genreFilter.value;
-        while (genreFilter.children.length > 1) {
-            genreFilter.removeChild(genreFilter.lastChild);
+
+    // Limpar opções existentes (exceto a primeira)
+    const selectedGenre = genreFilter.value;
+    while (genreFilter.children.length > 1) {
+        genreFilter.removeChild(genreFilter.lastChild);
+    }
+
+    const options = genres.slice();
+    // O gênero escolhido continua na lista mesmo sem livros com os outros filtros
+    if (selectedGenre && !options.some(genre => genre.value === selectedGenre)) {
+        options.push({ value: selectedGenre, count: 0 });
+    }
+    options.forEach(genre => {
+        const option = document.createElement('option');
+        option.value = genre.value;
+        option.textContent = `${genre.value} (${genre.count})`;
+        if (genre.value === selectedGenre) {
+            option.selected = true;
         }
-        
-        // Adicionar gêneros
-        staticGenres.sort().forEach(genre => {
-            const option = document.createElement('option');
-            option.value = genre;
-            option.textContent = genre;
-            if (genre === selectedGenre) {
-                option.selected = true;
-            }
-            genreFilter.appendChild(option);
-        });
-        
-    } catch (error) {
-        console.error('Erro ao popular filtro de gêneros:', error);
+        genreFilter.appendChild(option);
+    });
+}
+
+// Texto original da opção seguido da contagem
+function setOptionCount(option, count) {
+    if (!option.dataset.label) {
+        option.dataset.label = option.textContent;
     }
+    option.textContent = `${option.dataset.label} (${count})`;
+}
+
+function updateStatusFilterCounts(byStatus) {
+    const statusFilter = document.getElementById('statusFilter');
+    if (!statusFilter) return;
+    Array.from(statusFilter.options).forEach(option => {
+        if (option.value) {
+            setOptionCount(option, byStatus[option.value] || 0);
+        }
+    });
+}
+
+// As opções são "N+ estrelas": soma das avaliações a partir de N
+function updateRatingFilterCounts(byRating) {
+    const ratingFilter = document.getElementById('ratingFilter');
+    if (!ratingFilter) return;
+    Array.from(ratingFilter.options).forEach(option => {
+        if (!option.value) return;
+        const minimum = parseInt(option.value, 10);
+        const count = Object.keys(byRating)
+            .filter(rating => parseInt(rating, 10) >= minimum)
+            .reduce((total, rating) => total + byRating[rating], 0);
+        setOptionCount(option, count);
+    });
 }
 
 // Atualizar controles de paginação
@@ -39,6 +39,7 @@ function populateForm(book) {
     document.getElementById('year').value = book.year || '';
     document.getElementById('genre').value = book.genre || '';
     document.getElementById('description').value = book.description || '';
+    document.getElementById('isbn').value = book.isbn || '';
     
     // NOVO: Preencher rating e reading_status
     const rating = book.rating || 0;
@@ -175,6 +176,7 @@ function getFormData() {
         author: formData.get('author').trim(),
         genre: formData.get('genre').trim() || null,
         description: formData.get('description').trim() || null,
+        isbn: formData.get('isbn').trim() || null,
         rating: parseInt(formData.get('rating')) || 0,  // NOVO: Rating
         reading_status: formData.get('reading_status') || 'want_to_read'  // NOVO: Status de leitura
     };
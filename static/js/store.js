@@ -0,0 +1,288 @@
+// store.js - Cópia local da coleção no IndexedDB, mantida por /api/books/changes
+//
+// A primeira sincronização baixa a coleção inteira (since=0); as seguintes só
+// o que mudou desde a última versão guardada. Filtros, ordenação e paginação
+// da listagem rodam sobre a cópia em memória, sem ida ao servidor.
+
+const BookStore = {
+    _db: null,
+    _books: new Map(),   // id -> livro (espelho em memória do object store)
+    _version: 0,
+    _syncing: null,
+
+    supported() {
+        return 'indexedDB' in window;
+    },
+
+    // Promessa de uma IDBRequest
+    _request(request) {
+        return new Promise((resolve, reject) => {
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    },
+
+    // Promessa do fim de uma transação
+    _done(transaction) {
+        return new Promise((resolve, reject) => {
+            transaction.oncomplete = () => resolve();
+            transaction.onerror = () => reject(transaction.error);
+            transaction.onabort = () => reject(transaction.error);
+        });
+    },
+
+    // Um banco por usuário: quem loga no mesmo navegador não vê a coleção do outro
+    async open(userId) {
+        const request = indexedDB.open(`book-collection-${userId}`, 1);
+        request.onupgradeneeded = () => {
+            const db = request.result;
+            db.createObjectStore('books', { keyPath: 'id' });
+            db.createObjectStore('meta', { keyPath: 'key' });
+        };
+        this._db = await this._request(request);
+
+        const transaction = this._db.transaction(['books', 'meta'], 'readonly');
+        const books = await this._request(transaction.objectStore('books').getAll());
+        const meta = await this._request(transaction.objectStore('meta').get('version'));
+        this._books = new Map(books.map(book => [book.id, book]));
+        this._version = meta ? meta.value : 0;
+    },
+
+    // Busca e aplica as alterações desde a última sincronização (uma por vez)
+    sync() {
+        if (!this._syncing) {
+            this._syncing = this._sync().finally(() => { this._syncing = null; });
+        }
+        return this._syncing;
+    },
+
+    async _sync() {
+        let params = new URLSearchParams({ since: this._version });
+        let target = null;
+        let changed = false;
+
+        while (true) {
+            const response = await fetch(`/api/books/changes?${params.toString()}`, { cache: 'no-store' });
+            if (!response.ok) {
+                const error = new Error(`Erro HTTP: ${response.status}`);
+                error.status = response.status;
+                throw error;
+            }
+            const data = await response.json();
+
+            if (target === null) {
+                // Versão da primeira página: o que mudar durante a paginação volta na próxima vez
+                target = data.version;
+                if (data.reset || this._version === 0) {
+                    await this._clear();
+                    changed = true;
+                }
+            }
+            if (data.books.length || data.deleted.length) {
+                await this._apply(data.books, data.deleted);
+                changed = true;
+            }
+            if (!data.has_more) break;
+            params = new URLSearchParams(data.next);
+        }
+
+        if (target !== this._version) {
+            const transaction = this._db.transaction('meta', 'readwrite');
+            transaction.objectStore('meta').put({ key: 'version', value: target });
+            await this._done(transaction);
+            this._version = target;
+        }
+        return changed;
+    },
+
+    // Livros e remoções em ordem de versão (um id removido pode voltar depois);
+    // na mesma versão a remoção vem antes, como no servidor
+    async _apply(books, deleted) {
+        const operations = deleted.map(item => ({ version: item.version, id: item.id }))
+            .concat(books.map(book => ({ version: book.version, put: book })))
+            .sort((a, b) => a.version - b.version);
+
+        const transaction = this._db.transaction('books', 'readwrite');
+        const store = transaction.objectStore('books');
+        operations.forEach(operation => {
+            if (operation.put) {
+                store.put(operation.put);
+            } else {
+                store.delete(operation.id);
+            }
+        });
+        await this._done(transaction);
+
+        operations.forEach(operation => {
+            if (operation.put) {
+                this._books.set(operation.put.id, operation.put);
+            } else {
+                this._books.delete(operation.id);
+            }
+        });
+    },
+
+    async _clear() {
+        const transaction = this._db.transaction('books', 'readwrite');
+        transaction.objectStore('books').clear();
+        await this._done(transaction);
+        this._books = new Map();
+    },
+
+    // Mesmos filtros de GET /api/books: search, genre, status, min_rating, sort_by, order
+    query(options, offset, limit) {
+        const filters = parseFilters(options);
+
+        const scores = new Map();
+        const matches = [];
+        this._books.forEach(book => {
+            if (!filters.genreMatches(book) || !filters.statusMatches(book) || !filters.ratingMatches(book)) return;
+            if (filters.terms.length) {
+                const score = searchScore(book, filters.terms);
+                if (score === 0) return;
+                scores.set(book.id, score);
+            }
+            matches.push(book);
+        });
+
+        matches.sort(bookComparator(options.sort_by, options.order, scores));
+        return { books: matches.slice(offset, offset + limit), total: matches.length };
+    },
+
+    // Contagens como em GET /api/books?facets=1: cada faceta ignora o próprio filtro
+    facets(options) {
+        const filters = parseFilters(options);
+        const genres = new Map();   // chave -> { value, count }
+        const byStatus = { want_to_read: 0, reading: 0, read: 0 };
+        const byRating = { 0: 0, 1: 0, 2: 0, 3: 0, 4: 0, 5: 0 };
+        const decades = new Map();
+
+        this._books.forEach(book => {
+            if (filters.terms.length && searchScore(book, filters.terms) === 0) return;
+            const genreOk = filters.genreMatches(book);
+            const statusOk = filters.statusMatches(book);
+            const ratingOk = filters.ratingMatches(book);
+
+            if (statusOk && ratingOk) {
+                (book.genre || '').split(',').forEach(part => {
+                    const key = termKey(part);
+                    if (!key) return;
+                    const entry = genres.get(key) || { value: part.trim(), count: 0 };
+                    entry.count += 1;
+                    genres.set(key, entry);
+                });
+            }
+            if (genreOk && ratingOk) {
+                const status = book.reading_status || 'want_to_read';
+                byStatus[status] = (byStatus[status] || 0) + 1;
+            }
+            if (genreOk && statusOk) {
+                const rating = book.rating || 0;
+                byRating[rating] = (byRating[rating] || 0) + 1;
+            }
+            if (genreOk && statusOk && ratingOk) {
+                const decade = book.year === null || book.year === undefined ? null : book.year - book.year % 10;
+                decades.set(decade, (decades.get(decade) || 0) + 1);
+            }
+        });
+
+        return {
+            genre: Array.from(genres.values())
+                .sort((a, b) => (b.count - a.count) || a.value.localeCompare(b.value, 'pt-BR')),
+            reading_status: byStatus,
+            rating: byRating,
+            decade: Array.from(decades, ([value, count]) => ({ value, count }))
+                .sort((a, b) => (a.value === null) - (b.value === null) || a.value - b.value)
+        };
+    }
+};
+
+// Filtros de listagem já normalizados, com um teste por filtro (as facetas combinam só alguns)
+function parseFilters(options) {
+    const genre = termKey(options.genre || '');
+    const minRating = parseInt(options.min_rating, 10) || 0;
+    return {
+        terms: normalizeText(options.search || '').match(/[\p{L}\p{N}_]+/gu) || [],
+        genreMatches: book => !genre || genre === 'todos' || bookGenres(book).includes(genre),
+        statusMatches: book => !options.status || book.reading_status === options.status,
+        ratingMatches: book => !minRating || (book.rating || 0) >= minRating
+    };
+}
+
+// Minúsculas e sem acentos, como o índice de busca do servidor
+function normalizeText(text) {
+    return text.normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+}
+
+// Chave de um autor/gênero, como normalized_name no servidor (app/terms.py)
+function termKey(text) {
+    return normalizeText(text).trim().replace(/\s+/g, ' ');
+}
+
+// Gêneros do livro: valores combinados ("Ficção, Fantasia") contam separados
+function bookGenres(book) {
+    return (book.genre || '').split(',').map(termKey).filter(Boolean);
+}
+
+const SEARCH_WEIGHTS = { title: 3, author: 2, genre: 1, description: 1 };
+
+// Palavras normalizadas por livro; o objeto é trocado a cada alteração sincronizada
+const searchWordsCache = new WeakMap();
+
+function searchWords(book) {
+    let words = searchWordsCache.get(book);
+    if (!words) {
+        words = {};
+        Object.keys(SEARCH_WEIGHTS).forEach(field => {
+            words[field] = normalizeText(book[field] || '').match(/[\p{L}\p{N}_]+/gu) || [];
+        });
+        searchWordsCache.set(book, words);
+    }
+    return words;
+}
+
+// Cada termo precisa ser prefixo de alguma palavra; 0 = não corresponde
+function searchScore(book, terms) {
+    const words = searchWords(book);
+
+    let score = 0;
+    for (const term of terms) {
+        let found = 0;
+        Object.keys(SEARCH_WEIGHTS).forEach(field => {
+            if (words[field].some(word => word.startsWith(term))) {
+                found += SEARCH_WEIGHTS[field];
+            }
+        });
+        if (!found) return 0;
+        score += found;
+    }
+    return score;
+}
+
+// Ordenação da listagem; NULL primeiro no sentido ascendente, como no banco
+function bookComparator(sortBy, order, scores) {
+    const direction = order === 'asc' ? 1 : -1;
+    const byCreated = (a, b) => direction * (a.created_at || '').localeCompare(b.created_at || '') || direction * (a.id - b.id);
+
+    if (sortBy === 'relevance' && scores.size) {
+        // Mais relevante primeiro, desempate pelos mais recentes
+        return (a, b) => (scores.get(b.id) - scores.get(a.id)) ||
+            (b.created_at || '').localeCompare(a.created_at || '') || (b.id - a.id);
+    }
+    if (!['title', 'author', 'year'].includes(sortBy)) {
+        return byCreated;
+    }
+    return (a, b) => {
+        const x = a[sortBy];
+        const y = b[sortBy];
+        let result;
+        if (x === null || x === undefined || y === null || y === undefined) {
+            result = (x === null || x === undefined ? 0 : 1) - (y === null || y === undefined ? 0 : 1);
+        } else if (typeof x === 'number') {
+            result = x - y;
+        } else {
+            result = x.localeCompare(y, 'pt-BR');
+        }
+        return direction * result || direction * (a.id - b.id);
+    };
+}
@@ -0,0 +1,46 @@
+import pytest
+
+from app import create_app, db
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    """SQLite temporário, hash de senha no próprio processo e sem rede"""
+    return {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}',
+        'PASSWORD_HASH_WORKERS': 0,
+        'COVER_CACHE_DIR': str(tmp_path / 'covers'),
+        'METRICS_ENABLED': True,
+        # Toda rota é conferida contra o próprio @query_budget
+        'QUERY_AUDIT': True,
+        'QUERY_BUDGET_STRICT': True,
+    }
+
+
+@pytest.fixture
+def app(app_config):
+    app = create_app(app_config)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def make_client(app):
+    """Fábrica de clientes de teste: registra e loga ``nickname``"""
+    def make(nickname='leitor'):
+        client = app.test_client()
+        credentials = {'nickname': nickname, 'password': 'secret1'}
+        assert client.post('/api/register', json=credentials).status_code == 201
+        assert client.post('/api/login', json=credentials).status_code == 200
+        return client
+    return make
+
+
+@pytest.fixture
+def client(make_client):
+    """Cliente de teste já logado"""
+    return make_client()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from app.assets import BUNDLES, STYLESHEETS, build_assets, minify_css, minify_js
+
+STATIC = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static')
+
+requires_node = pytest.mark.skipif(shutil.which('node') is None, reason='node não instalado')
+
+# Construções que um minificador ingênuo quebra: comentários dentro de strings,
+# regex com "//", divisão x regex, templates aninhados e quebras de linha que o
+# JavaScript usa para inserir ";"
+TRICKY = r'''
+// comentário de linha
+const url = "http://exemplo.com/*não é comentário*/";  /* bloco */
+const re = /\/\/+|["']/g, total = 10 / 2 / 1;
+function f(x) {
+    return x
+        ? `valor: ${x.map(y => `<${y}>`).join('')} // ${'fim'}`
+        : typeof x / 1;
+}
+let a = 1
+let b = a
+++b
+const vazio = function () { return
+    42 }
+console.log(url, "a//b".replace(re, '-'), total, f(['p', 'q']), f(0), a, b, vazio())
+'''
+
+
+def run_node(source):
+    result = subprocess.run(['node', '-e', source], capture_output=True, text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+@requires_node
+def test_minified_code_behaves_like_the_source():
+    minified = minify_js(TRICKY)
+    assert 'comentário de linha' not in minified and 'bloco' not in minified
+    assert len(minified) < len(TRICKY)
+    assert run_node(minified) == run_node(TRICKY)
+
+
+@requires_node
+def test_built_bundles_parse(tmp_path):
+    static = tmp_path / 'static'
+    shutil.copytree(STATIC, static, ignore=shutil.ignore_patterns('dist'))
+    manifest = build_assets(str(static))
+
+    assert set(manifest['bundles']) == set(BUNDLES)
+    for name, path in manifest['bundles'].items():
+        result = subprocess.run(['node', '--check', str(static / path)], capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, f'{name}: {result.stderr}'
+    assert set(manifest['assets']) == set(STYLESHEETS)
+
+
+def test_unterminated_code_is_rejected():
+    with pytest.raises(ValueError):
+        minify_js('const s = `sem fim ${1 + 1}')
+
+
+def test_minify_css_keeps_strings():
+    css = '/* tema */\n.a > .b ,\n.c {\n  content: "  /* x */  ";\n  color: red ;\n}\n'
+    assert minify_css(css) == '.a>.b,.c{content:"  /* x */  ";color:red}\n'
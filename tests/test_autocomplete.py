@@ -0,0 +1,37 @@
+def suggestions(client, field, prefix, **params):
+    response = client.get('/api/autocomplete', query_string={'field': field, 'prefix': prefix, **params})
+    assert response.status_code == 200
+    return response.get_json()['suggestions']
+
+
+def test_prefix_ignores_case_and_accents(client):
+    for author, genre in [('Machado de Assis', 'Romance'), ('Mário de Andrade', 'Ficção, Fantasia'),
+                          ('Marcel Proust', 'romance'), ('José de Alencar', 'Romance')]:
+        client.post('/api/books', json={'title': 'Livro', 'author': author, 'genre': genre})
+
+    assert suggestions(client, 'author', 'ma') == ['Machado de Assis', 'Marcel Proust', 'Mário de Andrade']
+    assert suggestions(client, 'author', 'MARI') == ['Mário de Andrade']
+    assert suggestions(client, 'author', 'ma', limit=1) == ['Machado de Assis']
+    assert suggestions(client, 'author', 'x') == []
+    # Valores combinados entram separados; a grafia mais usada vence
+    assert suggestions(client, 'genre', 'f') == ['Fantasia', 'Ficção']
+    assert suggestions(client, 'genre', 'ro') == ['Romance']
+
+
+def test_index_follows_writes(client, make_client):
+    book_id = client.post('/api/books', json={'title': 'Livro', 'author': 'Clarice Lispector'}).get_json()['id']
+    assert suggestions(client, 'author', 'cl') == ['Clarice Lispector']
+
+    client.put(f'/api/books/{book_id}', json={'author': 'Cecília Meireles'})
+    assert suggestions(client, 'author', 'c') == ['Cecília Meireles']
+    client.delete(f'/api/books/{book_id}')
+    assert suggestions(client, 'author', 'c') == []
+
+    # Índices por usuário
+    other = make_client('outro')
+    other.post('/api/books', json={'title': 'Livro', 'author': 'Carlos Drummond'})
+    assert suggestions(client, 'author', 'c') == []
+
+
+def test_unknown_field(client):
+    assert client.get('/api/autocomplete?field=title&prefix=a').status_code == 400
@@ -0,0 +1,53 @@
+def create(client, title, **fields):
+    response = client.post('/api/books', json={'title': title, 'author': 'Autor', **fields})
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+
+def test_batch_update_ignores_other_users_books(client, make_client):
+    mine = [create(client, 'Meu 1'), create(client, 'Meu 2')]
+    other = make_client('outro')
+    theirs = create(other, 'Dele', rating=1)
+
+    response = client.patch('/api/books', json={'ids': mine + [theirs], 'changes': {'rating': 5}})
+    assert response.status_code == 200
+    assert response.get_json()['updated'] == 2
+
+    assert other.get(f'/api/books/{theirs}').get_json()['rating'] == 1
+    assert [client.get(f'/api/books/{book_id}').get_json()['rating'] for book_id in mine] == [5, 5]
+
+
+def test_batch_delete_ignores_other_users_books(client, make_client):
+    mine = create(client, 'Meu')
+    other = make_client('outro')
+    theirs = create(other, 'Dele')
+    version = other.get('/api/books/changes').get_json()['version']
+
+    response = client.delete('/api/books', json={'ids': [mine, theirs]})
+    assert response.status_code == 200
+    assert response.get_json()['deleted'] == 1
+
+    assert client.get(f'/api/books/{mine}').status_code == 404
+    assert other.get(f'/api/books/{theirs}').status_code == 200
+    # A coleção do outro usuário não mudou
+    changes = other.get(f'/api/books/changes?since={version}').get_json()
+    assert changes['version'] == version
+    assert changes['deleted'] == [] and changes['books'] == []
+
+
+def test_batch_filter_stays_in_own_collection(client, make_client):
+    create(client, 'Meu', genre='Romance')
+    other = make_client('outro')
+    theirs = create(other, 'Dele', genre='Romance')
+
+    response = client.delete('/api/books', json={'filter': {'genre': 'Romance'}})
+    assert response.get_json()['deleted'] == 1
+    assert other.get(f'/api/books/{theirs}').status_code == 200
+
+
+def test_batch_rejects_invalid_requests(client):
+    book_id = create(client, 'Meu')
+    assert client.patch('/api/books', json={'ids': [book_id], 'changes': {'user_id': 2}}).status_code == 400
+    assert client.patch('/api/books', json={'ids': [], 'changes': {'rating': 1}}).status_code == 400
+    assert client.delete('/api/books', json={'filter': {}}).status_code == 400
+    assert client.delete('/api/books', json={'ids': ['x']}).status_code == 400
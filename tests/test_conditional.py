@@ -0,0 +1,39 @@
+def test_books_not_modified_until_a_write(client):
+    client.post('/api/books', json={'title': 'Dom Casmurro', 'author': 'Machado de Assis'})
+
+    first = client.get('/api/books')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    unchanged = client.get('/api/books', headers={'If-None-Match': etag})
+    assert unchanged.status_code == 304
+    assert unchanged.data == b''
+    assert int(unchanged.headers['X-Query-Count']) <= 2  # só usuário e versão: nenhum livro lido
+
+    book_id = first.get_json()['books'][0]['id']
+    assert client.put(f'/api/books/{book_id}', json={'rating': 5}).status_code == 200
+
+    changed = client.get('/api/books', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['books'][0]['rating'] == 5
+
+
+def test_etag_depends_on_query_and_user(client, make_client):
+    client.post('/api/books', json={'title': 'Iracema', 'author': 'José de Alencar'})
+    etag = client.get('/api/books').headers['ETag']
+
+    assert client.get('/api/books?sort_by=title', headers={'If-None-Match': etag}).status_code == 200
+    other = make_client('outro')
+    assert other.get('/api/books', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_stats_not_modified_until_a_delete(client):
+    book_id = client.post('/api/books', json={'title': 'Iracema', 'author': 'José de Alencar'}).get_json()['id']
+    etag = client.get('/api/stats').headers['ETag']
+    assert client.get('/api/stats', headers={'If-None-Match': etag}).status_code == 304
+
+    assert client.delete(f'/api/books/{book_id}').status_code == 200
+    response = client.get('/api/stats', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['total_books'] == 0
@@ -0,0 +1,146 @@
+import ipaddress
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from app import covers
+from app.covers import CoverError, CoverStore, check_cover_url, download_cover
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\0' * 100
+
+
+@pytest.mark.parametrize('url', [
+    'file:///etc/passwd',
+    'ftp://example.com/capa.png',
+    'http://127.0.0.1/capa.png',
+    'http://localhost:5000/capa.png',
+    'http://10.0.0.8/capa.png',
+    'http://192.168.1.1/capa.png',
+    'http://169.254.169.254/latest/meta-data/',
+    'http://[::1]/capa.png',
+    'http://[::ffff:127.0.0.1]/capa.png',
+])
+def test_check_cover_url_rejects_non_public_hosts(url):
+    with pytest.raises(CoverError):
+        check_cover_url(url)
+
+
+def test_check_cover_url_returns_the_checked_address():
+    assert check_cover_url('https://8.8.8.8/capa.png') == ipaddress.ip_address('8.8.8.8')
+
+
+@pytest.fixture
+def cover_server(monkeypatch):
+    """Servidor local que ``covers.test`` resolve (só para a verificação) para 127.0.0.1"""
+    hosts = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hosts.append(self.headers['Host'])
+            if self.path == '/capa.png':
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/png')
+                self.send_header('Content-Length', str(len(PNG)))
+                self.end_headers()
+                self.wfile.write(PNG)
+                return
+            location = {
+                '/interno': f'http://127.0.0.1:{self.server.server_port}/capa.png',
+                '/relativo': '/capa.png',
+                '/ciclo': '/ciclo',
+            }[self.path]
+            self.send_response(302)
+            self.send_header('Location', location)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    original = covers.check_cover_url
+
+    def check(url):
+        if url.startswith('http://covers.test:'):
+            return ipaddress.ip_address('127.0.0.1')
+        return original(url)
+
+    monkeypatch.setattr(covers, 'check_cover_url', check)
+    yield f'http://covers.test:{server.server_port}', hosts
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_connects_to_the_checked_address(cover_server):
+    base, hosts = cover_server
+    # covers.test não existe no DNS: só o endereço verificado leva ao servidor
+    assert download_cover(f'{base}/capa.png', max_bytes=1024) == PNG
+    assert hosts == [base.split('//', 1)[1]]
+    assert download_cover(f'{base}/relativo', max_bytes=1024) == PNG
+
+
+def test_download_checks_every_redirect(cover_server):
+    base, _ = cover_server
+    with pytest.raises(CoverError, match='não é público'):
+        download_cover(f'{base}/interno', max_bytes=1024)
+    with pytest.raises(CoverError, match='Redirecionamentos demais'):
+        download_cover(f'{base}/ciclo', max_bytes=1024)
+    with pytest.raises(CoverError, match='maior que o limite'):
+        download_cover(f'{base}/capa.png', max_bytes=10)
+
+
+def test_store_keeps_running_total_and_evicts_least_recent(tmp_path):
+    store = CoverStore(str(tmp_path), max_bytes=250)
+    first, evicted = store.put(PNG + b'1')
+    second, evicted = store.put(PNG + b'2')
+    assert evicted == [] and store.stats()['bytes'] == 2 * len(PNG) + 2
+    old = time.time() - 600
+    os.utime(store.path(first), (old, old))  # o menos acessado no disco
+
+    third, evicted = store.put(PNG + b'3')
+    assert evicted == [first]
+    assert first not in store and second in store and third in store
+    assert store.stats() == {'covers': 2, 'bytes': 2 * len(PNG) + 2, 'max_bytes': 250}
+
+
+def test_store_touches_files_once_per_interval(tmp_path):
+    store = CoverStore(str(tmp_path), touch_interval=300)
+    cover_hash, _ = store.put(PNG)
+    path = store.path(cover_hash)
+
+    recent = time.time() - 60
+    os.utime(path, (recent, recent))
+    store.path(cover_hash)
+    assert os.stat(path).st_mtime == pytest.approx(recent)
+
+    old = time.time() - 600
+    os.utime(path, (old, old))
+    store.path(cover_hash)
+    assert os.stat(path).st_mtime > recent
+
+
+def test_reads_reschedule_missing_covers(app, client, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(app.extensions['jobs'], 'submit', lambda kind, user_id, func, *args: submitted.append(args))
+
+    book_id = client.post('/api/books', json={
+        'title': 'Solaris', 'author': 'Stanisław Lem', 'cover_image_url': 'https://example.com/solaris.jpg'
+    }).get_json()['id']
+    assert submitted == [(book_id,)]
+
+    # Recém-agendada: a leitura não agenda de novo
+    client.get(f'/api/books/{book_id}')
+    client.get('/api/books')
+    assert len(submitted) == 1
+
+    # Passado o intervalo (ex.: capa removida pelo limite do cache), a leitura reagenda
+    app.extensions['cover_attempts'].clear()
+    client.get('/api/books?fields=title')  # sem as colunas da capa: não decide
+    assert len(submitted) == 1
+    client.get('/api/books')
+    assert submitted[1:] == [([book_id],)]
@@ -0,0 +1,17 @@
+from urllib.parse import unquote
+
+
+def test_download_name_with_non_ascii_and_quotes(make_client):
+    client = make_client('łukasz "o leitor"')
+    client.post('/api/books', json={'title': 'Solaris', 'author': 'Stanisław Lem'})
+
+    for fmt in ('csv', 'json', 'ndjson'):
+        response = client.get(f'/api/books/export/{fmt}')
+        assert response.status_code == 200
+        header = response.headers['Content-Disposition']
+        header.encode('latin-1')  # o servidor só escreve cabeçalhos em latin-1
+        assert header.startswith('attachment; filename="colecao_livros_ukasz \\"o leitor\\"_')
+        encoded = header.split("filename*=UTF-8''", 1)[1]
+        assert unquote(encoded).startswith('colecao_livros_łukasz "o leitor"_')
+        assert unquote(encoded).endswith(f'.{fmt}')
+        assert 'Solaris' in response.get_data(as_text=True)
@@ -0,0 +1,46 @@
+BOOKS = [
+    {'title': 'Dom Casmurro', 'genre': 'Romance', 'rating': 5, 'reading_status': 'read', 'year': 1899},
+    {'title': 'Iracema', 'genre': 'Romance', 'rating': 3, 'reading_status': 'reading', 'year': 1865},
+    {'title': 'Solaris', 'genre': 'Ficção Científica', 'rating': 5, 'reading_status': 'read', 'year': 1961},
+    {'title': 'Duna', 'genre': 'Ficção Científica', 'rating': 0, 'reading_status': 'want_to_read'},
+]
+
+
+def facets(client, query=''):
+    response = client.get(f'/api/books?facets=1{query}')
+    assert response.status_code == 200
+    return response.get_json()['facets']
+
+
+def counts(items):
+    return {item['value']: item['count'] for item in items}
+
+
+def test_facet_counts_without_filters(client):
+    for book in BOOKS:
+        client.post('/api/books', json={'author': 'Autor', **book})
+
+    result = facets(client)
+    assert counts(result['genre']) == {'Romance': 2, 'Ficção Científica': 2}
+    assert result['reading_status'] == {'want_to_read': 1, 'reading': 1, 'read': 2}
+    assert result['rating'] == {'0': 1, '1': 0, '2': 0, '3': 1, '4': 0, '5': 2}
+    assert result['decade'] == [{'value': 1860, 'count': 1}, {'value': 1890, 'count': 1},
+                                {'value': 1960, 'count': 1}, {'value': None, 'count': 1}]
+
+
+def test_each_facet_ignores_its_own_filter(client):
+    for book in BOOKS:
+        client.post('/api/books', json={'author': 'Autor', **book})
+
+    result = facets(client, '&genre=romance&status=read')
+    # Gêneros contam só com o filtro de status; status só com o de gênero
+    assert counts(result['genre']) == {'Romance': 1, 'Ficção Científica': 1}
+    assert result['reading_status'] == {'want_to_read': 0, 'reading': 1, 'read': 1}
+    # Avaliação e década com os dois filtros
+    assert result['rating']['5'] == 1 and sum(result['rating'].values()) == 1
+    assert result['decade'] == [{'value': 1890, 'count': 1}]
+
+    # Escrita na coleção: o cache por versão não devolve contagens antigas
+    client.post('/api/books', json={'title': 'Senhora', 'author': 'Autor', 'genre': 'Romance',
+                                    'reading_status': 'read'})
+    assert counts(facets(client, '&genre=romance&status=read')['genre'])['Romance'] == 2
@@ -0,0 +1,34 @@
+import io
+import time
+
+from app import create_app
+
+
+def wait_for(client, url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(url).get_json()
+        if job['status'] in ('done', 'failed') or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_import_status_from_another_process(app, app_config, client):
+    # Outro worker do gunicorn: mesmo banco, outra instância (e outra memória)
+    other = create_app(app_config).test_client()
+    other.post('/api/login', json={'nickname': 'leitor', 'password': 'secret1'})
+
+    data = 'Titulo,Autor,Ano\nDom Casmurro,Machado de Assis,1899\nIracema,José de Alencar,1865\n'
+    response = client.post('/api/books/import?format=csv', data={'file': (io.BytesIO(data.encode()), 'livros.csv')})
+    assert response.status_code == 202
+    status_url = response.get_json()['status_url']
+
+    job = wait_for(other, status_url)
+    assert job['status'] == 'done'
+    assert job['progress']['inserted'] == 2
+
+    # Só o dono enxerga o trabalho
+    stranger = create_app(app_config).test_client()
+    stranger.post('/api/register', json={'nickname': 'outro', 'password': 'secret1'})
+    stranger.post('/api/login', json={'nickname': 'outro', 'password': 'secret1'})
+    assert stranger.get(status_url).status_code == 404
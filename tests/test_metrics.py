@@ -0,0 +1,34 @@
+import re
+
+
+def sample(client, name, **labels):
+    """Valor de uma amostra de ``/metrics`` (0 se a série ainda não existe)"""
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    wanted = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = rf'^{re.escape(name)}\{{{re.escape(wanted)}\}} (\S+)$'
+    match = re.search(pattern, response.get_data(as_text=True), re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_request_counters_increase(client):
+    before = sample(client, 'http_requests_total', method='GET', endpoint='main.get_books', status='200')
+    assert client.get('/api/books').status_code == 200
+    assert client.get('/api/books').status_code == 200
+    after = sample(client, 'http_requests_total', method='GET', endpoint='main.get_books', status='200')
+    assert after == before + 2
+
+    count = sample(client, 'http_request_duration_seconds_count', method='GET', endpoint='main.get_books')
+    assert count == after
+
+
+def test_sql_counters_increase(client):
+    statements = sample(client, 'db_statements_total', origin='request')
+    observed = sample(client, 'http_request_sql_statements_count', endpoint='main.create_book')
+
+    response = client.post('/api/books', json={'title': 'Dom Casmurro', 'author': 'Machado de Assis'})
+    assert response.status_code == 201
+
+    assert sample(client, 'db_statements_total', origin='request') > statements
+    assert sample(client, 'http_request_sql_statements_count', endpoint='main.create_book') == observed + 1
+    assert sample(client, 'http_request_sql_statements_sum', endpoint='main.create_book') > 0
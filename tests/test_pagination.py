@@ -0,0 +1,59 @@
+def add_books(client, count):
+    for number in range(1, count + 1):
+        response = client.post('/api/books', json={'title': f'Livro {number:02d}', 'author': 'Autor'})
+        assert response.status_code == 201
+
+
+def titles(response):
+    return [book['title'] for book in response.get_json()['books']]
+
+
+def test_cursor_next_and_prev(client):
+    add_books(client, 5)
+
+    first = client.get('/api/books?cursor=&sort_by=title&order=asc&per_page=2')
+    assert first.status_code == 200
+    assert titles(first) == ['Livro 01', 'Livro 02']
+    pagination = first.get_json()['pagination']
+    assert pagination['has_next'] and not pagination['has_prev']
+    assert pagination['total'] is None  # COUNT só com with_total
+
+    second = client.get(f'/api/books?cursor={pagination["next_cursor"]}&sort_by=title&order=asc&per_page=2')
+    assert titles(second) == ['Livro 03', 'Livro 04']
+    pagination = second.get_json()['pagination']
+    assert pagination['has_next'] and pagination['has_prev']
+
+    last = client.get(f'/api/books?cursor={pagination["next_cursor"]}&sort_by=title&order=asc&per_page=2')
+    assert titles(last) == ['Livro 05']
+    pagination = last.get_json()['pagination']
+    assert not pagination['has_next'] and pagination['next_cursor'] is None
+
+    back = client.get(f'/api/books?cursor={pagination["prev_cursor"]}&sort_by=title&order=asc&per_page=2')
+    assert titles(back) == ['Livro 03', 'Livro 04']
+
+
+def test_cursor_with_total_and_descending_order(client):
+    add_books(client, 3)
+    response = client.get('/api/books?cursor=&sort_by=title&order=desc&per_page=2&with_total=1')
+    assert titles(response) == ['Livro 03', 'Livro 02']
+    assert response.get_json()['pagination']['total'] == 3
+
+
+def test_invalid_cursor(client):
+    add_books(client, 3)
+    response = client.get('/api/books?cursor=nao-e-um-cursor&sort_by=title')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Cursor inválido'
+
+    # Cursor de outra ordenação
+    cursor = client.get('/api/books?cursor=&sort_by=title&per_page=1').get_json()['pagination']['next_cursor']
+    response = client.get(f'/api/books?cursor={cursor}&sort_by=year')
+    assert response.status_code == 400
+    assert 'ordenação' in response.get_json()['error']
+
+
+def test_per_page_limit_only_applies_to_cursor_mode(client):
+    add_books(client, 3)
+    assert client.get('/api/books?per_page=500').get_json()['pagination']['per_page'] == 500
+    assert client.get('/api/books?cursor=&per_page=500').get_json()['pagination']['per_page'] == 100
+    assert client.get('/api/books?cursor=&per_page=0').get_json()['pagination']['per_page'] == 1
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.query_audit import QueryBudgetExceeded, query_budget
+
+
+def test_route_within_budget_reports_query_count(client):
+    response = client.get('/api/books')
+    assert response.status_code == 200
+    assert int(response.headers['X-Query-Count']) <= client.application.view_functions['main.get_books'].query_budget
+
+
+def test_route_over_budget_fails(app):
+    @query_budget(1)
+    def two_queries():
+        db.session.execute(text('SELECT 1'))
+        db.session.execute(text('SELECT 2'))
+        return 'ok'
+
+    app.add_url_rule('/test/over-budget', 'over_budget', two_queries)
+    with pytest.raises(QueryBudgetExceeded, match='over_budget executou 2 comandos SQL'):
+        app.test_client().get('/test/over-budget')
@@ -0,0 +1,40 @@
+def sync(client, since, limit):
+    """Percorre todas as páginas de ``/api/books/changes``; retorna (versão, livros, remoções)"""
+    params = {'since': since, 'limit': limit}
+    books, deleted, version = {}, [], None
+    while True:
+        page = client.get('/api/books/changes', query_string=params).get_json()
+        version = version if version is not None else page['version']
+        for book in page['books']:
+            books[book['id']] = book['title']
+        deleted += [row['id'] for row in page['deleted']]
+        assert len(page['books']) + len(page['deleted']) <= limit
+        if not page['has_more']:
+            return version, books, deleted
+        params = dict(page['next'], limit=limit)
+
+
+def test_changes_paginate_books_and_tombstones(client):
+    ids = [client.post('/api/books', json={'title': f'Livro {n}', 'author': 'Autor'}).get_json()['id']
+           for n in range(6)]
+    version, books, deleted = sync(client, 0, limit=4)
+    assert set(books) == set(ids) and deleted == []
+
+    # Remoções e alterações intercaladas, várias na mesma versão (lote)
+    assert client.delete('/api/books', json={'ids': ids[:3]}).get_json()['deleted'] == 3
+    client.put(f'/api/books/{ids[3]}', json={'title': 'Renomeado'})
+    client.delete(f'/api/books/{ids[4]}')
+    new = client.post('/api/books', json={'title': 'Novo', 'author': 'Autor'}).get_json()['id']
+
+    for limit in (1, 2, 3, 100):
+        _, books, deleted = sync(client, version, limit)
+        assert books == {ids[3]: 'Renomeado', new: 'Novo'}
+        assert sorted(deleted) == sorted(ids[:3] + [ids[4]])
+
+
+def test_changes_reset_when_since_is_ahead(client):
+    client.post('/api/books', json={'title': 'Livro', 'author': 'Autor'})
+    page = client.get('/api/books/changes?since=999').get_json()
+    assert page['reset'] is True
+    assert [book['title'] for book in page['books']] == ['Livro']
+    assert client.get('/api/books/changes?since=-1').status_code == 400